@@ -0,0 +1,626 @@
+# -*- coding: utf-8 -*-
+"""_utils.py のベンチマーク (_fake_om2 を maya として使用する)
+
+    python _bench.py [--nodes 200] [--vertices 100] [--influences 10] [--extra-attributes 20]
+    python _bench.py --only throughput
+"""
+
+import argparse
+import array
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import _fake_om2
+om2 = _fake_om2.install()
+
+import maya.api.OpenMayaAnim as oma2
+import maya.cmds as cmds
+
+import _snapshot
+import _utils
+
+
+def _reset():
+    """シーンと読み取り計画・スキーマのキャッシュを破棄する (ベンチマーク毎にアトリビュート構成が変わるため)"""
+    _fake_om2.clear_scene()
+    _utils.clear_reader_plans()
+    _utils.clear_schema_cache()
+
+
+def _timeit(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        # 読み取り関数のエラー出力は計測から除外する
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _peak_memory(func):
+    """func 実行中に確保されたメモリのピーク (bytes)"""
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _report_throughput(label, func, plug_count, nbytes):
+    elapsed = _timeit(func)
+    peak = _peak_memory(func)
+    print("  %-24s %8.3f ms %12.0f plugs/s %8.2f MB/s  peak %8.1f KB" % (
+        label, elapsed * 1000.0, plug_count / elapsed, nbytes / elapsed / 1e6, peak / 1024.0))
+
+
+# ---------------------------------------------------------------------------------- #
+# 読み取り計画導入前の読み取り (比較の基準)
+# ---------------------------------------------------------------------------------- #
+# _utils の get_attribute_value などは読み取り計画を使うように変わったため、
+# 94a9598 時点の apiType 分岐をここに固定しておく。
+def _legacy_numeric(mPlug):
+    value = None
+    try:
+        mFnNumericAttribute = om2.MFnNumericAttribute(mPlug.attribute())
+        if mFnNumericAttribute.numericType() == om2.MFnNumericData.kBoolean:
+            value = mPlug.asBool()
+        elif mFnNumericAttribute.numericType() == om2.MFnNumericData.kByte:
+            value = mPlug.asInt()
+        elif mFnNumericAttribute.numericType() == om2.MFnNumericData.kShort:
+            value = mPlug.asShort()
+        elif mFnNumericAttribute.numericType() == om2.MFnNumericData.kLong:
+            value = mPlug.asInt()
+        elif mFnNumericAttribute.numericType() == om2.MFnNumericData.kFloat:
+            value = mPlug.asFloat()
+        elif mFnNumericAttribute.numericType() == om2.MFnNumericData.k3Float:
+            value = _legacy_num_float(mPlug)
+        elif mFnNumericAttribute.numericType() == om2.MFnNumericData.kDouble:
+            value = mPlug.asDouble()
+        elif mFnNumericAttribute.numericType() == om2.MFnNumericData.k3Double:
+            value = _legacy_num_double(mPlug)
+        else:
+            print(u"MFnNumericAttribute無効な値:", mFnNumericAttribute.numericType())
+    except Exception as e:
+        print(e)
+    return value
+
+def _legacy_component_list(mPlug):
+    value = None
+    mFnComponentListData = om2.MFnComponentListData(mPlug.asMObject())
+    for i in range(mFnComponentListData.length()):
+        comp = mFnComponentListData.get(i)
+        if comp.hasFn(om2.MFn.kSingleIndexedComponent):
+            value = om2.MFnSingleIndexedComponent(comp).getElements()
+        elif comp.hasFn(om2.MFn.kDoubleIndexedComponent):
+            value = om2.MFnDoubleIndexedComponent(comp).getElements()
+        else:
+            print("Other", comp.apiTypeStr)
+    return value
+
+def _legacy_typed(mPlug):
+    value = None
+    try:
+        mFnTypedAttribute = om2.MFnTypedAttribute(mPlug.attribute())
+        if mFnTypedAttribute.attrType() == om2.MFnData.kInvalid:
+            value = None
+        elif mFnTypedAttribute.attrType() == om2.MFnData.kString:
+            print(mPlug.asString(), "kString")
+            value = mPlug.asString()
+        elif mFnTypedAttribute.attrType() == om2.MFnData.kMatrix:
+            value = om2.MFnMatrixData(mPlug.asMObject()).matrix()
+        elif mFnTypedAttribute.attrType() == om2.MFnData.kIntArray:
+            value = om2.MFnIntArrayData(mPlug.asMObject()).array()
+        elif mFnTypedAttribute.attrType() == om2.MFnData.kComponentList:
+            value = _legacy_component_list(mPlug)
+        elif mFnTypedAttribute.attrType() == om2.MFnData.kMesh:
+            value = mPlug.asMObject()
+        elif mFnTypedAttribute.attrType() == om2.MFnData.kAny:
+            print("kAny")
+        else:
+            print(u"MFnTypedAttribute無効な値: ", mFnTypedAttribute.attrType())
+    except Exception as e:
+        print(e)
+    return value
+
+def _legacy_enum(mPlug):
+    value = None
+    try:
+        value_index = mPlug.asInt()
+        value = [value_index, om2.MFnEnumAttribute(mPlug.attribute()).fieldName(value_index)]
+    except Exception as e:
+        print(e)
+    return value
+
+def _legacy_num_float(mPlug):
+    values = {}
+    for i in range(mPlug.numChildren()):
+        mPlug_child = mPlug.child(i)
+        values[mPlug_child.partialName(useLongNames=True)] = mPlug_child.asFloat()
+    return values
+
+def _legacy_num_double(mPlug):
+    values = {}
+    for i in range(mPlug.numChildren()):
+        mPlug_child = mPlug.child(i)
+        values[mPlug_child.partialName(useLongNames=True)] = mPlug_child.asDouble()
+    return values
+
+def _legacy_compound(mPlug):
+    values = {}
+    for i in range(mPlug.numChildren()):
+        mPlug_child = mPlug.child(i)
+        mObject_child = mPlug_child.attribute()
+        if mPlug_child.isArray:
+            values[mPlug_child.partialName(useLongNames=True)] = _legacy_array(mPlug_child)
+        elif mObject_child.hasFn(om2.MFn.kCompoundAttribute):
+            values[mPlug_child.partialName(useLongNames=True)] = _legacy_compound(mPlug_child)
+        elif mObject_child.hasFn(om2.MFn.kNumericAttribute):
+            values[mPlug_child.partialName(useLongNames=True)] = _legacy_numeric(mPlug_child)
+        elif mObject_child.hasFn(om2.MFn.kEnumAttribute):
+            values[mPlug_child.partialName(useLongNames=True)] = _legacy_enum(mPlug_child)
+        elif mObject_child.apiType() == om2.MFn.kDoubleLinearAttribute:
+            values[mPlug_child.partialName(useLongNames=True)] = mPlug_child.asMDistance()
+        else:
+            print(mPlug_child.partialName(useLongNames=True), mObject_child.apiTypeStr)
+    return values
+
+def _legacy_array(mPlug):
+    values = {}
+    if not mPlug.numConnectedElements():
+        return None
+    for i in range(mPlug.numElements()):
+        print(mPlug.elementByPhysicalIndex(i).attribute().apiTypeStr)
+    return values
+
+_LEGACY_READERS = {
+    om2.MFn.kCompoundAttribute:     _legacy_compound,
+    om2.MFn.kEnumAttribute:         _legacy_enum,
+    om2.MFn.kNumericAttribute:      _legacy_numeric,
+    om2.MFn.kAttribute3Int:         _legacy_numeric,
+    om2.MFn.kTypedAttribute:        _legacy_typed,
+    om2.MFn.kMatrixAttribute:       _legacy_typed,
+    om2.MFn.kAttribute2Float:       _legacy_num_float,
+    om2.MFn.kAttribute3Float:       _legacy_num_float,
+    om2.MFn.kAttribute3Double:      _legacy_num_double,
+    om2.MFn.kAttribute4Double:      _legacy_num_double,
+}
+
+_LEGACY_ELEMENT_READERS = {
+    om2.MFn.kCompoundAttribute:     _legacy_compound,
+    om2.MFn.kNumericAttribute:      _legacy_numeric,
+    om2.MFn.kTypedAttribute:        _legacy_typed,
+    om2.MFn.kAttribute3Float:       _legacy_num_float,
+}
+
+def legacy_attribute_value(mPlug):
+    """94a9598 の get_attribute_value と同じ if/elif の順で apiType を判定して値を取得する"""
+    mObject_attr = mPlug.attribute()
+    attr_type = mObject_attr.apiType()
+    if mPlug.isArray:
+        value = {}
+        for i in range(mPlug.numElements()):
+            elem_plug = mPlug.elementByPhysicalIndex(i)
+            attr_type = elem_plug.attribute().apiType()
+            reader = _LEGACY_ELEMENT_READERS.get(attr_type)
+            if reader is None:
+                print(elem_plug.info, elem_plug.attribute().apiTypeStr, "-------------------------------")
+                continue
+            value[elem_plug.partialName(useLongNames=True)] = reader(elem_plug)
+        return value
+    
+    reader = _LEGACY_READERS.get(attr_type)
+    if reader is not None:
+        return reader(mPlug)
+    if attr_type not in (om2.MFn.kMessageAttribute, om2.MFn.kGenericAttribute, om2.MFn.kOpaqueAttribute):
+        print(mPlug.info, mObject_attr.apiTypeStr, attr_type, "---------------------------------------")
+    return None
+
+
+def dump_legacy(mObjects, skip=()):
+    """読み取り計画導入前の apiType 分岐による走査"""
+    for mObject in mObjects:
+        mFnDependencyNode = om2.MFnDependencyNode(mObject)
+        for i in range(mFnDependencyNode.attributeCount()):
+            mObject_attr = mFnDependencyNode.attribute(i)
+            mFnAttribute = om2.MFnAttribute(mObject_attr)
+            if not mFnAttribute.parent.isNull() or mFnAttribute.name in skip:
+                continue
+            legacy_attribute_value(om2.MPlug(mObject, mObject_attr))
+
+
+def dump_plan(mObjects, skip=()):
+    if not skip:
+        for mObject in mObjects:
+            _utils.dump_node(mObject)
+        return
+    for mObject in mObjects:
+        plan = _utils.get_reader_plan(om2.MFnDependencyNode(mObject))
+        for entry in plan.entries:
+            if entry.name not in skip:
+                entry.reader(om2.MPlug(mObject, entry.attribute))
+
+
+def bench_reader_plan(args):
+    _reset()
+    mObjects = [_fake_om2.create_skin_cluster("skinCluster%d" % (i + 1), args.vertices, args.influences, seed=i)
+                for i in range(args.nodes)]
+
+    print("reader plan: %d nodes" % len(mObjects))
+    # weightList は読み取り計画側だけ一括取得になるため、除いた場合の差が計画そのものの効果
+    for label, skip in (("all attributes", ()), ("without weightList", ("weightList",))):
+        legacy = _timeit(lambda: dump_legacy(mObjects, skip))
+        plan = _timeit(lambda: dump_plan(mObjects, skip))
+        print("  %-20s legacy chain %8.3f ms  reader plan %8.3f ms  (x%.2f)" % (
+            label, legacy * 1000.0, plan * 1000.0, legacy / plan))
+
+
+def bench_conversion(args):
+    """読み取り計画の読み取り関数に含まれる変換 (MMatrix -> array('d') など) のコスト"""
+    _reset()
+    mObjects = [_fake_om2.create_skin_cluster("skinCluster%d" % (i + 1), 10, args.influences, seed=i)
+                for i in range(args.nodes)]
+    plugs = []
+    for mObject in mObjects:
+        mPlug = om2.MFnDependencyNode(mObject).findPlug("bindPreMatrix", False)
+        plugs.extend(mPlug.elementByPhysicalIndex(i) for i in range(mPlug.numElements()))
+
+    raw = _timeit(lambda: [om2.MFnMatrixData(p.asMObject()).matrix() for p in plugs])
+    converted = _timeit(lambda: [_utils._read_matrix(p) for p in plugs])
+    print("conversion: %d matrices" % len(plugs))
+    print("  MMatrix       %8.3f ms" % (raw * 1000.0))
+    print("  array('d')    %8.3f ms  (+%.0f ns/value)" % (converted * 1000.0, (converted - raw) * 1e9 / len(plugs)))
+
+
+def bench_skin_weights(args):
+    _reset()
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", args.weight_vertices, args.weight_influences)
+    mObject.dense_weights()
+
+    mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    mPlug = mFnDependencyNode.findPlug("weightList", False)
+    read_plugs = _utils.build_plan_entry(mPlug.attribute()).reader
+
+    plugs = _timeit(lambda: read_plugs(mPlug), repeat=1)
+    dense = _timeit(lambda: _utils.get_skin_weights(mObject))
+    sparse = _timeit(lambda: _utils.get_skin_weights(mObject, sparse=True))
+    print("skin weights: %d vertices x %d influences (numpy: %s)" % (
+        args.weight_vertices, args.weight_influences, _utils.np is not None))
+    print("  plug by plug  %8.3f ms" % (plugs * 1000.0))
+    print("  bulk dense    %8.3f ms  (x%.2f)" % (dense * 1000.0, plugs / dense))
+    print("  bulk csr      %8.3f ms  (x%.2f)" % (sparse * 1000.0, plugs / sparse))
+
+    # getWeights の MDoubleArray からの変換 (偽の MDoubleArray は list のため np.array には有利になる)
+    mDoubleArray = _get_weights(mObject)
+    print("  MDoubleArray conversion: %d values" % len(mDoubleArray))
+    conversions = [("array('d')", lambda: array.array("d", mDoubleArray))]
+    if _utils.np is not None:
+        np = _utils.np
+        conversions[:0] = [("np.array", lambda: np.array(mDoubleArray, dtype=np.float64)),
+                           ("np.fromiter", lambda: _utils._weights_to_buffer(mDoubleArray))]
+    for label, func in conversions:
+        print("    %-14s %8.3f ms" % (label, _timeit(func) * 1000.0))
+
+
+def _get_weights(mObject):
+    mFnSkinCluster = oma2.MFnSkinCluster(mObject)
+    mDagPath = mFnSkinCluster.getPathAtIndex(0)
+    mFnSingleIndexedComponent = om2.MFnSingleIndexedComponent()
+    components = mFnSingleIndexedComponent.create(om2.MFn.kMeshVertComponent)
+    mFnSingleIndexedComponent.setCompleteData(om2.MItGeometry(mDagPath).count())
+    return mFnSkinCluster.getWeights(mDagPath, components)[0]
+
+
+def bench_skin_analysis(args):
+    import _skinweights
+    _reset()
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", args.weight_vertices, args.weight_influences)
+    weights = _utils.get_skin_weights(mObject)
+    dense = _skinweights.as_dense(weights)
+    print("skin analysis: %d vertices x %d influences (%d pairs)" % (
+        args.weight_vertices, args.weight_influences, dense.size))
+    kernels = [
+        ("sum deviation", lambda: _skinweights.sum_deviation(dense)),
+        ("influence counts", lambda: _skinweights.influence_counts(dense)),
+        ("unused influences", lambda: _skinweights.unused_influences(dense)),
+        ("prune top 3", lambda: _skinweights.prune_top_k(dense, 3)),
+        ("histogram", lambda: _skinweights.weight_histogram(dense)),
+        ("validate", lambda: _skinweights.validate(weights)),
+    ]
+    for label, func in kernels:
+        print("  %-18s %8.3f ms" % (label, _timeit(func) * 1000.0))
+
+
+def bench_mirror(args):
+    """Maya を使わずに左右対称な点群でウェイトのミラーとコピーを計測する"""
+    import numpy as np
+    import _skinweights
+    rng = np.random.RandomState(0)
+    half = args.mirror_vertices // 2
+    points = rng.standard_normal((half, 3)) * [20.0, 80.0, 15.0]
+    points[:, 0] = np.abs(points[:, 0]) + 0.01
+    points = np.concatenate([points, points * [-1.0, 1.0, 1.0]])
+    influences = ["root", "spine"] + ["%s_%s" % (name, side) for name in ("arm", "leg", "hand", "foot")
+                                                               for side in ("L", "R")]
+    weights = rng.random_sample((len(points), len(influences)))
+    _skinweights.normalize(weights, out=weights)
+    # コピー先は頂点を少しずらした別のメッシュとみなす
+    targets = points[:half] + rng.standard_normal((half, 3)) * 0.05
+    print("mirror: %d vertices x %d influences (scipy %s)" % (
+        len(points), len(influences), "yes" if _skinweights.cKDTree is not None else "no"))
+    tree = [None]
+    kernels = [
+        ("build tree", lambda: tree.__setitem__(0, _skinweights.KDTree(points[:half]))),
+        ("query k=4", lambda: tree[0].query(targets, 4)),
+        ("mirror idw", lambda: _skinweights.mirror_weights(points, weights, influences)),
+        ("mirror bary", lambda: _skinweights.mirror_weights(points, weights, influences, method="barycentric")),
+        ("copy idw", lambda: _skinweights.copy_weights(points[:half], weights[:half], targets,
+                                                       influences, influences)),
+    ]
+    for label, func in kernels:
+        print("  %-18s %8.3f s" % (label, _timeit(func, repeat=1)))
+
+
+def bench_snapshot_nodes(args):
+    _reset()
+    names = ["skinCluster%d" % (i + 1) for i in range(args.nodes)]
+    for i, name in enumerate(names):
+        _fake_om2.create_skin_cluster(name, args.vertices, args.influences, seed=i)
+
+    def per_node():
+        for name in names:
+            _utils.dump_node(om2.MGlobal.getSelectionListByName(name).getDependNode(0))
+
+    # 列形式にまとめる分のオーバーヘッドを確認する (読み取りが大半のため速さは同程度になる)
+    single = _timeit(per_node)
+    batch = _timeit(lambda: _utils.snapshot_nodes("skinCluster*"))
+    print("snapshot nodes: %d nodes" % len(names))
+    print("  per node      %8.3f ms" % (single * 1000.0))
+    print("  columnar      %8.3f ms  (%+.1f%%)" % (batch * 1000.0, (batch / single - 1.0) * 100.0))
+
+
+def bench_snapshot_formats(args):
+    _reset()
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", args.weight_vertices, args.weight_influences)
+    directory = tempfile.mkdtemp()
+    print("snapshot formats: %d vertices x %d influences" % (args.weight_vertices, args.weight_influences))
+    formats = [
+        ("dump.ndjson", {}),
+        ("dump.ndjson.gz", {}),
+        ("dump" + _snapshot.BINARY_EXTENSION, {}),
+        ("dump" + _snapshot.BINARY_EXTENSION, {"hash_name": "sha1"}),
+        ("dump" + _snapshot.BINARY_EXTENSION, {"compress": "zlib", "hash_name": "sha1"}),
+        ("dump" + _snapshot.BINARY_EXTENSION, {"compress": "lzma", "level": 1}),
+    ]
+    for name, kwargs in formats:
+        path = os.path.join(directory, name)
+        write = _timeit(lambda: _utils.write_node_records([mObject], path, **kwargs), repeat=1)
+        read = _timeit(lambda: list(_snapshot.iter_records(path)), repeat=1)
+        label = "+".join([name] + [str(value) for value in kwargs.values()])
+        print("  %-24s write %8.3f ms  read %8.3f ms  %10d bytes" % (
+            label, write * 1000.0, read * 1000.0, os.path.getsize(path)))
+        os.remove(path)
+    os.rmdir(directory)
+
+
+def bench_elision(args):
+    """既定値の省略 (追加アトリビュートの 9 割が既定値のスキンクラスター)"""
+    _reset()
+    mObjects = [_fake_om2.create_skin_cluster("skinCluster%d" % (i + 1), args.vertices, args.influences,
+                                              extra_attribute_count=args.extra_attributes * 10,
+                                              extra_attribute_kinds=_fake_om2.EXTRA_ATTRIBUTE_KINDS,
+                                              extra_default_ratio=0.9, seed=i)
+                for i in range(args.nodes)]
+    directory = tempfile.mkdtemp()
+    print("default elision: %d nodes, %d extra attributes" % (args.nodes, args.extra_attributes * 10))
+    for name in ("dump.ndjson", "dump" + _snapshot.BINARY_EXTENSION):
+        path = os.path.join(directory, name)
+        for elide_defaults in (False, True):
+            count = []
+            write = _timeit(lambda: count.append(
+                _utils.write_node_records(mObjects, path, elide_defaults=elide_defaults)), repeat=1)
+            print("  %-16s elide=%-5s write %8.3f ms  %7d records  %10d bytes" % (
+                name, elide_defaults, write * 1000.0, count[0], os.path.getsize(path)))
+            os.remove(path)
+    os.rmdir(directory)
+
+
+def bench_restore(args):
+    _reset()
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", args.weight_vertices, args.weight_influences)
+    records = list(_utils.iter_plug_records(mObject))
+    weights = _utils.get_skin_weights(mObject)["weights"]
+
+    # プラグ単位の書き込みは遅いため先頭の頂点だけ計測して全体に換算する
+    sample = min(500, args.weight_vertices)
+    rows = weights.tolist() if hasattr(weights, "tolist") else weights
+
+    def per_plug():
+        mPlug = om2.MFnDependencyNode(mObject).findPlug("weightList", False)
+        for v, row in enumerate(rows[:sample]):
+            mPlug_weights = mPlug.elementByLogicalIndex(v).child(0)
+            for j, w in enumerate(row):
+                mPlug_weights.elementByLogicalIndex(j).setDouble(w)
+
+    plugs = _timeit(per_plug, repeat=1) * args.weight_vertices / sample
+    batch = _timeit(lambda: _utils.restore_snapshot(records), repeat=1)
+    print("restore: %d vertices x %d influences" % (args.weight_vertices, args.weight_influences))
+    print("  plug by plug  %8.3f ms  (%d vertices measured)" % (plugs * 1000.0, sample))
+    print("  batch         %8.3f ms  (x%.2f)" % (batch * 1000.0, plugs / batch))
+
+
+def bench_throughput(args):
+    """読み取り関数毎のスループット (plugs/s, MB/s) とピークメモリ"""
+    _reset()
+    mObjects = [_fake_om2.create_skin_cluster("skinCluster%d" % (i + 1), args.vertices, args.influences,
+                                              extra_attribute_count=args.extra_attributes,
+                                              extra_attribute_kinds=_fake_om2.EXTRA_ATTRIBUTE_KINDS, seed=i)
+                for i in range(args.nodes)]
+
+    numeric, compound, typed = [], [], []
+    for mObject in mObjects:
+        mFnDependencyNode = om2.MFnDependencyNode(mObject)
+        mPlug = mFnDependencyNode.findPlug("weightList", False)
+        for v in mPlug.getExistingArrayAttributeIndices():
+            mPlug_weights = mPlug.elementByLogicalIndex(v).child(0)
+            compound.append(mPlug.elementByLogicalIndex(v))
+            numeric.extend(mPlug_weights.elementByLogicalIndex(j)
+                           for j in mPlug_weights.getExistingArrayAttributeIndices())
+        for i in range(mFnDependencyNode.attributeCount()):
+            mObject_attr = mFnDependencyNode.attribute(i)
+            if not om2.MFnAttribute(mObject_attr).parent.isNull() or om2.MFnAttribute(mObject_attr).array:
+                continue
+            if mObject_attr.hasFn(om2.MFn.kTypedAttribute):
+                typed.append(om2.MPlug(mObject, mObject_attr))
+            elif mObject_attr.apiType() == om2.MFn.kCompoundAttribute:
+                compound.append(om2.MPlug(mObject, mObject_attr))
+
+    def nbytes(values):
+        return sum(_utils.value_nbytes(_utils.convert_value(value)) for value in values)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        compound_leaves = sum(len(_utils.get_compound_attribute(p)) for p in compound)
+        numeric_bytes = nbytes(_utils.get_numeric_attribute(p) for p in numeric)
+        compound_bytes = nbytes(_utils.get_compound_attribute(p) for p in compound)
+        typed_bytes = nbytes(_utils.get_typed_Attribute(p) for p in typed)
+        records = [record for mObject in mObjects for record in _utils.iter_plug_records(mObject)]
+    top_bytes = sum(_utils.value_nbytes(value) for _, _, value in records)
+
+    print("throughput: %d nodes, %d vertices, %d influences, %d extra attributes" % (
+        args.nodes, args.vertices, args.influences, args.extra_attributes))
+    _report_throughput("get_numeric_attribute", lambda: [_utils.get_numeric_attribute(p) for p in numeric],
+                       len(numeric), numeric_bytes)
+    _report_throughput("get_compound_attribute", lambda: [_utils.get_compound_attribute(p) for p in compound],
+                       compound_leaves, compound_bytes)
+    _report_throughput("get_typed_Attribute", lambda: [_utils.get_typed_Attribute(p) for p in typed],
+                       len(typed), typed_bytes)
+    _report_throughput("top-level (legacy)", lambda: dump_legacy(mObjects), len(records), top_bytes)
+    _report_throughput("top-level (plan)", lambda: dump_plan(mObjects), len(records), top_bytes)
+
+
+def bench_connection_graph(args):
+    _reset()
+    nodes = _fake_om2.create_network(args.graph_nodes, fan_in=2, cycle_count=10)
+    graph = []
+    extract = _timeit(lambda: graph.append(_utils.get_connection_graph("network*")), repeat=1)
+    graph = graph[0]
+    order = _timeit(lambda: graph.topologicalOrder(), repeat=1)
+    cached = _timeit(lambda: graph.topologicalOrder())
+    last = "network%d" % (args.graph_nodes - 1)
+    upstream = _timeit(lambda: graph.upstream(last))
+    
+    # 接続の追加で並べ替える範囲だけを更新する
+    mPlug_output = om2.MFnDependencyNode(nodes[0]).findPlug("output", False)
+    mPlug_input = om2.MFnDependencyNode(nodes[-1]).findPlug("input", False)
+    graph.watch()
+    def reconnect():
+        om2.MDGModifier().connect(mPlug_output, mPlug_input.elementByLogicalIndex(99)).doIt()
+        graph.topologicalOrder()
+        om2.MDGModifier().disconnect(mPlug_output, mPlug_input.elementByLogicalIndex(99)).doIt()
+    incremental = _timeit(reconnect)
+    graph.close()
+    print("connection graph: %d nodes, %d vertices, %d edges" % (args.graph_nodes, len(graph), graph.edgeCount()))
+    print("  extract       %8.3f ms" % (extract * 1000.0))
+    print("  topo + scc    %8.3f ms  (cached %.3f ms)" % (order * 1000.0, cached * 1000.0))
+    print("  upstream      %8.3f ms" % (upstream * 1000.0))
+    print("  reconnect     %8.3f ms" % (incremental * 1000.0))
+
+
+def bench_diff(args):
+    _reset()
+    names = ["skinCluster%d" % (i + 1) for i in range(args.nodes)]
+    for i, name in enumerate(names):
+        _fake_om2.create_skin_cluster(name, args.vertices, args.influences, seed=i)
+    def dump_all():
+        return [_utils.dump_node(om2.MGlobal.getSelectionListByName(name).getDependNode(0)) for name in names]
+    before = _utils.hash_nodes("skinCluster*")
+    dumps_before = dump_all()
+    
+    mFnDependencyNode = om2.MFnDependencyNode(om2.MGlobal.getSelectionListByName(names[-1]).getDependNode(0))
+    om2.MDGModifier().newPlugValueFloat(mFnDependencyNode.findPlug("envelope", False), 0.5).doIt()
+    after = _utils.hash_nodes("skinCluster*")
+    dumps_after = dump_all()
+    
+    def nested():
+        # ダンプした dict 同士を比べる従来の方法
+        return [_snapshot.values_close(a, b) for a, b in zip(dumps_before, dumps_after)]
+    full = _timeit(nested, repeat=1)
+    merkle = _timeit(lambda: _snapshot.diff(before, after))
+    print("diff: %d nodes, %d changes" % (len(names), len(_snapshot.diff(before, after))))
+    print("  nested dicts  %8.3f ms" % (full * 1000.0))
+    print("  merkle        %8.3f ms  (x%.0f)" % (merkle * 1000.0, full / merkle))
+
+
+def bench_sample_plugs(args):
+    _reset()
+    nodes = _fake_om2.create_animated_controls(args.controls)
+    plugs = ["%s.%s" % (node.name, attr.name) for node in nodes for attr in node.attributes]
+    frames = range(1, args.frames + 1)
+    samples = []
+    batch = _timeit(lambda: samples.append(_utils.sample_plugs(plugs, frames)), repeat=1)
+    
+    def per_frame():
+        # フレーム毎に currentTime を動かして getAttr で読む従来の方法
+        rows = []
+        for frame in frames:
+            cmds.currentTime(frame)
+            rows.append([cmds.getAttr(plug_path) for plug_path in plugs])
+        cmds.currentTime(1.0)
+        return rows
+    legacy = _timeit(per_frame, repeat=1)
+    print("sample plugs: %d plugs x %d frames" % (len(plugs), len(frames)))
+    print("  per frame     %8.3f ms" % (legacy * 1000.0))
+    print("  sample_plugs  %8.3f ms  (x%.1f)" % (batch * 1000.0, legacy / batch))
+
+
+def bench_profile(args):
+    """ダンプの内訳 (--profile で JSON を保存する)"""
+    _reset()
+    for i in range(args.nodes):
+        _fake_om2.create_skin_cluster("skinCluster%d" % (i + 1), args.vertices, args.influences, seed=i)
+
+    with _utils.DumpProfiler() as profiler:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _utils.snapshot_nodes("skinCluster*")
+    print("profile: %d nodes" % args.nodes)
+    print(profiler.report(limit=10))
+    if args.profile:
+        profiler.save(args.profile)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=200)
+    parser.add_argument("--vertices", type=int, default=100)
+    parser.add_argument("--influences", type=int, default=10)
+    parser.add_argument("--extra-attributes", type=int, default=20)
+    parser.add_argument("--graph-nodes", type=int, default=20000)
+    parser.add_argument("--only", help="run only the named benchmark (e.g. throughput)")
+    parser.add_argument("--weight-vertices", type=int, default=20000)
+    parser.add_argument("--weight-influences", type=int, default=50)
+    parser.add_argument("--mirror-vertices", type=int, default=300000)
+    parser.add_argument("--controls", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--profile", help="dump profile JSON path")
+    args = parser.parse_args()
+
+    benchmarks = [bench_reader_plan, bench_conversion, bench_throughput, bench_skin_weights, bench_skin_analysis,
+                  bench_mirror,
+                  bench_snapshot_nodes, bench_snapshot_formats, bench_elision,
+                  bench_restore, bench_connection_graph,
+                  bench_diff, bench_sample_plugs, bench_profile]
+    for bench in benchmarks:
+        if args.only and bench.__name__ != "bench_" + args.only:
+            continue
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1862 @@
+# -*- coding: utf-8 -*-
+"""Maya を使わずに _utils.py を動かすための maya.api.OpenMaya の代用品
+
+ベンチマーク用に必要な API だけを Python で再現している。
+install() を呼ぶと sys.modules に maya パッケージとして登録される。
+"""
+
+import sys
+import types
+
+
+# ---------------------------------------------------------------------------------- #
+# MFn
+# ---------------------------------------------------------------------------------- #
+class MFn(object):
+    kInvalid                    = 0
+    kBase                       = 1
+    kDependencyNode             = 4
+    kDagNode                    = 107
+    kTransform                  = 110
+    kJoint                      = 121
+    kMesh                       = 296
+    kMeshData                   = 589
+    kGeometryFilt               = 334
+    kSkinClusterFilter          = 682
+    kAttribute                  = 554
+    kNumericAttribute           = 555
+    kAttribute2Double           = 556
+    kAttribute2Float            = 557
+    kAttribute2Short            = 558
+    kAttribute2Int              = 559
+    kAttribute3Double           = 560
+    kAttribute3Float            = 561
+    kAttribute3Short            = 562
+    kAttribute3Int              = 563
+    kAttribute4Double           = 564
+    kUnitAttribute              = 565
+    kDoubleLinearAttribute      = 566
+    kFloatLinearAttribute       = 567
+    kDoubleAngleAttribute       = 568
+    kFloatAngleAttribute        = 569
+    kTimeAttribute              = 570
+    kEnumAttribute              = 571
+    kCompoundAttribute          = 572
+    kTypedAttribute             = 573
+    kMatrixAttribute            = 574
+    kFloatMatrixAttribute       = 575
+    kMessageAttribute           = 576
+    kGenericAttribute           = 577
+    kLightDataAttribute         = 578
+    kOpaqueAttribute            = 579
+    kComponent                  = 524
+    kSingleIndexedComponent     = 701
+    kDoubleIndexedComponent     = 702
+    kMeshVertComponent          = 550
+    kMeshEdgeComponent          = 551
+    kMeshPolygonComponent       = 552
+    kSurfaceCVComponent         = 534
+    kLatticeComponent           = 335
+
+
+_FN_NAMES = dict((value, key) for key, value in vars(MFn).items() if key.startswith("k"))
+
+_FN_PARENTS = {
+    MFn.kNumericAttribute:      (MFn.kAttribute,),
+    MFn.kCompoundAttribute:     (MFn.kAttribute,),
+    MFn.kAttribute2Double:      (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute2Float:       (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute2Short:       (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute2Int:         (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute3Double:      (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute3Float:       (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute3Short:       (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute3Int:         (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kAttribute4Double:      (MFn.kNumericAttribute, MFn.kCompoundAttribute, MFn.kAttribute),
+    MFn.kUnitAttribute:         (MFn.kAttribute,),
+    MFn.kDoubleLinearAttribute: (MFn.kUnitAttribute, MFn.kAttribute),
+    MFn.kFloatLinearAttribute:  (MFn.kUnitAttribute, MFn.kAttribute),
+    MFn.kDoubleAngleAttribute:  (MFn.kUnitAttribute, MFn.kAttribute),
+    MFn.kFloatAngleAttribute:   (MFn.kUnitAttribute, MFn.kAttribute),
+    MFn.kTimeAttribute:         (MFn.kUnitAttribute, MFn.kAttribute),
+    MFn.kEnumAttribute:         (MFn.kAttribute,),
+    MFn.kTypedAttribute:        (MFn.kAttribute,),
+    MFn.kMatrixAttribute:       (MFn.kAttribute,),
+    MFn.kFloatMatrixAttribute:  (MFn.kAttribute,),
+    MFn.kMessageAttribute:      (MFn.kAttribute,),
+    MFn.kGenericAttribute:      (MFn.kAttribute,),
+    MFn.kLightDataAttribute:    (MFn.kAttribute,),
+    MFn.kOpaqueAttribute:       (MFn.kAttribute,),
+    MFn.kDependencyNode:        (MFn.kBase,),
+    MFn.kDagNode:               (MFn.kDependencyNode, MFn.kBase),
+    MFn.kTransform:             (MFn.kDagNode, MFn.kDependencyNode, MFn.kBase),
+    MFn.kJoint:                 (MFn.kTransform, MFn.kDagNode, MFn.kDependencyNode, MFn.kBase),
+    MFn.kMesh:                  (MFn.kDagNode, MFn.kDependencyNode, MFn.kBase),
+    MFn.kGeometryFilt:          (MFn.kDependencyNode, MFn.kBase),
+    MFn.kSkinClusterFilter:     (MFn.kGeometryFilt, MFn.kDependencyNode, MFn.kBase),
+    MFn.kSingleIndexedComponent: (MFn.kComponent, MFn.kBase),
+    MFn.kDoubleIndexedComponent: (MFn.kComponent, MFn.kBase),
+    MFn.kMeshVertComponent:     (MFn.kSingleIndexedComponent, MFn.kComponent, MFn.kBase),
+    MFn.kMeshEdgeComponent:     (MFn.kSingleIndexedComponent, MFn.kComponent, MFn.kBase),
+    MFn.kMeshPolygonComponent:  (MFn.kSingleIndexedComponent, MFn.kComponent, MFn.kBase),
+    MFn.kSurfaceCVComponent:    (MFn.kDoubleIndexedComponent, MFn.kComponent, MFn.kBase),
+}
+
+
+class MFnNumericData(object):
+    kInvalid    = 0
+    kBoolean    = 1
+    kByte       = 2
+    kChar       = 3
+    kShort      = 4
+    k2Short     = 5
+    k3Short     = 6
+    kLong       = 7
+    kInt        = 7
+    k2Long      = 8
+    k2Int       = 8
+    k3Long      = 9
+    k3Int       = 9
+    kInt64      = 10
+    kFloat      = 11
+    k2Float     = 12
+    k3Float     = 13
+    kDouble     = 14
+    k2Double    = 15
+    k3Double    = 16
+    k4Double    = 17
+    kAddr       = 18
+
+
+class MFnData(object):
+    kInvalid        = 0
+    kNumeric        = 1
+    kPlugin         = 2
+    kPluginGeometry = 3
+    kString         = 4
+    kMatrix         = 5
+    kStringArray    = 6
+    kDoubleArray    = 7
+    kFloatArray     = 8
+    kIntArray       = 9
+    kPointArray     = 10
+    kVectorArray    = 11
+    kMatrixArray    = 12
+    kComponentList  = 13
+    kMesh           = 14
+    kLattice        = 15
+    kNurbsCurve     = 16
+    kNurbsSurface   = 17
+    kSphere         = 18
+    kDynArrayAttrs  = 19
+    kDynSweptGeometry = 20
+    kSubdSurface    = 21
+    kNObject        = 22
+    kNId            = 23
+    kAny            = 24
+
+
+# ---------------------------------------------------------------------------------- #
+# 値オブジェクト
+# ---------------------------------------------------------------------------------- #
+class MTypeId(object):
+    def __init__(self, value=0):
+        self._id = value
+
+    def id(self):
+        return self._id
+
+    def __eq__(self, other):
+        return isinstance(other, MTypeId) and other._id == self._id
+
+    def __hash__(self):
+        return hash(self._id)
+
+
+class MMatrix(object):
+    kIdentity = None
+
+    def __init__(self, values=None):
+        if values is None:
+            values = (1.0, 0.0, 0.0, 0.0,
+                      0.0, 1.0, 0.0, 0.0,
+                      0.0, 0.0, 1.0, 0.0,
+                      0.0, 0.0, 0.0, 1.0)
+        self._values = tuple(float(v) for v in values)
+
+    def __len__(self):
+        return 16
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __eq__(self, other):
+        return isinstance(other, MMatrix) and other._values == self._values
+
+    def __repr__(self):
+        return "MMatrix(%r)" % (self._values,)
+
+
+MMatrix.kIdentity = MMatrix()
+
+
+class MFloatMatrix(MMatrix):
+    pass
+
+
+class MIntArray(list):
+    pass
+
+
+class MFloatArray(list):
+    pass
+
+
+class MVector(MMatrix):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self._values = (float(x), float(y), float(z))
+
+    def __len__(self):
+        return 3
+
+    x = property(lambda self: self._values[0])
+    y = property(lambda self: self._values[1])
+    z = property(lambda self: self._values[2])
+
+
+class MDoubleArray(list):
+    pass
+
+
+class MPoint(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x, self.y, self.z, self.w = x, y, z, w
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.w))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, self.w)[index]
+
+
+class MPointArray(list):
+    pass
+
+
+class MFloatPoint(MPoint):
+    pass
+
+
+class MFloatPointArray(list):
+    pass
+
+
+class MFloatVector(MVector):
+    pass
+
+
+class MFloatVectorArray(list):
+    pass
+
+
+class MSpace(object):
+    kInvalid        = 0
+    kTransform      = 1
+    kPreTransform   = 2
+    kPostTransform  = 3
+    kWorld          = 4
+    kObject         = kPreTransform
+
+
+class MDistance(object):
+    kInvalid        = 0
+    kInches         = 1
+    kFeet           = 2
+    kYards          = 3
+    kMiles          = 4
+    kMillimeters    = 5
+    kCentimeters    = 6
+    kKilometers     = 7
+    kMeters         = 8
+
+    def __init__(self, value=0.0, unit=6):
+        self.value = value
+        self.unit = unit
+
+    def asUnits(self, unit):
+        return self.value
+
+    def asCentimeters(self):
+        return self.value
+
+
+class MAngle(object):
+    kRadians = 1
+
+    def __init__(self, value=0.0, unit=1):
+        self.value = value
+        self.unit = unit
+
+    def asRadians(self):
+        return self.value
+
+
+class MTime(object):
+    kInvalid = 0
+    kHours = 1
+    kMinutes = 2
+    kSeconds = 3
+    kMilliseconds = 4
+    kFilm = 6
+    kPALFrame = 7
+    kNTSCFrame = 8
+
+    def __init__(self, value=0.0, unit=6):
+        self.value = value
+        self.unit = unit
+
+    def asUnits(self, unit):
+        return self.value
+
+    @staticmethod
+    def uiUnit():
+        return MTime.kFilm
+
+
+class MDGContext(object):
+    """評価コンテキスト (時間だけを持つ)"""
+    def __init__(self, mTime=None):
+        self._time = mTime
+
+    def isNormal(self):
+        return self._time is None
+
+    def getTime(self):
+        return self._time if self._time is not None else MTime(_SCENE.current_time)
+
+    def makeCurrent(self):
+        previous = _SCENE.context
+        _SCENE.context = self
+        return previous
+
+    @staticmethod
+    def current():
+        return _SCENE.context
+
+
+MDGContext.kNormal = MDGContext()
+
+# ---------------------------------------------------------------------------------- #
+# MObject
+# ---------------------------------------------------------------------------------- #
+class MObject(object):
+    kNullObj = None
+
+    def __init__(self, api_type=MFn.kInvalid):
+        self._api_type = api_type
+
+    def apiType(self):
+        return self._api_type
+
+    @property
+    def apiTypeStr(self):
+        return _FN_NAMES.get(self._api_type, "kInvalid")
+
+    def hasFn(self, fn):
+        return fn == self._api_type or fn in _FN_PARENTS.get(self._api_type, ())
+
+    def isNull(self):
+        return self._api_type == MFn.kInvalid
+
+
+MObject.kNullObj = MObject()
+
+
+class _Attribute(MObject):
+    """アトリビュート定義"""
+    def __init__(self, api_type, name, short_name=None, numeric_type=0, data_type=0,
+                 array=False, default=None, fields=None, children=(), dynamic=False):
+        super(_Attribute, self).__init__(api_type)
+        self.name = name
+        self.short_name = short_name or name
+        self.numeric_type = numeric_type
+        self.data_type = data_type
+        self.array = array
+        self.default = default
+        self.fields = fields or {}
+        self.children = list(children)
+        self.parent = MObject.kNullObj
+        self.dynamic = dynamic
+        for child in self.children:
+            child.parent = self
+
+    def flatten(self):
+        yield self
+        for child in self.children:
+            for attr in child.flatten():
+                yield attr
+
+
+class _Data(MObject):
+    """データオブジェクト (MFnMatrixData などが扱う)"""
+    def __init__(self, api_type, value):
+        super(_Data, self).__init__(api_type)
+        self.value = value
+
+
+class _MeshData(MObject):
+    """メッシュデータ (頂点座標、法線、ポリゴン毎の頂点数と頂点番号)"""
+    def __init__(self, points, normals, counts, connects):
+        super(_MeshData, self).__init__(MFn.kMeshData)
+        self.points = points
+        self.normals = normals
+        self.counts = counts
+        self.connects = connects
+        self.vertex_count = len(points)
+
+
+class _Node(MObject):
+    """ディペンデンシーノード"""
+    def __init__(self, name, type_name, type_id, api_type, attributes):
+        super(_Node, self).__init__(api_type)
+        self.name = name
+        self.type_name = type_name
+        self.type_id = MTypeId(type_id)
+        self.attributes = []
+        for attr in attributes:
+            self.attributes.extend(attr.flatten())
+        self.by_name = dict((attr.name, attr) for attr in self.attributes)
+        self.values = {}
+        self.elements = {}
+        self.callbacks = []
+        self.plugin_name = ""
+        self.animation = {}
+
+    def set(self, path, value):
+        """path: ((attr_name, logical_index or None), ...)"""
+        self.store(self._key(path), value, notify=False)
+
+    def animate(self, path, curve):
+        """path の値を curve(フレーム) で評価するようにする"""
+        self.animation[self._key(path)] = curve
+
+    def store(self, key, value, notify=True):
+        self.values[key] = value
+        self._dense_weights = None
+        for i in range(len(key)):
+            attr, index = key[i]
+            if index is not None:
+                parent = key[:i] + ((attr, None),)
+                indices = self.elements.setdefault(parent, [])
+                if not indices or indices[-1] < index:
+                    indices.append(index)
+                elif index not in indices:
+                    indices.append(index)
+                    indices.sort()
+        if notify:
+            for callback_id, func, client_data in list(self.callbacks):
+                func(MNodeMessage.kAttributeSet, MPlug(self, _path=key), MPlug(), client_data)
+
+    def remove(self, key, notify=True):
+        """配列の要素 key とその下の値を削除する (removeMultiInstance 相当)
+
+        Returns:
+            dict: 削除した値 {key: 値}
+        """
+        attr, index = key[-1]
+        indices = self.elements.get(key[:-1] + ((attr, None),))
+        if indices and index in indices:
+            indices.remove(index)
+        count = len(key)
+        removed = dict((k, v) for k, v in self.values.items() if k[:count] == key)
+        for k in removed:
+            del self.values[k]
+        for k in [k for k in self.elements if k[:count] == key]:
+            del self.elements[k]
+        self._dense_weights = None
+        if notify:
+            for callback_id, func, client_data in list(self.callbacks):
+                func(MNodeMessage.kAttributeArrayRemoved, MPlug(self, _path=key), MPlug(), client_data)
+        return removed
+
+    def dense_weights(self):
+        """weightList を (頂点 x インフルエンス) の並びに展開する (getWeights の内部処理相当)"""
+        dense = getattr(self, "_dense_weights", None)
+        if dense is None:
+            weight_list = self.by_name["weightList"]
+            weights = self.by_name["weights"]
+            influence_count = len(self.influences)
+            dense = [0.0] * (self.vertex_count * influence_count)
+            for key, value in self.values.items():
+                if len(key) == 2 and key[0][0] is weight_list and key[1][0] is weights:
+                    dense[key[0][1] * influence_count + key[1][1]] = value
+            self._dense_weights = dense
+        return dense
+
+    def _key(self, path):
+        return tuple((self.by_name[name] if isinstance(name, str) else name, index)
+                     for name, index in path)
+
+
+# ---------------------------------------------------------------------------------- #
+# MPlug
+# ---------------------------------------------------------------------------------- #
+class MPlug(object):
+    def __init__(self, node=None, attribute=None, _path=None):
+        if isinstance(node, MPlug):
+            node, _path = node._node, node._path
+        self._node = node
+        if _path is None:
+            _path = ()
+            if attribute is not None:
+                _check_attribute(node, attribute)
+                _path = ((attribute, None),)
+        self._path = _path
+
+    def _attr(self):
+        return self._path[-1][0]
+
+    def node(self):
+        return self._node
+
+    def attribute(self):
+        return self._path[-1][0]
+
+    def isNull(self):
+        return not self._path
+
+    @property
+    def isArray(self):
+        attr, index = self._path[-1]
+        return attr.array and index is None
+
+    @property
+    def isElement(self):
+        attr, index = self._path[-1]
+        return attr.array and index is not None
+
+    @property
+    def isChild(self):
+        return len(self._path) > 1 and self._path[-2][0] is self._path[-1][0].parent
+
+    @property
+    def isCompound(self):
+        return bool(self._path[-1][0].children)
+
+    @property
+    def info(self):
+        return "%s.%s" % (self._node.name, self.partialName(useLongNames=True))
+
+    def partialName(self, includeNodeName=False, includeNonMandatoryIndices=False,
+                    includeInstancedIndices=False, useAlias=False, useFullAttributePath=False,
+                    useLongNames=False):
+        names = []
+        for attr, index in self._path:
+            name = attr.name if useLongNames else attr.short_name
+            if index is not None:
+                name = "%s[%d]" % (name, index)
+            names.append(name)
+        name = ".".join(names)
+        if includeNodeName:
+            name = "%s.%s" % (self._node.name, name)
+        return name
+
+    def name(self):
+        return self.partialName(includeNodeName=True)
+
+    def numChildren(self):
+        return len(self._path[-1][0].children)
+
+    def child(self, index):
+        attr = self._path[-1][0]
+        if not isinstance(index, int):
+            if index.parent is not attr:
+                raise RuntimeError("(kInvalidParameter): Attribute is not a child of this plug")
+            return MPlug(self._node, _path=self._path + ((index, None),))
+        return MPlug(self._node, _path=self._path + ((attr.children[index], None),))
+
+    def parent(self):
+        return MPlug(self._node, _path=self._path[:-1])
+
+    def array(self):
+        attr, index = self._path[-1]
+        return MPlug(self._node, _path=self._path[:-1] + ((attr, None),))
+
+    def _indices(self):
+        return self._node.elements.get(self._path, ())
+
+    def numElements(self):
+        return len(self._indices())
+
+    def numConnectedElements(self):
+        return 0
+
+    def getExistingArrayAttributeIndices(self):
+        return list(self._indices())
+
+    def elementByPhysicalIndex(self, index):
+        logical = self._indices()[index]
+        attr = self._path[-1][0]
+        return MPlug(self._node, _path=self._path[:-1] + ((attr, logical),))
+
+    def elementByLogicalIndex(self, index):
+        attr = self._path[-1][0]
+        return MPlug(self._node, _path=self._path[:-1] + ((attr, index),))
+
+    def logicalIndex(self):
+        return self._path[-1][1]
+
+    def isConnected(self):
+        return self in _SCENE.sources or self in _SCENE.destinations
+
+    @property
+    def isSource(self):
+        return bool(_SCENE.destinations.get(self))
+
+    @property
+    def isDestination(self):
+        return self in _SCENE.sources
+
+    def source(self):
+        return _SCENE.sources.get(self, MPlug())
+
+    def destinations(self):
+        return list(_SCENE.destinations.get(self, ()))
+
+    def connectedTo(self, asDst, asSrc):
+        plugs = []
+        if asDst and self in _SCENE.sources:
+            plugs.append(_SCENE.sources[self])
+        if asSrc:
+            plugs.extend(_SCENE.destinations.get(self, ()))
+        return plugs
+
+    def _value(self, context=None):
+        curve = self._node.animation.get(self._path)
+        if curve is not None:
+            _SCENE.evaluations += 1
+            return curve((context or _SCENE.context).getTime().value)
+        value = self._node.values.get(self._path)
+        if value is None:
+            value = self._path[-1][0].default
+        return value
+
+    def asBool(self, context=None):
+        return bool(self._value(context))
+
+    def asInt(self, context=None):
+        return int(self._value(context) or 0)
+
+    def asShort(self, context=None):
+        return int(self._value(context) or 0)
+
+    def asChar(self, context=None):
+        return int(self._value(context) or 0)
+
+    def asFloat(self, context=None):
+        return float(self._value(context) or 0.0)
+
+    def asDouble(self, context=None):
+        return float(self._value(context) or 0.0)
+
+    def asString(self):
+        return self._value() or ""
+
+    def asMDistance(self):
+        return MDistance(float(self._value() or 0.0))
+
+    def asMAngle(self):
+        return MAngle(float(self._value() or 0.0))
+
+    def asMTime(self):
+        return MTime(float(self._value() or 0.0))
+
+    def asMObject(self):
+        value = self._value()
+        if isinstance(value, MObject):
+            return value
+        attr = self._path[-1][0]
+        if attr.apiType() in (MFn.kMatrixAttribute, MFn.kFloatMatrixAttribute) or attr.data_type == MFnData.kMatrix:
+            return _Data(MFnData.kMatrix, value or MMatrix())
+        if value is None and attr.data_type != MFnData.kString:
+            raise RuntimeError("(kFailure): Unexpected Internal Failure")
+        return _Data(attr.data_type, value)
+
+    def _set(self, value):
+        self._node.store(self._path, value)
+
+    setBool = setInt = setShort = setFloat = setDouble = setString = setMObject = setMDistance = _set
+
+    def __eq__(self, other):
+        return isinstance(other, MPlug) and other._node is self._node and other._path == self._path
+
+    def __hash__(self):
+        return hash((id(self._node), self._path))
+
+
+def _check_attribute(node, attribute):
+    # 他のノード (タイプ) のアトリビュートでプラグを作ることはできない
+    if node.by_name.get(attribute.name) is not attribute:
+        raise RuntimeError("(kInvalidParameter): Attribute %s does not belong to node %s" % (attribute.name, node.name))
+
+
+# ---------------------------------------------------------------------------------- #
+# 関数セット
+# ---------------------------------------------------------------------------------- #
+class MFnBase(object):
+    def __init__(self, mObject=None):
+        self._object = None
+        if mObject is not None:
+            self.setObject(mObject)
+
+    def setObject(self, mObject):
+        self._object = mObject
+        return self
+
+    def object(self):
+        return self._object
+
+
+class MFnAttribute(MFnBase):
+    def setObject(self, mObject):
+        if not mObject.hasFn(MFn.kAttribute):
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+        self._object = mObject
+        return self
+
+    @property
+    def name(self):
+        return self._object.name
+
+    @property
+    def shortName(self):
+        return self._object.short_name
+
+    @property
+    def parent(self):
+        return self._object.parent
+
+    @property
+    def array(self):
+        return self._object.array
+
+    @property
+    def dynamic(self):
+        return self._object.dynamic
+
+
+class MFnNumericAttribute(MFnAttribute):
+    def setObject(self, mObject):
+        if not mObject.hasFn(MFn.kNumericAttribute):
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+        self._object = mObject
+        return self
+
+    def numericType(self):
+        return self._object.numeric_type
+
+    @property
+    def default(self):
+        return self._object.default
+
+
+class MFnTypedAttribute(MFnAttribute):
+    def setObject(self, mObject):
+        if not mObject.hasFn(MFn.kTypedAttribute):
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+        self._object = mObject
+        return self
+
+    def attrType(self):
+        return self._object.data_type
+
+
+class MFnEnumAttribute(MFnAttribute):
+    def fieldName(self, index):
+        return self._object.fields.get(index, "")
+
+    def getMin(self):
+        return min(self._object.fields) if self._object.fields else 0
+
+    def getMax(self):
+        return max(self._object.fields) if self._object.fields else 0
+
+    @property
+    def default(self):
+        return self._object.default or 0
+
+
+class MFnUnitAttribute(MFnAttribute):
+    @property
+    def default(self):
+        value = self._object.default or 0.0
+        api_type = self._object.apiType()
+        if api_type in (MFn.kDoubleAngleAttribute, MFn.kFloatAngleAttribute):
+            return MAngle(value)
+        if api_type == MFn.kTimeAttribute:
+            return MTime(value)
+        return MDistance(value)
+
+
+class MFnMatrixAttribute(MFnAttribute):
+    @property
+    def default(self):
+        return self._object.default if self._object.default is not None else MMatrix()
+
+
+class MFnCompoundAttribute(MFnAttribute):
+    def numChildren(self):
+        return len(self._object.children)
+
+    def child(self, index):
+        return self._object.children[index]
+
+
+class MFnMatrixData(MFnBase):
+    def matrix(self):
+        return self._object.value
+
+    def create(self, value):
+        self._object = _Data(MFnData.kMatrix, MMatrix(value))
+        return self._object
+
+
+class MFnIntArrayData(MFnBase):
+    def array(self):
+        return MIntArray(self._object.value)
+
+    def create(self, value):
+        self._object = _Data(MFnData.kIntArray, MIntArray(value))
+        return self._object
+
+
+class MFnDoubleArrayData(MFnBase):
+    def array(self):
+        return MDoubleArray(self._object.value)
+
+    def create(self, value):
+        self._object = _Data(MFnData.kDoubleArray, MDoubleArray(value))
+        return self._object
+
+
+class MFnComponentListData(MFnBase):
+    def create(self):
+        self._object = _Data(MFnData.kComponentList, [])
+        return self._object
+
+    def length(self):
+        return len(self._object.value)
+
+    def get(self, index):
+        return self._object.value[index]
+
+    def add(self, mObject):
+        self._object.value.append(mObject)
+        return self
+
+
+class _Component(MObject):
+    def __init__(self, api_type, component_type, elements=()):
+        super(_Component, self).__init__(api_type)
+        self.component_type = component_type
+        self.elements = list(elements)
+        self.complete = 0
+
+
+class MFnComponent(MFnBase):
+    @property
+    def isComplete(self):
+        return bool(self._object.complete)
+
+    @property
+    def componentType(self):
+        return self._object.component_type
+
+    def setCompleteData(self, count):
+        self._object.complete = count
+        return self
+
+    def getCompleteData(self):
+        return self._object.complete
+
+
+class MFnSingleIndexedComponent(MFnComponent):
+    def create(self, component_type):
+        self._object = _Component(component_type, component_type)
+        return self._object
+
+    def getElements(self):
+        if self._object.complete:
+            return MIntArray(range(self._object.complete))
+        return MIntArray(self._object.elements)
+
+    def addElements(self, elements):
+        self._object.elements.extend(elements)
+        return self
+
+    @property
+    def elementCount(self):
+        return self._object.complete or len(self._object.elements)
+
+
+class MFnDoubleIndexedComponent(MFnComponent):
+    def create(self, component_type):
+        self._object = _Component(component_type, component_type)
+        return self._object
+
+    def getElements(self):
+        if self._object.complete:
+            count_u, count_v = self._object.complete
+            return [(u, v) for u in range(count_u) for v in range(count_v)]
+        return list(self._object.elements)
+
+    def addElements(self, elements):
+        self._object.elements.extend(tuple(element) for element in elements)
+        return self
+
+
+class MFnDependencyNode(MFnBase):
+    def name(self):
+        return self._object.name
+
+    @property
+    def typeId(self):
+        return self._object.type_id
+
+    @property
+    def typeName(self):
+        return self._object.type_name
+
+    @property
+    def pluginName(self):
+        return self._object.plugin_name
+
+    def attributeCount(self):
+        return len(self._object.attributes)
+
+    def attribute(self, index):
+        if isinstance(index, str):
+            return self._object.by_name[index]
+        return self._object.attributes[index]
+
+    def hasAttribute(self, name):
+        return name in self._object.by_name
+
+    def findPlug(self, attribute, wantNetworkedPlug=True):
+        if isinstance(attribute, str):
+            attribute = self._object.by_name[attribute]
+        return MPlug(self._object, attribute)
+
+
+class MFnDagNode(MFnDependencyNode):
+    # MDagPath で初期化した場合のみワールド座標を扱える
+    _path = None
+
+    def _setPath(self, mObject):
+        if isinstance(mObject, MDagPath):
+            self._path = mObject
+            return mObject.node()
+        self._path = None
+        return mObject
+
+    def setObject(self, mObject):
+        mObject = self._setPath(mObject)
+        if not mObject.hasFn(MFn.kDagNode):
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+        self._object = mObject
+        return self
+
+    def getPath(self):
+        if self._path is not None:
+            return self._path
+        return MDagPath(self._object)
+
+
+class MFnMesh(MFnDagNode):
+    def setObject(self, mObject):
+        mObject = self._setPath(mObject)
+        if not (mObject.hasFn(MFn.kMesh) or mObject.hasFn(MFn.kMeshData)):
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+        self._object = mObject
+        return self
+
+    def _checkSpace(self, space):
+        # 偽のシーンには親の変換が無いため、ワールド座標はオブジェクト座標と同じ値になる
+        if space == MSpace.kWorld and self._path is None:
+            raise RuntimeError("(kInvalidParameter): Must have a DAG path to do world space transforms")
+
+    def _mesh(self):
+        if self._object.hasFn(MFn.kMeshData):
+            return self._object
+        return self._object.mesh
+
+    @property
+    def numVertices(self):
+        return self._object.vertex_count
+
+    @property
+    def numPolygons(self):
+        return len(self._mesh().counts)
+
+    @property
+    def numNormals(self):
+        return len(self._mesh().normals)
+
+    def getFloatPoints(self, space=MSpace.kObject):
+        self._checkSpace(space)
+        return MFloatPointArray(MFloatPoint(x, y, z) for x, y, z in self._mesh().points)
+
+    def getPoints(self, space=MSpace.kObject):
+        self._checkSpace(space)
+        return MPointArray(MPoint(x, y, z) for x, y, z in self._mesh().points)
+
+    def getNormals(self, space=MSpace.kObject):
+        self._checkSpace(space)
+        return MFloatVectorArray(MFloatVector(x, y, z) for x, y, z in self._mesh().normals)
+
+    def getVertices(self):
+        mesh = self._mesh()
+        return MIntArray(mesh.counts), MIntArray(mesh.connects)
+
+
+class MItGeometry(object):
+    def __init__(self, mDagPath):
+        self._node = mDagPath.node()
+
+    def count(self):
+        return self._node.vertex_count
+
+
+class MDagPath(object):
+    def __init__(self, node=None):
+        self._node = node
+
+    def node(self):
+        return self._node
+
+    def fullPathName(self):
+        return "|" + self._node.name
+
+    def partialPathName(self):
+        return self._node.name
+
+    def __eq__(self, other):
+        return isinstance(other, MDagPath) and other._node is self._node
+
+    def __hash__(self):
+        return hash(id(self._node))
+
+
+class MDagPathArray(list):
+    pass
+
+
+class MFnSkinCluster(MFnDependencyNode):
+    """maya.api.OpenMayaAnim.MFnSkinCluster"""
+    def setObject(self, mObject):
+        if not mObject.hasFn(MFn.kSkinClusterFilter):
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+        self._object = mObject
+        return self
+
+    def getPathAtIndex(self, index):
+        return MDagPath(self._object.output_shapes[index])
+
+    def getOutputGeometry(self):
+        return list(self._object.output_shapes)
+
+    def influenceObjects(self):
+        return MDagPathArray(MDagPath(joint) for joint in self._object.influences)
+
+    def indexForInfluenceObject(self, mDagPath):
+        return self._object.influences.index(mDagPath.node())
+
+    def getWeights(self, mDagPath, components, influence=None):
+        node = self._object
+        dense = node.dense_weights()
+        if influence is None:
+            return MDoubleArray(dense), len(node.influences)
+        if isinstance(influence, int):
+            return MDoubleArray(dense[influence::len(node.influences)])
+        stride = len(node.influences)
+        return MDoubleArray(dense[v * stride + j] for v in range(node.vertex_count) for j in influence)
+
+    def setWeights(self, mDagPath, components, influences, values, normalize=True, returnOldWeights=False):
+        node = self._object
+        influences = list(influences)
+        count = len(influences)
+        old = self.getWeights(mDagPath, components, influences) if returnOldWeights else None
+        weight_list = node.by_name["weightList"]
+        weights = node.by_name["weights"]
+        vertices = range(node.vertex_count) if not components.elements else components.elements
+        for row, v in enumerate(vertices):
+            element = ((weight_list, v), (weights, None))
+            existing = node.elements.setdefault(element, [])
+            for column, j in enumerate(influences):
+                w = values[row * count + column]
+                key = ((weight_list, v), (weights, j))
+                if w:
+                    node.values[key] = w
+                    if j not in existing:
+                        existing.append(j)
+                        existing.sort()
+                elif key in node.values:
+                    del node.values[key]
+                    existing.remove(j)
+        node._dense_weights = None
+        return old
+
+
+# ---------------------------------------------------------------------------------- #
+# モディファイヤー
+# ---------------------------------------------------------------------------------- #
+class MDGModifier(object):
+    def __init__(self):
+        self._operations = []
+        self._undo = []
+
+    def _new_value(self, mPlug, value):
+        self._operations.append((mPlug, value))
+        return self
+
+    newPlugValue = newPlugValueBool = newPlugValueInt = newPlugValueShort = _new_value
+    newPlugValueFloat = newPlugValueDouble = newPlugValueString = _new_value
+    newPlugValueMDistance = newPlugValueMAngle = newPlugValueMTime = _new_value
+
+    def connect(self, source, destination):
+        self._operations.append((_CONNECT, (MPlug(source), MPlug(destination))))
+        return self
+
+    def disconnect(self, source, destination):
+        self._operations.append((_DISCONNECT, (MPlug(source), MPlug(destination))))
+        return self
+
+    def removeMultiInstance(self, mPlug, breakConnections):
+        self._operations.append((_REMOVE, MPlug(mPlug)))
+        return self
+
+    def doIt(self):
+        self._undo = []
+        for mPlug, value in self._operations:
+            if mPlug is _CONNECT:
+                _SCENE.connect(*value)
+                self._undo.append((_DISCONNECT, value))
+                continue
+            if mPlug is _DISCONNECT:
+                _SCENE.disconnect(*value)
+                self._undo.append((_CONNECT, value))
+                continue
+            if mPlug is _REMOVE:
+                self._undo.append((_RESTORE, (value._node, value._node.remove(value._path))))
+                continue
+            node = mPlug._node
+            self._undo.append((mPlug, node.values.get(mPlug._path)))
+            if isinstance(value, (MDistance, MAngle, MTime)):
+                value = value.value
+            node.store(mPlug._path, value)
+        return self
+
+    def undoIt(self):
+        for mPlug, value in reversed(self._undo):
+            if mPlug is _CONNECT:
+                _SCENE.connect(*value)
+            elif mPlug is _DISCONNECT:
+                _SCENE.disconnect(*value)
+            elif mPlug is _RESTORE:
+                node, values = value
+                for key, item in values.items():
+                    node.store(key, item)
+            else:
+                mPlug._node.store(mPlug._path, value)
+        return self
+
+
+_CONNECT = object()
+_DISCONNECT = object()
+_REMOVE = object()
+_RESTORE = object()
+
+
+class MDagModifier(MDGModifier):
+    pass
+
+
+# ---------------------------------------------------------------------------------- #
+# コマンド
+# ---------------------------------------------------------------------------------- #
+class MArgList(object):
+    def __len__(self):
+        return 0
+
+
+class MPxCommand(object):
+    def isUndoable(self):
+        return False
+
+    def doIt(self, args):
+        pass
+
+    def redoIt(self):
+        pass
+
+    def undoIt(self):
+        pass
+
+
+class MFnPlugin(object):
+    def __init__(self, mObject=None, vendor="", version="", apiVersion="Any"):
+        self._plugin = mObject
+
+    def registerCommand(self, name, creator, syntax=None):
+        if name in _COMMANDS.creators:
+            raise RuntimeError("(kFailure): Command %s is already registered" % name)
+        _COMMANDS.creators[name] = creator
+        setattr(_COMMANDS.module, name, lambda *args, **kwargs: _COMMANDS.execute(name))
+
+    def deregisterCommand(self, name):
+        if _COMMANDS.creators.pop(name, None) is None:
+            raise RuntimeError("(kFailure): Command %s is not registered" % name)
+        delattr(_COMMANDS.module, name)
+
+
+class _Commands(object):
+    """プラグインコマンドの登録とアンドゥキュー (cmds.undo / cmds.redo)"""
+    def __init__(self):
+        self.module = None
+        self.creators = {}
+        self.plugins = {}
+        self.undo_queue = []
+        self.redo_queue = []
+
+    def execute(self, name):
+        command = self.creators[name]()
+        command.doIt(MArgList())
+        if command.isUndoable():
+            self.undo_queue.append(command)
+            del self.redo_queue[:]
+
+    def undo(self):
+        if self.undo_queue:
+            command = self.undo_queue.pop()
+            command.undoIt()
+            self.redo_queue.append(command)
+
+    def redo(self):
+        if self.redo_queue:
+            command = self.redo_queue.pop()
+            command.redoIt()
+            self.undo_queue.append(command)
+
+    def load_plugin(self, path, quiet=False):
+        import importlib.util
+        import os
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in self.plugins:
+            return [name]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.initializePlugin(MObject())
+        self.plugins[name] = module
+        return [name]
+
+    def unload_plugin(self, name, force=False):
+        import os
+        module = self.plugins.pop(os.path.splitext(os.path.basename(name))[0])
+        module.uninitializePlugin(MObject())
+
+    def plugin_info(self, name, query=True, loaded=False, version=False, **kwargs):
+        """cmds.pluginInfo 相当 (loaded と version の問い合わせのみ)"""
+        import os
+        if loaded:
+            return os.path.splitext(os.path.basename(name))[0] in self.plugins
+        return "1.0"
+
+
+_COMMANDS = _Commands()
+
+
+# ---------------------------------------------------------------------------------- #
+# メッセージ
+# ---------------------------------------------------------------------------------- #
+class MMessage(object):
+    _callbacks = {}
+    _next_id = [1]
+
+    @staticmethod
+    def removeCallback(callback_id):
+        node = MMessage._callbacks.pop(callback_id, None)
+        if node is not None:
+            node.callbacks[:] = [c for c in node.callbacks if c[0] != callback_id]
+
+    @staticmethod
+    def removeCallbacks(callback_ids):
+        for callback_id in callback_ids:
+            MMessage.removeCallback(callback_id)
+
+
+class MNodeMessage(MMessage):
+    kConnectionMade         = 0x01
+    kConnectionBroken       = 0x02
+    kAttributeEval          = 0x04
+    kAttributeSet           = 0x08
+    kAttributeLocked        = 0x10
+    kAttributeUnlocked      = 0x20
+    kAttributeAdded         = 0x40
+    kAttributeRemoved       = 0x80
+    kAttributeRenamed       = 0x100
+    kOtherPlugSet           = 0x4000
+    kAttributeArrayAdded    = 0x1000
+    kAttributeArrayRemoved  = 0x2000
+    kIncomingDirection      = 0x800
+
+    @staticmethod
+    def addAttributeChangedCallback(node, func, clientData=None):
+        callback_id = MMessage._next_id[0]
+        MMessage._next_id[0] += 1
+        node.callbacks.append((callback_id, func, clientData))
+        MMessage._callbacks[callback_id] = node
+        return callback_id
+
+
+class _CallbackList(object):
+    def __init__(self):
+        self.callbacks = []
+
+
+class MDGMessage(MMessage):
+    _connection_callbacks = _CallbackList()
+
+    @staticmethod
+    def addConnectionCallback(func, clientData=None):
+        callback_id = MMessage._next_id[0]
+        MMessage._next_id[0] += 1
+        MDGMessage._connection_callbacks.callbacks.append((callback_id, func, clientData))
+        MMessage._callbacks[callback_id] = MDGMessage._connection_callbacks
+        return callback_id
+
+
+class MObjectHandle(object):
+    def __init__(self, mObject=None):
+        self._object = mObject
+
+    def object(self):
+        return self._object
+
+    def hashCode(self):
+        return id(self._object) & 0xffffffff
+
+    def isValid(self):
+        return self._object is not None
+
+    def isAlive(self):
+        return self._object is not None
+
+
+# ---------------------------------------------------------------------------------- #
+# シーン
+# ---------------------------------------------------------------------------------- #
+class MSelectionList(object):
+    def __init__(self):
+        self._items = []
+
+    def add(self, item):
+        if isinstance(item, str):
+            nodes = _SCENE.ls(item)
+            if not nodes:
+                raise RuntimeError("(kInvalidParameter): Object does not exist")
+            self._items.extend(nodes)
+        else:
+            self._items.append(item)
+        return self
+
+    def length(self):
+        return len(self._items)
+
+    def getDependNode(self, index):
+        return self._items[index]
+
+    def getDagPath(self, index):
+        return MFnDagNode(self._items[index]).getPath()
+
+
+class MGlobal(object):
+    @staticmethod
+    def apiVersion():
+        return 20250000
+
+    @staticmethod
+    def getSelectionListByName(name):
+        sl = MSelectionList()
+        sl.add(name)
+        return sl
+
+
+class _Scene(object):
+    def __init__(self):
+        self.nodes = {}
+        self.sources = {}
+        self.destinations = {}
+        self.current_time = 1.0
+        self.context = MDGContext.kNormal
+        self.evaluations = 0
+
+    def clear(self):
+        self.nodes.clear()
+        self.sources.clear()
+        self.destinations.clear()
+        self.current_time = 1.0
+        self.context = MDGContext.kNormal
+
+    def connect(self, source, destination):
+        if destination in self.sources:
+            self.disconnect(self.sources[destination], destination)
+        self.sources[destination] = source
+        self.destinations.setdefault(source, []).append(destination)
+        self._notify(source, destination, True)
+
+    def disconnect(self, source, destination):
+        if self.sources.get(destination) != source:
+            raise RuntimeError("(kFailure): Plugs are not connected")
+        del self.sources[destination]
+        self.destinations[source].remove(destination)
+        if not self.destinations[source]:
+            del self.destinations[source]
+        self._notify(source, destination, False)
+
+    def _notify(self, source, destination, made):
+        for callback_id, func, client_data in list(MDGMessage._connection_callbacks.callbacks):
+            func(source, destination, made, client_data)
+        message = MNodeMessage.kConnectionMade if made else MNodeMessage.kConnectionBroken
+        for node, plug, other, direction in ((source._node, source, destination, 0),
+                                             (destination._node, destination, source, MNodeMessage.kIncomingDirection)):
+            for callback_id, func, client_data in list(node.callbacks):
+                func(message | direction | MNodeMessage.kOtherPlugSet, plug, other, client_data)
+
+    def list_connections(self, names, source=True, destination=True, connections=False, plugs=False):
+        """cmds.listConnections 相当"""
+        if isinstance(names, str):
+            names = [names]
+        nodes = set()
+        for name in names:
+            nodes.update(id(node) for node in self.ls(name))
+        pairs = []
+        if source:
+            pairs.extend((dst, src) for dst, src in self.sources.items() if id(dst._node) in nodes)
+        if destination:
+            pairs.extend((src, dst) for src, dsts in self.destinations.items() if id(src._node) in nodes
+                         for dst in dsts)
+        result = []
+        for own, other in pairs:
+            if connections:
+                result.append(own.partialName(includeNodeName=True, useLongNames=True))
+            result.append(other.partialName(includeNodeName=True, useLongNames=True) if plugs else other._node.name)
+        return result or None
+
+    def set_time(self, frame=None, query=False, update=True):
+        """cmds.currentTime 相当 (時間の変更でアニメーションしている全プラグを評価し直す)"""
+        if query or frame is None:
+            return self.current_time
+        self.current_time = frame
+        if update:
+            for node in self.nodes.values():
+                for curve in node.animation.values():
+                    self.evaluations += 1
+                    curve(frame)
+        return frame
+
+    def get_attr(self, plug_path):
+        """cmds.getAttr 相当 ("node.attr" のみ)"""
+        node_name, name = plug_path.split(".", 1)
+        node = self.nodes[node_name]
+        return MPlug(node, node.by_name[name]).asDouble()
+
+    def add(self, node):
+        self.nodes[node.name] = node
+        return node
+
+    def ls(self, pattern):
+        import fnmatch
+        if pattern in self.nodes:
+            return [self.nodes[pattern]]
+        return [node for name, node in self.nodes.items() if fnmatch.fnmatchcase(name, pattern)]
+
+
+_SCENE = _Scene()
+
+
+def clear_scene():
+    _SCENE.clear()
+    # Maya と同じく新しいシーンではアンドゥキューを空にする
+    del _COMMANDS.undo_queue[:]
+    del _COMMANDS.redo_queue[:]
+
+
+# ---------------------------------------------------------------------------------- #
+# 合成ノード
+# ---------------------------------------------------------------------------------- #
+# Maya と同じく同じタイプ (同じ構成) のノードはアトリビュートの MObject を共有する。
+# ノード毎に作ると、1つ目のノードで作った読み取り計画が2つ目以降のノードを読めない不具合が隠れる
+# (_Node の外のアトリビュートで MPlug を作ると RuntimeError になる)。
+_NODE_TYPE_ATTRIBUTES = {}
+
+def node_type_attributes(key, factory):
+    """ノードタイプ (key) のアトリビュート定義を作成済みなら共有し、無ければ factory() で作成する"""
+    attributes = _NODE_TYPE_ATTRIBUTES.get(key)
+    if attributes is None:
+        attributes = _NODE_TYPE_ATTRIBUTES[key] = factory()
+    return attributes
+
+
+def _numeric(name, short_name, numeric_type, default=0, array=False):
+    return _Attribute(MFn.kNumericAttribute, name, short_name, numeric_type=numeric_type,
+                      default=default, array=array)
+
+
+def _enum(name, short_name, fields, default=0):
+    return _Attribute(MFn.kEnumAttribute, name, short_name, fields=fields, default=default)
+
+
+def _matrix(name, short_name, array=False):
+    return _Attribute(MFn.kMatrixAttribute, name, short_name, array=array, default=MMatrix())
+
+
+def _typed(name, short_name, data_type, array=False):
+    default = [] if data_type in (MFnData.kIntArray, MFnData.kDoubleArray) else None
+    return _Attribute(MFn.kTypedAttribute, name, short_name, data_type=data_type, array=array, default=default)
+
+
+def _compound(name, short_name, children, array=False, api_type=MFn.kCompoundAttribute):
+    return _Attribute(api_type, name, short_name, children=children, array=array)
+
+
+# 追加アトリビュートの種類 (create_skin_cluster の extra_attribute_kinds)
+EXTRA_ATTRIBUTE_KINDS = ("double", "double3", "string", "matrix", "doubleArray")
+
+def _extra_attribute(kind, i):
+    name = "extraAttribute%d" % i
+    short_name = "xa%d" % i
+    if kind == "double":
+        return _numeric(name, short_name, MFnNumericData.kDouble)
+    if kind == "double3":
+        return _compound(name, short_name, [
+            _numeric(name + axis, short_name + axis.lower(), MFnNumericData.kDouble) for axis in "XYZ"])
+    if kind == "string":
+        return _typed(name, short_name, MFnData.kString)
+    if kind == "matrix":
+        return _typed(name, short_name, MFnData.kMatrix)
+    if kind == "doubleArray":
+        return _typed(name, short_name, MFnData.kDoubleArray)
+    raise ValueError("unknown attribute kind: %s" % kind)
+
+
+def _extra_attribute_value(kind, i, rand):
+    name = "extraAttribute%d" % i
+    if kind == "double3":
+        return [((name, None), (name + axis, None)) for axis in "XYZ"], [rand.random() for _ in "XYZ"]
+    if kind == "string":
+        value = "extra%d" % i
+    elif kind == "matrix":
+        value = MMatrix([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, rand.random(), rand.random(), rand.random(), 1])
+    elif kind == "doubleArray":
+        value = [rand.random() for _ in range(16)]
+    else:
+        value = rand.random()
+    return [((name, None),)], [value]
+
+
+def _skin_cluster_attributes(extra_attribute_count=0, extra_attribute_kinds=("double",)):
+    return node_type_attributes(("skinCluster", extra_attribute_count, tuple(extra_attribute_kinds)),
+                                lambda: _create_skin_cluster_attributes(extra_attribute_count, extra_attribute_kinds))
+
+
+def _create_skin_cluster_attributes(extra_attribute_count, extra_attribute_kinds):
+    attributes = [
+        _Attribute(MFn.kMessageAttribute, "message", "msg"),
+        _Attribute(MFn.kMessageAttribute, "caching", "cch"),
+        _enum("frozen", "fzn", {0: "off", 1: "on"}),
+        _numeric("isHistoricallyInteresting", "ihi", MFnNumericData.kByte, 2),
+        _enum("nodeState", "nds", {0: "Normal", 1: "HasNoEffect", 2: "Blocking"}),
+        _compound("input", "ip", [
+            _typed("inputGeometry", "ig", MFnData.kAny),
+            _numeric("groupId", "gi", MFnNumericData.kLong),
+        ], array=True),
+        _typed("outputGeometry", "og", MFnData.kAny, array=True),
+        _typed("originalGeometry", "orggeom", MFnData.kAny, array=True),
+        _numeric("envelope", "en", MFnNumericData.kFloat, 1.0),
+        _numeric("fchild1", "fc1", MFnNumericData.kLong),
+        _numeric("fchild2", "fc2", MFnNumericData.kLong),
+        _numeric("fchild3", "fc3", MFnNumericData.kLong),
+        _compound("weightList", "wl", [
+            _numeric("weights", "w", MFnNumericData.kDouble, array=True),
+        ], array=True),
+        _matrix("bindPreMatrix", "pm", array=True),
+        _matrix("geomMatrix", "gm"),
+        _matrix("matrix", "ma", array=True),
+        _numeric("dropoffRate", "dr", MFnNumericData.kDouble, array=True),
+        _numeric("dropoff", "dpf", MFnNumericData.kDouble, 4.0, array=True),
+        _numeric("smoothness", "smt", MFnNumericData.kDouble, array=True),
+        _numeric("lockWeights", "lw", MFnNumericData.kBoolean, array=True),
+        _numeric("maintainMaxInfluences", "mmi", MFnNumericData.kBoolean),
+        _numeric("maxInfluences", "mi", MFnNumericData.kLong, 5),
+        _enum("bindMethod", "bm", {0: "Closest distance", 1: "Closest in hierarchy", 2: "Heat map", 3: "Geodesic voxel"}, 1),
+        _typed("driverPoints", "drp", MFnData.kAny, array=True),
+        _typed("basePoints", "bp", MFnData.kAny, array=True),
+        _compound("basePointsTranslate", "bpt", [
+            _Attribute(MFn.kDoubleLinearAttribute, "basePointsTranslateX", "bptx", default=0.0),
+            _Attribute(MFn.kDoubleLinearAttribute, "basePointsTranslateY", "bpty", default=0.0),
+            _Attribute(MFn.kDoubleLinearAttribute, "basePointsTranslateZ", "bptz", default=0.0),
+        ], api_type=MFn.kAttribute3Double),
+        _typed("paintWeights", "ptw", MFnData.kDoubleArray),
+        _typed("paintTrans", "ptt", MFnData.kAny),
+        _typed("paintArrDirty", "pad", MFnData.kIntArray),
+        _numeric("useComponents", "uc", MFnNumericData.kBoolean),
+        _numeric("nurbsSamples", "ns", MFnNumericData.kLong, 10, array=True),
+        _numeric("useComponentsMatrix", "ucm", MFnNumericData.kBoolean),
+        _enum("normalizeWeights", "nw", {0: "None", 1: "Interactive", 2: "Post"}, 1),
+        _numeric("deformUserNormals", "dun", MFnNumericData.kBoolean, 1),
+        _enum("wtDrty", "wd", {0: "clean", 1: "dirty"}),
+        _numeric("relativeSpaceMode", "rsm", MFnNumericData.kBoolean),
+        _matrix("relativeSpaceMatrix", "rsmx"),
+        _enum("skinningMethod", "sm", {-1: "Inherit", 0: "Classic linear", 1: "Dual quaternion", 2: "Weight blended"}),
+        _numeric("perInfluenceVertexWeights", "piv", MFnNumericData.kBoolean, array=True),
+        _typed("blendWeights", "bw", MFnData.kDoubleArray),
+        _compound("influenceColor", "ifcl", [
+            _numeric("influenceColorR", "ifcr", MFnNumericData.kFloat),
+            _numeric("influenceColorG", "ifcg", MFnNumericData.kFloat),
+            _numeric("influenceColorB", "ifcb", MFnNumericData.kFloat),
+        ], array=True, api_type=MFn.kAttribute3Float),
+        _typed("cacheSetup", "cs", MFnData.kString),
+    ]
+    for i in range(extra_attribute_count):
+        attributes.append(_extra_attribute(extra_attribute_kinds[i % len(extra_attribute_kinds)], i))
+    return attributes
+
+
+def create_mesh_data(vertex_count):
+    """頂点を格子状に並べた四角形ポリゴンのメッシュデータを生成する"""
+    width = max(1, int(vertex_count ** 0.5))
+    points = [(float(i % width), 0.0, float(i // width)) for i in range(vertex_count)]
+    normals = [(0.0, 1.0, 0.0)] * vertex_count
+    counts = []
+    connects = []
+    for i in range(vertex_count):
+        x, z = i % width, i // width
+        if x + 1 < width and i + width + 1 < vertex_count:
+            counts.append(4)
+            connects.extend((i, i + width, i + width + 1, i + 1))
+    return _MeshData(points, normals, counts, connects)
+
+
+def create_skin_cluster(name="skinCluster1", vertex_count=100, influence_count=10,
+                        max_influences=4, extra_attribute_count=0, extra_attribute_kinds=("double",),
+                        extra_default_ratio=0.0, seed=0):
+    """スキンクラスターに似たノードを生成する
+
+    Args:
+        name (str): ノード名
+        vertex_count (int): 頂点数
+        influence_count (int): インフルエンス数
+        max_influences (int): 1頂点あたりの最大インフルエンス数
+        extra_attribute_count (int): 追加するアトリビュート数
+        extra_attribute_kinds (tuple): 追加するアトリビュートの種類 (EXTRA_ATTRIBUTE_KINDS から順に割り当てる)
+        extra_default_ratio (float): 値を設定せずに既定値のまま残す追加アトリビュートの割合
+        seed (int): 乱数シード
+
+    Returns:
+        _Node: ノード
+    """
+    import random
+    rand = random.Random(seed)
+
+    node = _Node(name, "skinCluster", 0x4653_4b43, MFn.kSkinClusterFilter,
+                 _skin_cluster_attributes(extra_attribute_count, extra_attribute_kinds))
+    node.vertex_count = vertex_count
+    node.influence_count = influence_count
+
+    shape = _Node("geo_%sShape" % name, "mesh", 0x444d_5348, MFn.kMesh, [])
+    shape.vertex_count = vertex_count
+    shape.mesh = create_mesh_data(vertex_count)
+    node.output_shapes = [_SCENE.add(shape)]
+    node.set((("input", 0), ("inputGeometry", None)), shape.mesh)
+    node.set((("outputGeometry", 0),), shape.mesh)
+    node.influences = [_SCENE.add(_Node("joint_%s_%d" % (name, j), "joint", 0x4a4f_494e, MFn.kJoint, []))
+                       for j in range(influence_count)]
+
+    for j in range(influence_count):
+        node.set((("matrix", j),), MMatrix([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, j, 0, 0, 1]))
+        node.set((("bindPreMatrix", j),), MMatrix([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, -j, 0, 0, 1]))
+        node.set((("lockWeights", j),), False)
+        node.set((("dropoff", j),), 4.0)
+        node.set((("influenceColor", j), ("influenceColorR", None)), rand.random())
+
+    weight_list = node.by_name["weightList"]
+    weights = node.by_name["weights"]
+    values = node.values
+    elements = node.elements
+    count = min(max_influences, influence_count)
+    for v in range(vertex_count):
+        joints = sorted(rand.sample(range(influence_count), count))
+        raw = [rand.random() + 1e-3 for _ in joints]
+        total = sum(raw)
+        elements.setdefault(((weight_list, None),), []).append(v)
+        elements[((weight_list, v), (weights, None))] = joints
+        for j, w in zip(joints, raw):
+            values[((weight_list, v), (weights, j))] = w / total
+
+    for i in range(extra_attribute_count):
+        if rand.random() < extra_default_ratio:
+            continue
+        paths, values = _extra_attribute_value(extra_attribute_kinds[i % len(extra_attribute_kinds)], i, rand)
+        for path, value in zip(paths, values):
+            node.set(path, value)
+
+    return _SCENE.add(node)
+
+
+def create_network(node_count=100, fan_in=2, cycle_count=0, prefix="network", seed=0):
+    """入力の配列と出力を持つノードを DAG 状に接続したネットワークを生成する
+
+    ノード i の input[k] には i より前のノードの output を接続する。
+    cycle_count の数だけ後ろのノードから前のノードへの接続を加えて循環を作る。
+
+    Returns:
+        list[_Node]: ノード
+    """
+    import random
+    rand = random.Random(seed)
+    attributes = node_type_attributes("network", lambda: [
+        _numeric("input", "i", MFnNumericData.kDouble, array=True),
+        _numeric("output", "o", MFnNumericData.kDouble),
+    ])
+    nodes = [_SCENE.add(_Node("%s%d" % (prefix, i), "network", 0x4e45_5457, MFn.kDependencyNode, attributes))
+             for i in range(node_count)]
+    output = attributes[1]
+    for i, node in enumerate(nodes[1:], 1):
+        for k, j in enumerate(rand.sample(range(i), min(fan_in, i))):
+            _SCENE.connect(MPlug(nodes[j], output), MPlug(node, _path=((attributes[0], k),)))
+    for c in range(cycle_count):
+        i, j = sorted(rand.sample(range(node_count), 2))
+        _SCENE.connect(MPlug(nodes[j], output), MPlug(nodes[i], _path=((attributes[0], fan_in + c),)))
+    return nodes
+
+
+def create_animated_controls(node_count=100, prefix="control", seed=0):
+    """translate / rotate をフレームの関数としてアニメーションさせたノードを生成する
+
+    Returns:
+        list[_Node]: ノード
+    """
+    import math
+    import random
+    rand = random.Random(seed)
+    attributes = node_type_attributes("transform", lambda: [
+        _numeric(name + axis, short_name + axis.lower(), MFnNumericData.kDouble)
+        for name, short_name in (("translate", "t"), ("rotate", "r")) for axis in "XYZ"])
+    nodes = []
+    for i in range(node_count):
+        node = _Node("%s%d" % (prefix, i), "transform", 0x5452_4e53, MFn.kTransform, attributes)
+        for attr in attributes:
+            amplitude, phase = rand.uniform(0.5, 10.0), rand.uniform(0.0, math.pi)
+            node.animate(((attr.name, None),),
+                         lambda frame, a=amplitude, p=phase: a * math.sin(frame * 0.1 + p))
+        nodes.append(_SCENE.add(node))
+    return nodes
+
+
+# ---------------------------------------------------------------------------------- #
+# シーンファイル
+# ---------------------------------------------------------------------------------- #
+# シーンファイルの代わりに create_skin_cluster の引数の一覧を JSON で保存する
+def save_scene(path, skin_clusters):
+    """シーンファイルを保存する
+
+    Args:
+        path (str): 保存先
+        skin_clusters (list[dict]): create_skin_cluster のキーワード引数の一覧
+    """
+    import json
+    with open(path, "w") as f:
+        json.dump({"skinClusters": list(skin_clusters)}, f)
+
+
+def open_scene(path):
+    """シーンを破棄してシーンファイルのノードを作成する"""
+    import json
+    with open(path) as f:
+        scene = json.load(f)
+    clear_scene()
+    for kwargs in scene.get("skinClusters", ()):
+        create_skin_cluster(**kwargs)
+    return path
+
+
+def _file(path=None, open=False, force=False, query=False, sceneName=False, **kwargs):
+    """cmds.file 相当 (open と sceneName の問い合わせのみ)"""
+    if open:
+        _SCENE.scene_name = open_scene(path)
+        return _SCENE.scene_name
+    if query and sceneName:
+        return getattr(_SCENE, "scene_name", "")
+    raise NotImplementedError("cmds.file: %r" % kwargs)
+
+
+# ---------------------------------------------------------------------------------- #
+# インストール
+# ---------------------------------------------------------------------------------- #
+def install():
+    """maya パッケージとして sys.modules に登録する
+
+    Returns:
+        module: maya.api.OpenMaya として登録したモジュール
+    """
+    this = sys.modules[__name__]
+    # 2回目以降は登録済みのモジュールを使う (import 済みの maya.cmds と登録したコマンドを保つ)
+    if sys.modules.get("maya.api.OpenMaya") is this:
+        return this
+    maya = types.ModuleType("maya")
+    api = types.ModuleType("maya.api")
+    cmds = types.ModuleType("maya.cmds")
+    mel = types.ModuleType("maya.mel")
+    om = types.ModuleType("maya.OpenMaya")
+    oma2 = types.ModuleType("maya.api.OpenMayaAnim")
+    oma2.MFnSkinCluster = MFnSkinCluster
+    omui2 = types.ModuleType("maya.api.OpenMayaUI")
+
+    cmds.pluginInfo = _COMMANDS.plugin_info
+    cmds.loadPlugin = _COMMANDS.load_plugin
+    cmds.unloadPlugin = _COMMANDS.unload_plugin
+    cmds.undo = _COMMANDS.undo
+    cmds.redo = _COMMANDS.redo
+    _COMMANDS.module = cmds
+    cmds.currentTime = _SCENE.set_time
+    cmds.file = _file
+    cmds.getAttr = _SCENE.get_attr
+    cmds.listConnections = lambda names=None, source=True, destination=True, connections=False, plugs=False, **kwargs: \
+        _SCENE.list_connections(names, source, destination, connections, plugs)
+
+    maya.api = api
+    maya.cmds = cmds
+    maya.mel = mel
+    maya.OpenMaya = om
+    api.OpenMaya = this
+    api.OpenMayaAnim = oma2
+    api.OpenMayaUI = omui2
+
+    sys.modules.update({
+        "maya": maya,
+        "maya.api": api,
+        "maya.cmds": cmds,
+        "maya.mel": mel,
+        "maya.OpenMaya": om,
+        "maya.api.OpenMaya": this,
+        "maya.api.OpenMayaAnim": oma2,
+        "maya.api.OpenMayaUI": omui2,
+    })
+    return this
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""シーンファイルをプロセスプールで並列にスナップショットする
+
+各ワーカーは Maya をヘッドレスで初期化した Python (mayapy) で、シーンを開いて
+_utils.py でノードを書き出し、シーン毎のシャード (.snap) を作る。
+すべてのシャードが揃ったら名前空間 "シーン名:" を付けて1つの .snap にまとめる。
+
+    mayapy _farm.py scenes/*.ma --output result --workers 8
+    python _farm.py --fake 64 --output /tmp/farm --workers 1 2 4 8
+"""
+
+import argparse
+import glob
+import inspect
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import _snapshot
+
+
+# ワーカープロセスで _init_worker が設定する
+cmds = None
+_utils = None
+
+
+# ---------------------------------------------------------------------------------- #
+# ワーカー
+# ---------------------------------------------------------------------------------- #
+def _init_worker(fake):
+    """ワーカープロセスの初期化 (Maya の初期化はプロセス毎に一度だけ行う)"""
+    global cmds, _utils
+    if fake:
+        import _fake_om2
+        _fake_om2.install()
+    else:
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+    import maya.cmds
+    import _utils as utils
+    cmds = maya.cmds
+    _utils = utils
+
+def _dump_scene(scene_path, shard_path, targets, options):
+    """シーンを開いて対象ノードをシャードに書き出す
+
+    書き込み途中のファイルは .part に書き、完了後に置き換える (中断しても壊れたシャードを残さない)。
+
+    Returns:
+        tuple: (シーンのパス, 書き込んだレコード数, 秒数, エラーメッセージ または None)
+    """
+    start = time.perf_counter()
+    part_path = shard_path + ".part"
+    try:
+        cmds.file(scene_path, open=True, force=True)
+        mSelectionList = _utils.get_selection_list(targets)
+        mObjects = [mSelectionList.getDependNode(i) for i in range(mSelectionList.length())]
+        count = 0
+        with _snapshot.BinaryWriter(part_path, **options) as writer:
+            for mObject in mObjects:
+                count += writer.write_records(_utils.iter_plug_records(mObject))
+        os.replace(part_path, shard_path)
+    except Exception as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return scene_path, 0, time.perf_counter() - start, "%s: %s" % (type(e).__name__, e)
+    return scene_path, count, time.perf_counter() - start, None
+
+
+# ---------------------------------------------------------------------------------- #
+# 実行
+# ---------------------------------------------------------------------------------- #
+def scene_key(scene_path):
+    """シーンファイルの名前を名前空間に使える文字列にする"""
+    name = os.path.splitext(os.path.basename(scene_path))[0]
+    return re.sub(r"\W", "_", name)
+
+def run(scene_files, output_dir, workers=None, targets="skinCluster*", fake=False, executable=None,
+        resume=True, merge=True, **options):
+    """シーンファイルをプロセスプールで並列にスナップショットしてまとめる
+
+    Args:
+        scene_files (list[str]): シーンファイル
+        output_dir (str): 出力先 (shards/ にシャード、merged.snap にまとめた結果)
+        workers (int): プロセス数 (None の場合は CPU 数)
+        targets (str | list): 各シーンで書き出すノード (get_selection_list を参照)
+        fake (bool): Maya の代わりに _fake_om2 を使う
+        executable (str): ワーカーの Python (mayapy のパス、None の場合はこのプロセスと同じ)
+        resume (bool): シャードが既にあるシーンは処理しない
+        merge (bool): シャードを1つの .snap にまとめる
+        **options: BinaryWriter に渡す引数 (compress, hash_name など)
+
+    Returns:
+        dict: 処理結果 {"files", "failed", "records", "seconds", "files_per_minute", "output"}
+              files は処理したシーンの数、files_per_minute は書き出しに成功したシーンだけで数える
+    """
+    # 引数の誤りはワーカーに渡す前に TypeError にする (シーン毎の失敗として扱わない)
+    inspect.signature(_snapshot.BinaryWriter).bind(None, **options)
+    
+    shard_dir = os.path.join(output_dir, "shards")
+    if not os.path.isdir(shard_dir):
+        os.makedirs(shard_dir)
+
+    # 同名のシーンは番号を付けて区別する
+    keys = []
+    used = set()
+    for scene_path in scene_files:
+        key = base = scene_key(scene_path)
+        i = 1
+        while key in used:
+            key = "%s_%d" % (base, i)
+            i += 1
+        used.add(key)
+        keys.append(key)
+    shards = [os.path.join(shard_dir, key + _snapshot.BINARY_EXTENSION) for key in keys]
+
+    context = multiprocessing.get_context("spawn")
+    if executable:
+        context.set_executable(executable)
+
+    start = time.perf_counter()
+    failed = {}
+    records = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(fake,)) as executor:
+        futures = [executor.submit(_dump_scene, scene_path, shard_path, targets, options)
+                   for scene_path, shard_path in zip(scene_files, shards)
+                   if not (resume and os.path.exists(shard_path))]
+        for future in as_completed(futures):
+            scene_path, count, seconds, error = future.result()
+            if error is not None:
+                print(u"書き出しに失敗しました:", scene_path, error)
+                failed[scene_path] = error
+            records += count
+    elapsed = time.perf_counter() - start
+
+    output = None
+    if merge:
+        # 処理の完了順ではなくシーンの順にまとめる
+        done = [(key, shard_path) for key, shard_path in zip(keys, shards) if os.path.exists(shard_path)]
+        output = os.path.join(output_dir, "merged" + _snapshot.BINARY_EXTENSION)
+        _snapshot.merge_snapshots([shard_path for _, shard_path in done], output,
+                                  prefixes=[key + ":" for key, _ in done], **options)
+
+    return {
+        "files":            len(futures),
+        "failed":           failed,
+        "records":          records,
+        "seconds":          elapsed,
+        "files_per_minute": (len(futures) - len(failed)) * 60.0 / elapsed if elapsed else 0.0,
+        "output":           output,
+    }
+
+
+# ---------------------------------------------------------------------------------- #
+# コマンドライン
+# ---------------------------------------------------------------------------------- #
+def _generate_fake_scenes(directory, count, vertex_count=2000, influence_count=20, extra_attribute_count=20):
+    import _fake_om2
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, "scene%04d.json" % i)
+        _fake_om2.save_scene(path, [
+            dict(name="skinCluster%d" % (j + 1), vertex_count=vertex_count, influence_count=influence_count,
+                 extra_attribute_count=extra_attribute_count, extra_attribute_kinds=_fake_om2.EXTRA_ATTRIBUTE_KINDS,
+                 seed=i * 10 + j)
+            for j in range(4)])
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenes", nargs="*", help="scene files (glob patterns allowed)")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--workers", type=int, nargs="+", default=[None],
+                        help="worker counts; several values run once per count and report files/min")
+    parser.add_argument("--targets", default="skinCluster*")
+    parser.add_argument("--executable", help="worker interpreter (path to mayapy)")
+    parser.add_argument("--compress", choices=sorted(_snapshot._CODECS))
+    parser.add_argument("--fake", type=int, metavar="COUNT",
+                        help="generate COUNT stand-in scenes and run with _fake_om2")
+    args = parser.parse_args()
+
+    scene_files = []
+    for pattern in args.scenes:
+        scene_files.extend(sorted(glob.glob(pattern)) or [pattern])
+    if args.fake:
+        scene_files.extend(_generate_fake_scenes(os.path.join(args.output, "scenes"), args.fake))
+    if not scene_files:
+        parser.error("no scene files")
+
+    for workers in args.workers:
+        output_dir = os.path.join(args.output, "workers%s" % (workers or os.cpu_count()))
+        result = run(scene_files, output_dir, workers=workers, targets=args.targets, fake=bool(args.fake),
+                     executable=args.executable, resume=False, compress=args.compress)
+        print("workers %-4s %6d files %10d records %8.2f s %8.1f files/min  failed %d" % (
+            workers or os.cpu_count(), result["files"], result["records"], result["seconds"],
+            result["files_per_minute"], len(result["failed"])))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
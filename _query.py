@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""スナップショットを Maya の外で調べるコマンドラインツール
+
+_snapshot だけを import し (Maya, Qt, numpy は読み込まない)、レコードは1件ずつ読み書きする。
+レコードは NDJSON と同じ1行1 JSON で出力するため、jq などにそのまま渡せる。
+
+    python _query.py nodes rig.snap
+    python _query.py get rig.snap skinCluster1.envelope skinCluster1.bindPreMatrix[3]
+    python _query.py query rig.snap "*.weightList" --paths
+    python _query.py convert rig.ndjson.gz rig.snap --compress zlib
+"""
+
+import argparse
+import re
+import sys
+
+import _snapshot
+
+
+def _write_line(out, text):
+    out.write(text.encode("utf-8") + b"\n")
+
+def _is_binary(path):
+    return path.endswith(_snapshot.BINARY_EXTENSION)
+
+
+# ---------------------------------------------------------------------------------- #
+# コマンド
+# ---------------------------------------------------------------------------------- #
+def cmd_nodes(args, out):
+    """ノード名を1行ずつ出力する"""
+    if _is_binary(args.snapshot):
+        with _snapshot.BinaryReader(args.snapshot, use_numpy=False) as reader:
+            for node_name in reader.nodes():
+                _write_line(out, node_name)
+        return 0
+
+    seen = set()
+    for plug_path, _, _ in _snapshot.iter_ndjson(args.snapshot):
+        node_name = plug_path.split(".", 1)[0]
+        if node_name not in seen:
+            seen.add(node_name)
+            _write_line(out, node_name)
+    return 0
+
+def cmd_get(args, out):
+    """プラグのパスを指定してレコードを出力する (見つからないパスがあれば終了コード 1)"""
+    missing = []
+    with _snapshot.NDJSONWriter(out) as writer:
+        if _is_binary(args.snapshot):
+            with _snapshot.BinaryReader(args.snapshot, use_numpy=False) as reader:
+                for plug_path in args.plugs:
+                    try:
+                        type_tag, value = reader.get(plug_path)
+                    except KeyError:
+                        missing.append(plug_path)
+                        continue
+                    writer.write(plug_path, type_tag, value)
+        else:
+            # NDJSON は索引が無いため1回の走査で指定されたパスをすべて探す
+            wanted = set(args.plugs)
+            # 配列の要素は "X[]" の型タグでまとめて書かれた配列のレコードからも探す (BinaryReader.get と同じ)
+            elements = {}
+            for plug_path in args.plugs:
+                array_path, logical_index = _snapshot._split_element(plug_path)
+                if array_path is not None:
+                    elements.setdefault(array_path, []).append((plug_path, logical_index))
+            for plug_path, type_tag, value in _snapshot.iter_ndjson(args.snapshot):
+                if plug_path in wanted:
+                    writer.write(plug_path, type_tag, value)
+                    wanted.discard(plug_path)
+                elif plug_path in elements and type_tag.endswith("[]"):
+                    for element_path, logical_index in elements[plug_path]:
+                        element = _snapshot._packed_element(value, logical_index)
+                        if element_path in wanted and element is not None:
+                            writer.write(element_path, type_tag[:-2], element)
+                            wanted.discard(element_path)
+                if not wanted:
+                    break
+            missing = [plug_path for plug_path in args.plugs if plug_path in wanted]
+    for plug_path in missing:
+        sys.stderr.write("not found: %s\n" % plug_path)
+    return 1 if missing else 0
+
+def cmd_query(args, out):
+    """パターンに一致するレコード (--paths の場合はパスだけ) を出力する"""
+    regex = _snapshot.glob_to_regex(args.pattern)
+    with _snapshot.NDJSONWriter(out) as writer:
+        if _is_binary(args.snapshot):
+            with _snapshot.BinaryReader(args.snapshot, use_numpy=False) as reader:
+                if args.paths:
+                    # 値を読まずにパス表だけを走査する
+                    for plug_path in reader.plugs(re.split(r"[*?]", args.pattern, 1)[0]):
+                        if regex.match(plug_path):
+                            _write_line(out, plug_path)
+                else:
+                    writer.write_records(reader.query(args.pattern))
+            return 0
+
+        for plug_path, type_tag, value in _snapshot.iter_ndjson(args.snapshot):
+            if regex.match(plug_path):
+                if args.paths:
+                    _write_line(out, plug_path)
+                else:
+                    writer.write(plug_path, type_tag, value)
+    return 0
+
+def cmd_convert(args, out):
+    """NDJSON と .snap を相互に変換する"""
+    kwargs = {}
+    if _is_binary(args.output):
+        kwargs = {"compress": args.compress, "hash_name": args.hash, "merkle": args.merkle}
+    count = _snapshot.convert_snapshot(args.snapshot, args.output, use_numpy=False, **kwargs)
+    sys.stderr.write("%d records -> %s\n" % (count, args.output))
+    return 0
+
+
+# ---------------------------------------------------------------------------------- #
+# コマンドライン
+# ---------------------------------------------------------------------------------- #
+def main(argv=None, out=None):
+    parser = argparse.ArgumentParser(description="inspect .snap / NDJSON snapshots without Maya")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    nodes = commands.add_parser("nodes", help="list node names")
+    nodes.add_argument("snapshot")
+    nodes.set_defaults(func=cmd_nodes)
+
+    get = commands.add_parser("get", help="print records by exact plug path (packed array elements too)")
+    get.add_argument("snapshot")
+    get.add_argument("plugs", nargs="+")
+    get.set_defaults(func=cmd_get)
+
+    query = commands.add_parser("query", help="print records matching a glob (* within a name, ** across names)")
+    query.add_argument("snapshot")
+    query.add_argument("pattern")
+    query.add_argument("--paths", action="store_true", help="print plug paths only")
+    query.set_defaults(func=cmd_query)
+
+    convert = commands.add_parser("convert", help="convert between NDJSON (.ndjson[.gz]) and binary (.snap)")
+    convert.add_argument("snapshot")
+    convert.add_argument("output")
+    convert.add_argument("--compress", choices=sorted(_snapshot._CODECS))
+    convert.add_argument("--hash", help="hashlib algorithm for block hashes (e.g. sha1)")
+    convert.add_argument("--merkle", action="store_true", help="store a Merkle tree for diff")
+    convert.set_defaults(func=cmd_convert)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args, out or sys.stdout.buffer)
+    except BrokenPipeError:
+        # head などで出力を途中で閉じられた場合
+        sys.stderr.close()
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
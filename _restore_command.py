@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""_utils.SnapshotRestore を Maya のアンドゥキューに載せるプラグイン
+
+_utils.execute_restore() が初回に cmds.loadPlugin で読み込むため、手動で読み込む必要は無い。
+コマンドの引数では Python のオブジェクトを渡せないため、適用する SnapshotRestore は
+_utils.execute_restore() が直前に預けたものを doIt で受け取る。
+"""
+
+import maya.api.OpenMaya as om2
+
+import _utils
+
+
+def maya_useNewAPI():
+    """om2 のプラグインであることを Maya に知らせる"""
+    pass
+
+
+class RestoreSnapshotCommand(om2.MPxCommand):
+    """預けられた SnapshotRestore を適用する (アンドゥ・リドゥは1ステップ)"""
+    kCommandName = _utils.RESTORE_COMMAND
+
+    def __init__(self):
+        om2.MPxCommand.__init__(self)
+        self._restore = None
+
+    @staticmethod
+    def creator():
+        return RestoreSnapshotCommand()
+
+    def isUndoable(self):
+        return self._restore is not None
+
+    def doIt(self, args):
+        self._restore = _utils.take_pending_restore()
+        if self._restore is None:
+            raise RuntimeError(u"%s は _utils.execute_restore() から呼び出してください" % self.kCommandName)
+        self._restore.doIt()
+
+    def redoIt(self):
+        self._restore.redoIt()
+
+    def undoIt(self):
+        self._restore.undoIt()
+
+
+def initializePlugin(mObject):
+    om2.MFnPlugin(mObject, "_utils", "1.0").registerCommand(RestoreSnapshotCommand.kCommandName,
+                                                            RestoreSnapshotCommand.creator)
+
+def uninitializePlugin(mObject):
+    om2.MFnPlugin(mObject).deregisterCommand(RestoreSnapshotCommand.kCommandName)
@@ -0,0 +1,667 @@
+# -*- coding: utf-8 -*-
+"""スキンウェイトの検査と加工 (numpy)
+
+_utils.get_skin_weights で取り出した (頂点数 x インフルエンス数) のウェイトを対象にする。
+Maya に依存しないため、スナップショットから読んだウェイトにもそのまま使える。
+どの関数も配列全体に対する numpy の演算1回分で済み、頂点ごとの Python のループは無い。
+
+ミラーとコピーは頂点座標の k-d tree で転写元の頂点を探し、
+逆距離または重心座標でウェイトを混ぜる (点群だけで動くため Maya なしで確認できる)。
+
+Example:
+    weights = _utils.get_skin_weights(mObject)
+    report = _skinweights.validate(weights, max_influences=4)
+    pruned = _skinweights.prune_top_k(weights, 4)
+    mirrored = _skinweights.mirror_weights(points, weights, weights["influences"], axis=0)
+"""
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+# ---------------------------------------------------------------------------------- #
+# 入力
+# ---------------------------------------------------------------------------------- #
+def as_dense(weights, shape=None):
+    """ウェイトを (頂点数, インフルエンス数) の float64 の ndarray にする
+
+    Args:
+        weights (dict | numpy.ndarray | array.array): get_skin_weights の結果 (密または CSR)、
+                                                      またはウェイトのバッファ
+        shape (tuple): バッファが1次元の場合の (頂点数, インフルエンス数)
+
+    Returns:
+        numpy.ndarray: ウェイト (コピーせずに済む場合は元のバッファを参照する)
+    """
+    if isinstance(weights, dict):
+        shape = tuple(weights["shape"])
+        if "weights" not in weights:
+            # CSR (indptr, indices, data)
+            dense = np.zeros(shape, dtype=np.float64)
+            indptr = np.asarray(weights["indptr"], dtype=np.int64)
+            rows = np.repeat(np.arange(shape[0]), np.diff(indptr))
+            dense[rows, np.asarray(weights["indices"], dtype=np.intp)] = weights["data"]
+            return dense
+        weights = weights["weights"]
+    dense = np.asarray(weights, dtype=np.float64)
+    if shape is not None:
+        dense = dense.reshape(shape)
+    if dense.ndim != 2:
+        raise ValueError(u"ウェイトの形状が (頂点数, インフルエンス数) ではありません: %s" % (dense.shape,))
+    return dense
+
+
+# ---------------------------------------------------------------------------------- #
+# 検査
+# ---------------------------------------------------------------------------------- #
+def sum_deviation(weights):
+    """頂点毎のウェイトの合計と 1.0 との差
+
+    Returns:
+        numpy.ndarray: (頂点数,) の float64
+    """
+    deviation = as_dense(weights).sum(axis=1)
+    deviation -= 1.0
+    return deviation
+
+def influence_counts(weights, threshold=0.0):
+    """頂点毎に threshold より大きいウェイトを持つインフルエンスの数
+
+    Returns:
+        numpy.ndarray: (頂点数,) の int64
+    """
+    return np.count_nonzero(as_dense(weights) > threshold, axis=1)
+
+def unused_influences(weights, threshold=0.0):
+    """どの頂点にも threshold より大きいウェイトを持たないインフルエンス
+
+    Returns:
+        numpy.ndarray: (インフルエンス数,) の bool (True が未使用)
+    """
+    return as_dense(weights).max(axis=0, initial=0.0) <= threshold
+
+def weight_histogram(weights, bins=10, ignore_zero=True):
+    """インフルエンス毎のウェイトのヒストグラム ([0, 1] を bins 等分する)
+
+    ビンの番号とインフルエンスの番号を1つの番号にまとめて bincount を1回だけ呼ぶ。
+
+    Args:
+        weights: as_dense を参照
+        bins (int): ビンの数
+        ignore_zero (bool): 0 のウェイトを数えない
+
+    Returns:
+        numpy.ndarray: (インフルエンス数, bins) の int64
+    """
+    dense = as_dense(weights)
+    influence_count = dense.shape[1]
+    flat = dense.ravel()
+    if ignore_zero:
+        # ウェイトはほとんどが 0 のため、先に 0 以外の要素だけを取り出す
+        index = np.flatnonzero(flat)
+        values = flat[index]
+        columns = index % influence_count
+    else:
+        values = flat
+        columns = np.tile(np.arange(influence_count, dtype=np.intp), dense.shape[0])
+    bin_index = np.clip((values * bins).astype(np.intp), 0, bins - 1)
+    bin_index += columns * bins
+    return np.bincount(bin_index, minlength=influence_count * bins).reshape(influence_count, bins)
+
+
+# ---------------------------------------------------------------------------------- #
+# 加工
+# ---------------------------------------------------------------------------------- #
+def normalize(weights, out=None):
+    """頂点毎の合計を 1.0 にする (合計が 0 の頂点はそのまま)
+
+    Args:
+        weights: as_dense を参照
+        out (numpy.ndarray): 結果を書き込む配列 (weights と同じものを渡すとその場で正規化する)
+
+    Returns:
+        numpy.ndarray: 正規化したウェイト
+    """
+    dense = as_dense(weights)
+    totals = dense.sum(axis=1, keepdims=True)
+    totals[totals == 0.0] = 1.0
+    return np.divide(dense, totals, out=out)
+
+def prune_top_k(weights, k, threshold=0.0, renormalize=True):
+    """頂点毎に大きい方から k 個のウェイトだけを残す
+
+    argpartition で上位 k 個を選ぶため、並べ替えはせずインフルエンス数に比例する。
+
+    Args:
+        weights: as_dense を参照
+        k (int): 残すインフルエンスの最大数
+        threshold (float): この値以下のウェイトは上位 k 個に入っていても 0 にする
+        renormalize (bool): 残したウェイトの合計を 1.0 にする
+
+    Returns:
+        numpy.ndarray: 新しいウェイト (入力は変更しない)
+    """
+    dense = as_dense(weights)
+    vertex_count, influence_count = dense.shape
+    pruned = np.zeros_like(dense)
+    if k > 0:
+        k = min(k, influence_count)
+        top = np.argpartition(dense, influence_count - k, axis=1)[:, influence_count - k:]
+        rows = np.arange(vertex_count)[:, None]
+        pruned[rows, top] = dense[rows, top]
+    if threshold > 0.0:
+        pruned[pruned <= threshold] = 0.0
+    if renormalize:
+        normalize(pruned, out=pruned)
+    return pruned
+
+
+# ---------------------------------------------------------------------------------- #
+# レポート
+# ---------------------------------------------------------------------------------- #
+def validate(weights, influences=None, max_influences=4, tolerance=1e-3, threshold=0.0, bins=10, limit=20):
+    """ウェイトを検査して JSON にできる dict を返す
+
+    Args:
+        weights: as_dense を参照 (get_skin_weights の結果の場合は influences も使う)
+        influences (list[str]): インフルエンス名 (省略時は weights["influences"] または番号)
+        max_influences (int): 1頂点あたりの最大インフルエンス数
+        tolerance (float): 合計と 1.0 との差の許容値
+        threshold (float): これより大きいウェイトを使用中とみなす
+        bins (int): ヒストグラムのビンの数
+        limit (int): 問題のある頂点番号を列挙する最大数
+
+    Returns:
+        dict: 頂点数, インフルエンス数, 合計の差, インフルエンス数の超過, 未使用インフルエンス, ヒストグラム
+    """
+    if influences is None and isinstance(weights, dict):
+        influences = weights.get("influences")
+    dense = as_dense(weights)
+    vertex_count, influence_count = dense.shape
+    if influences is None:
+        influences = [str(j) for j in range(influence_count)]
+
+    deviation = sum_deviation(dense)
+    bad_sums = np.flatnonzero(np.abs(deviation) > tolerance)
+    counts = influence_counts(dense, threshold)
+    over_limit = np.flatnonzero(counts > max_influences)
+    unused = unused_influences(dense, threshold)
+    histogram = weight_histogram(dense, bins)
+
+    return {
+        "vertex_count": int(vertex_count),
+        "influence_count": int(influence_count),
+        "sum_deviation": {
+            "max": float(np.abs(deviation).max(initial=0.0)),
+            "tolerance": tolerance,
+            "count": int(len(bad_sums)),
+            "vertices": bad_sums[:limit].tolist(),
+        },
+        "influences_per_vertex": {
+            "max": int(counts.max(initial=0)),
+            "limit": max_influences,
+            "count": int(len(over_limit)),
+            "vertices": over_limit[:limit].tolist(),
+            "distribution": np.bincount(counts, minlength=influence_count + 1).tolist(),
+        },
+        "unused_influences": [influences[j] for j in np.flatnonzero(unused)],
+        "histogram": {
+            "bins": bins,
+            "counts": dict((influences[j], histogram[j].tolist()) for j in range(influence_count)),
+        },
+        "ok": bool(len(bad_sums) == 0 and len(over_limit) == 0 and not unused.any()),
+    }
+
+
+# ---------------------------------------------------------------------------------- #
+# 空間インデックス
+# ---------------------------------------------------------------------------------- #
+class KDTree(object):
+    """点群の k 近傍探索
+
+    scipy がある場合は cKDTree を使い、無い場合は numpy だけで作った木を使う。
+    numpy の木は問い合わせ点を葉毎にまとめて処理する。
+    葉の中の k 番目の距離を半径として、その範囲と交わる葉だけを候補にするため結果は厳密な k 近傍になる。
+    点群から大きく離れた問い合わせ点は候補の葉が多くなるため遅くなる。
+
+    Args:
+        points (numpy.ndarray): (点の数, 3) の座標 (4列目以降は無視する)
+        leaf_size (int): 葉に入れる点の最大数
+        use_scipy (bool): False の場合は scipy があっても numpy の木を使う
+    """
+    # 一度に求める距離の数 (問い合わせ点 x 候補) の上限
+    kMaxPairs = 1 << 20
+
+    def __init__(self, points, leaf_size=64, use_scipy=True):
+        self.points = np.ascontiguousarray(np.asarray(points, dtype=np.float64)[:, :3])
+        if not len(self.points):
+            raise ValueError(u"点がありません")
+        self._tree = None
+        if use_scipy and cKDTree is not None:
+            self._tree = cKDTree(self.points, leafsize=leaf_size)
+            return
+        self._build(leaf_size)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, leaf_size):
+        points = self.points
+        order = np.arange(len(points))
+        split_dims = [-1]
+        split_values = [0.0]
+        children = [(-1, -1)]
+        ranges = [(0, len(points))]
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            start, end = ranges[node]
+            if end - start <= leaf_size:
+                continue
+            # 範囲の最も広い軸の中央値で分ける
+            segment = order[start:end]
+            block = points[segment]
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (start + end) // 2
+            order[start:end] = segment[np.argpartition(block[:, dim], mid - start)]
+            split_dims[node] = dim
+            split_values[node] = float(points[order[mid], dim])
+            left = len(ranges)
+            children[node] = (left, left + 1)
+            for child_range in ((start, mid), (mid, end)):
+                split_dims.append(-1)
+                split_values.append(0.0)
+                children.append((-1, -1))
+                ranges.append(child_range)
+            stack.extend((left, left + 1))
+        self._order = order
+        self._split_dims = split_dims
+        self._split_values = split_values
+        self._children = children
+        self._ranges = ranges
+
+    def _leaves(self, queries):
+        """各問い合わせ点が入る葉の番号"""
+        split_dims = np.array(self._split_dims, dtype=np.intp)
+        split_values = np.array(self._split_values, dtype=np.float64)
+        children = np.array(self._children, dtype=np.intp)
+        node = np.zeros(len(queries), dtype=np.intp)
+        active = np.arange(len(queries))
+        while len(active):
+            current = node[active]
+            dims = split_dims[current]
+            inner = dims >= 0
+            active, current, dims = active[inner], current[inner], dims[inner]
+            go_right = queries[active, dims] > split_values[current]
+            node[active] = children[current, go_right.astype(np.intp)]
+        return node
+
+    def _leaves_in_box(self, low, high):
+        """範囲 [low, high] と交わる葉の番号"""
+        split_dims = self._split_dims
+        split_values = self._split_values
+        children = self._children
+        leaves = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            dim = split_dims[node]
+            if dim < 0:
+                leaves.append(node)
+                continue
+            left, right = children[node]
+            if low[dim] <= split_values[node]:
+                stack.append(left)
+            if high[dim] >= split_values[node]:
+                stack.append(right)
+        return leaves
+
+    def _candidates(self, leaves):
+        order = self._order
+        ranges = self._ranges
+        if len(leaves) == 1:
+            start, end = ranges[leaves[0]]
+            return order[start:end]
+        return np.concatenate([order[ranges[leaf][0]:ranges[leaf][1]] for leaf in leaves])
+
+    def query(self, queries, k=1):
+        """k 近傍を探す
+
+        Args:
+            queries (numpy.ndarray): (問い合わせ数, 3) の座標
+            k (int): 探す点の数
+
+        Returns:
+            tuple: 距離 (問い合わせ数, k), 点の番号 (問い合わせ数, k) (距離の昇順)
+        """
+        queries = np.ascontiguousarray(np.asarray(queries, dtype=np.float64)[:, :3])
+        k = min(k, len(self.points))
+        if self._tree is not None:
+            distances, indices = self._tree.query(queries, k)
+            return distances.reshape(len(queries), k), indices.reshape(len(queries), k).astype(np.intp)
+        
+        distances = np.empty((len(queries), k), dtype=np.float64)
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        if not len(queries):
+            return distances, indices
+        leaves = self._leaves(queries)
+        query_order = np.argsort(leaves, kind="stable")
+        bounds = np.flatnonzero(np.diff(leaves[query_order])) + 1
+        points = self.points
+        for group in np.split(query_order, bounds):
+            candidates = self._candidates([leaves[group[0]]])
+            if len(candidates) < k:
+                self._query_block(queries, group, self._order, k, distances, indices)
+                continue
+            # 入った葉の k 番目の距離を半径にして、交わる葉をすべて候補にする
+            d2 = _squared_distances(queries[group], points[candidates])
+            radii = np.sqrt(np.partition(d2, k - 1, axis=1)[:, k - 1]) * (1.0 + 1e-9) + 1e-12
+            stack = [(group, radii)]
+            while stack:
+                group, radii = stack.pop()
+                block = queries[group]
+                candidates = self._candidates(self._leaves_in_box((block - radii[:, None]).min(axis=0),
+                                                                  (block + radii[:, None]).max(axis=0)))
+                if len(group) > 1 and len(group) * len(candidates) > self.kMaxPairs:
+                    # 問い合わせ点が広がっている (点群から離れている) 場合は広がりの大きい軸で分けて範囲を狭める
+                    dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+                    order = np.argsort(block[:, dim], kind="stable")
+                    half = len(order) // 2
+                    stack.append((group[order[:half]], radii[order[:half]]))
+                    stack.append((group[order[half:]], radii[order[half:]]))
+                    continue
+                self._query_block(queries, group, candidates, k, distances, indices)
+        return distances, indices
+
+    def _query_block(self, queries, group, candidates, k, distances, indices):
+        """候補の点から k 近傍を選んで distances, indices の group の行に書き込む"""
+        block = queries[group]
+        d2 = _squared_distances(block, self.points[candidates])
+        if k < len(candidates):
+            nearest = candidates[np.argpartition(d2, k - 1, axis=1)[:, :k]]
+        else:
+            nearest = np.broadcast_to(candidates, d2.shape)
+        diff = self.points[nearest] - block[:, None, :]
+        nearest_d2 = np.einsum("ijk,ijk->ij", diff, diff)
+        by_distance = np.argsort(nearest_d2, axis=1)
+        distances[group] = np.sqrt(np.take_along_axis(nearest_d2, by_distance, axis=1))
+        indices[group] = np.take_along_axis(nearest, by_distance, axis=1)
+
+
+def _squared_distances(a, b):
+    """(n, 3) と (m, 3) の点の距離の2乗 (n, m)
+
+    |a|^2 + |b|^2 - 2ab を行列積で求める (丸め誤差があるため選んだ点の距離は差分から求め直す)。
+    """
+    d2 = np.dot(a, -2.0 * b.T)
+    d2 += np.einsum("ij,ij->i", a, a)[:, None]
+    d2 += np.einsum("ij,ij->i", b, b)[None, :]
+    return np.maximum(d2, 0.0, out=d2)
+
+
+# ---------------------------------------------------------------------------------- #
+# 転写
+# ---------------------------------------------------------------------------------- #
+def triangulate(face_counts, face_connects):
+    """ポリゴンを扇形に三角形分割する
+
+    Args:
+        face_counts (buffer): ポリゴン毎の頂点数 (MFnMesh.getVertices の1つ目)
+        face_connects (buffer): ポリゴンの頂点番号 (MFnMesh.getVertices の2つ目)
+
+    Returns:
+        numpy.ndarray: (三角形の数, 3) の頂点番号
+    """
+    counts = np.asarray(face_counts, dtype=np.intp)
+    connects = np.asarray(face_connects, dtype=np.intp)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    triangle_counts = np.maximum(counts - 2, 0)
+    faces = np.repeat(np.arange(len(counts)), triangle_counts)
+    # ポリゴン内の三角形の番号 (0, 1, ...)
+    local = np.arange(len(faces)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts)
+    first = starts[faces]
+    return np.stack([connects[first], connects[first + local + 1], connects[first + local + 2]], axis=1)
+
+def inverse_distance_factors(distances, power=2.0, epsilon=1e-9):
+    """逆距離の混合比 (距離が epsilon 未満の点があればその点だけを使う)
+
+    Returns:
+        numpy.ndarray: (問い合わせ数, k) の行毎の合計が 1 の混合比
+    """
+    factors = 1.0 / np.maximum(distances, epsilon) ** power
+    exact = distances[:, 0] < epsilon
+    factors[exact] = 0.0
+    factors[exact, 0] = 1.0
+    factors /= factors.sum(axis=1, keepdims=True)
+    return factors
+
+def _barycentric(points, a, b, c):
+    """点を三角形 abc の平面に投影した重心座標 (負の成分は 0 にして合計を 1 にする)
+
+    Returns:
+        tuple: 重心座標 (..., 3), 重心座標から戻した点との距離の2乗 (退化した三角形は inf)
+    """
+    v0 = b - a
+    v1 = c - a
+    v2 = points - a
+    d00 = np.einsum("...i,...i", v0, v0)
+    d01 = np.einsum("...i,...i", v0, v1)
+    d11 = np.einsum("...i,...i", v1, v1)
+    d20 = np.einsum("...i,...i", v2, v0)
+    d21 = np.einsum("...i,...i", v2, v1)
+    denom = d00 * d11 - d01 * d01
+    degenerate = np.abs(denom) < 1e-18
+    denom = np.where(degenerate, 1.0, denom)
+    v = (d11 * d20 - d01 * d21) / denom
+    w = (d00 * d21 - d01 * d20) / denom
+    coords = np.maximum(np.stack([1.0 - v - w, v, w], axis=-1), 0.0)
+    total = coords.sum(axis=-1, keepdims=True)
+    coords = np.where(total > 0.0, coords / np.where(total > 0.0, total, 1.0), [1.0, 0.0, 0.0])
+    closest = coords[..., 0:1] * a + coords[..., 1:2] * b + coords[..., 2:3] * c
+    d2 = np.einsum("...i,...i", points - closest, points - closest)
+    return coords, np.where(degenerate, np.inf, d2)
+
+def _vertex_triangles(triangles, vertex_count):
+    """頂点を含む三角形の番号 (頂点数, 最大の数) (足りない分は -1)"""
+    vertices = triangles.ravel()
+    order = np.argsort(vertices, kind="stable")
+    counts = np.bincount(vertices, minlength=vertex_count)
+    table = np.full((vertex_count, max(int(counts.max(initial=0)), 1)), -1, dtype=np.intp)
+    starts = np.cumsum(counts) - counts
+    columns = np.arange(len(vertices)) - np.repeat(starts, counts)
+    table[vertices[order], columns] = order // 3
+    return table
+
+def barycentric_factors(source_points, target_points, indices, triangles=None):
+    """重心座標の混合比
+
+    triangles がある場合は最も近い頂点を含む三角形のうち最も近いものを使い、
+    無い場合は近い3頂点を三角形とみなす (退化している場合は最も近い頂点だけを使う)。
+
+    Args:
+        source_points (numpy.ndarray): 転写元の座標
+        target_points (numpy.ndarray): 転写先の座標
+        indices (numpy.ndarray): KDTree.query の点の番号 (問い合わせ数, k>=1 または k>=3)
+        triangles (numpy.ndarray): 転写元の三角形 (triangulate の結果)
+
+    Returns:
+        tuple: 転写元の頂点番号 (問い合わせ数, 3), 混合比 (問い合わせ数, 3)
+    """
+    source_points = np.asarray(source_points, dtype=np.float64)[:, :3]
+    target_points = np.asarray(target_points, dtype=np.float64)[:, :3]
+    if triangles is not None:
+        table = _vertex_triangles(triangles, len(source_points))
+        candidates = table[indices[:, 0]]
+        corners = triangles[np.maximum(candidates, 0)]
+        coords, d2 = _barycentric(target_points[:, None, :], source_points[corners[..., 0]],
+                                  source_points[corners[..., 1]], source_points[corners[..., 2]])
+        d2[candidates < 0] = np.inf
+        best = np.argmin(d2, axis=1)
+        rows = np.arange(len(target_points))
+        vertices, coords, d2 = corners[rows, best], coords[rows, best], d2[rows, best]
+    else:
+        vertices = indices[:, :3]
+        coords, d2 = _barycentric(target_points, *(source_points[vertices[:, i]] for i in range(3)))
+    # 三角形が見つからない (孤立した頂点, 退化した三角形) 場合は最も近い頂点だけを使う
+    missing = ~np.isfinite(d2)
+    if missing.any():
+        vertices = vertices.copy()
+        vertices[missing] = indices[missing, :1]
+        coords[missing] = [1.0, 0.0, 0.0]
+    return vertices, coords
+
+def blend_weights(weights, indices, factors, chunk_size=1 << 15):
+    """転写元のウェイトを混合比で混ぜる (chunk_size 行毎に処理してメモリを抑える)
+
+    Returns:
+        numpy.ndarray: (問い合わせ数, インフルエンス数)
+    """
+    dense = as_dense(weights)
+    result = np.zeros((len(indices), dense.shape[1]), dtype=np.float64)
+    for start in range(0, len(indices), chunk_size):
+        rows = slice(start, start + chunk_size)
+        for i in range(indices.shape[1]):
+            result[rows] += factors[rows, i, None] * dense[indices[rows, i]]
+    return result
+
+def transfer_weights(source_points, source_weights, target_points, k=4, method="inverse_distance",
+                     power=2.0, triangles=None, tree=None):
+    """転写元の頂点のウェイトを転写先の座標に転写する
+
+    Args:
+        source_points (numpy.ndarray): 転写元の座標 (頂点数, 3)
+        source_weights: 転写元のウェイト (as_dense を参照)
+        target_points (numpy.ndarray): 転写先の座標 (頂点数, 3)
+        k (int): 逆距離で混ぜる近傍の数
+        method (str): "inverse_distance" または "barycentric"
+        power (float): 逆距離の指数
+        triangles (numpy.ndarray): 転写元の三角形 (barycentric の場合、triangulate を参照)
+        tree (KDTree): 転写元の座標の木 (同じ転写元に繰り返し転写する場合)
+
+    Returns:
+        numpy.ndarray: 転写先のウェイト (頂点数, インフルエンス数)
+    """
+    if tree is None:
+        tree = KDTree(source_points)
+    if method == "inverse_distance":
+        distances, indices = tree.query(target_points, k)
+        factors = inverse_distance_factors(distances, power)
+    elif method == "barycentric":
+        distances, indices = tree.query(target_points, 1 if triangles is not None else 3)
+        indices, factors = barycentric_factors(tree.points, target_points, indices, triangles)
+    else:
+        raise ValueError(u"未対応の混合方法です: %s" % method)
+    return blend_weights(source_weights, indices, factors)
+
+
+# ---------------------------------------------------------------------------------- #
+# ミラー・コピー
+# ---------------------------------------------------------------------------------- #
+# "_" で区切ったインフルエンス名の左右の部分
+MIRROR_TOKENS = (("L", "R"), ("l", "r"), ("Left", "Right"), ("left", "right"), ("Lf", "Rt"), ("lf", "rt"))
+
+def mirror_name(name, tokens=MIRROR_TOKENS):
+    """インフルエンス名の左右を入れ替える ("arm_L" -> "arm_R", "LeftArm" -> "RightArm")"""
+    mapping = dict(tokens)
+    mapping.update((right, left) for left, right in tokens)
+    path, separator, short_name = name.rpartition("|")
+    parts = short_name.split("_")
+    swapped = "_".join(mapping.get(part, part) for part in parts)
+    if swapped == short_name:
+        for prefix in ("Left", "Right", "left", "right"):
+            if short_name.startswith(prefix):
+                swapped = mapping[prefix] + short_name[len(prefix):]
+                break
+    return path + separator + swapped
+
+def mirror_permutation(influences, tokens=MIRROR_TOKENS):
+    """左右のインフルエンスの対応 (対応する名前が無いインフルエンスは自身)
+
+    Returns:
+        numpy.ndarray: mirrored[:, j] = weights[:, permutation[j]] となる列の番号
+    """
+    index = dict((name, j) for j, name in enumerate(influences))
+    return np.array([index.get(mirror_name(name, tokens), j) for j, name in enumerate(influences)], dtype=np.intp)
+
+def mirror_weights(points, weights, influences=None, axis=0, plane=0.0, direction=1, tolerance=1e-4,
+                   method="inverse_distance", k=4, power=2.0, triangles=None, tokens=MIRROR_TOKENS):
+    """ウェイトを鏡映面の反対側へミラーする
+
+    direction 側 (と面上) の頂点を転写元とし、反対側の頂点を面で折り返した位置に転写する。
+    インフルエンスの列は mirror_permutation で左右を入れ替える。
+
+    Args:
+        points (numpy.ndarray): 頂点座標 (頂点数, 3)
+        weights: ウェイト (as_dense を参照)
+        influences (list[str]): インフルエンス名 (省略時は weights["influences"]、無ければ入れ替えない)
+        axis (int): 鏡映面の法線の軸 (0: X, 1: Y, 2: Z)
+        plane (float): 鏡映面の位置
+        direction (int): 1 の場合は + 側から - 側へ、-1 の場合は - 側から + 側へ
+        tolerance (float): 面上とみなす距離 (面上の頂点は変更しない)
+        method, k, power: transfer_weights を参照
+        triangles (numpy.ndarray): 三角形 (barycentric の場合)
+
+    Returns:
+        numpy.ndarray: ミラーしたウェイト (頂点数, インフルエンス数)
+    """
+    if influences is None and isinstance(weights, dict):
+        influences = weights.get("influences")
+    dense = as_dense(weights)
+    points = np.asarray(points, dtype=np.float64)[:, :3]
+    side = (points[:, axis] - plane) * direction
+    source = np.flatnonzero(side >= -tolerance)
+    target = np.flatnonzero(side < -tolerance)
+    result = dense.copy()
+    if not len(source) or not len(target):
+        return result
+    
+    mirrored = points[target].copy()
+    mirrored[:, axis] = 2.0 * plane - mirrored[:, axis]
+    if triangles is not None:
+        # 転写元の頂点だけで構成される三角形を転写元の番号に付け替える
+        remap = np.full(len(points), -1, dtype=np.intp)
+        remap[source] = np.arange(len(source))
+        triangles = remap[np.asarray(triangles, dtype=np.intp)]
+        triangles = triangles[(triangles >= 0).all(axis=1)]
+    transferred = transfer_weights(points[source], dense[source], mirrored, k=k, method=method, power=power,
+                                   triangles=triangles)
+    if influences is not None:
+        transferred = transferred[:, mirror_permutation(influences, tokens)]
+    result[target] = transferred
+    return result
+
+def copy_weights(source_points, source_weights, target_points, source_influences=None, target_influences=None,
+                 method="inverse_distance", k=4, power=2.0, triangles=None):
+    """別のメッシュへウェイトをコピーする
+
+    インフルエンスは名前で対応付け、転写先に無いインフルエンスのウェイトは除いて合計を 1 にする。
+
+    Args:
+        source_points (numpy.ndarray): 転写元の座標
+        source_weights: 転写元のウェイト (as_dense を参照)
+        target_points (numpy.ndarray): 転写先の座標
+        source_influences (list[str]): 転写元のインフルエンス名 (省略時は source_weights["influences"])
+        target_influences (list[str]): 転写先のインフルエンス名 (省略時は転写元と同じ並び)
+        method, k, power, triangles: transfer_weights を参照
+
+    Returns:
+        numpy.ndarray: 転写先のウェイト (頂点数, 転写先のインフルエンス数)
+    """
+    if source_influences is None and isinstance(source_weights, dict):
+        source_influences = source_weights.get("influences")
+    transferred = transfer_weights(source_points, source_weights, target_points, k=k, method=method,
+                                   power=power, triangles=triangles)
+    if target_influences is None or source_influences is None:
+        return transferred
+    
+    index = dict((name, j) for j, name in enumerate(target_influences))
+    result = np.zeros((len(transferred), len(target_influences)), dtype=np.float64)
+    for j, name in enumerate(source_influences):
+        column = index.get(name)
+        if column is not None:
+            result[:, column] += transferred[:, j]
+    return normalize(result, out=result)
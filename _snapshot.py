@@ -0,0 +1,1349 @@
+# -*- coding: utf-8 -*-
+"""_utils.py が出力するスナップショットの読み書き
+
+Maya に依存しないため、Maya 外のツールからもそのまま import できる。
+レコードは (プラグのパス, 型タグ, 値) のタプルで、プラグのパスは
+"skinCluster1.weightList[0].weights[3]" の形式。
+"""
+
+import array
+import bisect
+import collections
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import mmap
+import os
+import re
+import struct
+import zlib
+
+
+# ---------------------------------------------------------------------------------- #
+# NDJSON
+# ---------------------------------------------------------------------------------- #
+def _json_default(value):
+    """json が扱えない値 (MMatrix, MIntArray, array, numpy など) をリストに変換する
+
+    toDict を持つ値 (メッシュのハンドルなど) は toDict() の結果を書き出す。
+    """
+    toDict = getattr(value, "toDict", None)
+    if toDict is not None:
+        return toDict()
+    tolist = getattr(value, "tolist", None)
+    if tolist is not None:
+        return tolist()
+    try:
+        return list(value)
+    except TypeError:
+        return repr(value)
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+def _open(path, mode, compress=None):
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, mode)
+    return io.open(path, mode)
+
+
+class NDJSONWriter(object):
+    """レコードを1行1 JSON で逐次書き出す
+
+    バッファが buffer_size バイトを超えた時点で書き出すため、
+    ノードの大きさに関係なくメモリ使用量は一定に保たれる。
+
+    Example:
+        with NDJSONWriter("skinCluster1.ndjson.gz") as writer:
+            writer.write_records(_utils.iter_plug_records(mObject))
+    """
+    def __init__(self, path_or_file, compress=None, buffer_size=1 << 16):
+        if isinstance(path_or_file, str):
+            self._file = _open(path_or_file, "wb", compress)
+            self._owns_file = True
+        else:
+            self._file = path_or_file
+            self._owns_file = False
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._buffer_size = buffer_size
+        self.record_count = 0
+        self.byte_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, plug_path, type_tag, value):
+        """レコードを1つ書き込む"""
+        line = _ENCODER.encode({"plug": plug_path, "type": type_tag, "value": value}).encode("utf-8") + b"\n"
+        self._buffer.append(line)
+        self._buffer_bytes += len(line)
+        self.record_count += 1
+        if self._buffer_bytes >= self._buffer_size:
+            self.flush()
+
+    def write_records(self, records):
+        """(プラグのパス, 型タグ, 値) のイテラブルを書き込む
+
+        Returns:
+            int: 書き込んだレコード数
+        """
+        count = 0
+        write = self.write
+        for plug_path, type_tag, value in records:
+            write(plug_path, type_tag, value)
+            count += 1
+        return count
+
+    def flush(self):
+        if self._buffer:
+            data = b"".join(self._buffer)
+            self._file.write(data)
+            self.byte_count += len(data)
+            self._buffer = []
+            self._buffer_bytes = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+        self._file = None
+
+
+def iter_ndjson(path_or_file, compress=None):
+    """NDJSON を1行ずつ読み込みレコードを返す
+
+    Yields:
+        tuple: (プラグのパス, 型タグ, 値)
+    """
+    if isinstance(path_or_file, str):
+        f = _open(path_or_file, "rb", compress)
+    else:
+        f = path_or_file
+    try:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record["plug"], record["type"], record["value"]
+    finally:
+        if f is not path_or_file:
+            f.close()
+
+
+# ---------------------------------------------------------------------------------- #
+# バイナリ (列形式)
+# ---------------------------------------------------------------------------------- #
+# ファイル構成:
+#   ヘッダー (32 バイト)   magic, version, インデックスの位置とサイズ
+#   データブロック         型付きの連続バッファ (16 バイト境界に整列)
+#   レコード領域           1行1レコードの JSON
+#   パス表                 プラグのパスの昇順 (パスの位置と長さ, レコードの位置と長さ)
+#   インデックス (JSON)    各領域の位置とブロック表
+#
+# レコードの値に含まれるバッファは {"$block": ブロック番号, "$desc": ブロックの記述} に置き換え、
+# 読み込み時は mmap 上のブロックを numpy.frombuffer (numpy が無い場合は memoryview) で
+# コピーせずに参照する。問い合わせたブロックのページだけが読み込まれる。
+#
+# 開く時にはパス表を読み込まず、mmap 上で二分探索するためレコード数に関係なく
+# 1プラグの読み込みは数マイクロ秒で済む。ブロック表は blockHash と verify の時だけ読み込む。
+#
+# 圧縮 (zlib / lzma) とハッシュはブロックを chunk_size 毎のチャンクに分けてスレッドプールで計算し
+# (どちらも GIL を解放する)、書き込みは元の順序で行う。ブロック表の5番目の要素にチャンクの位置とハッシュを格納する。
+#   [dtype, offset, size, shape, {"codec", "chunks": [[offset, size, raw_size], ...], "hash", "chunk_hashes"}]
+# 圧縮したブロックは読み込み時に展開するためコピーになる。
+# 書き出し側と同じ BINARY_VERSION 以外のファイルは開かない。
+
+BINARY_MAGIC = b"USNP"
+BINARY_VERSION = 3
+BINARY_EXTENSION = ".snap"
+
+_HEADER = struct.Struct("<4sHHQQ8x")
+_PATH_ENTRY = struct.Struct("<QIQI")
+# これより小さいブロックはスレッドプールを使わずに圧縮する
+_INLINE_CHUNK_SIZE = 1 << 14
+_ALIGNMENT = 16
+
+# array の型コード -> numpy の dtype 文字列
+_TYPECODE_DTYPES = {
+    "b": "|i1",
+    "B": "|u1",
+    "h": "<i2",
+    "H": "<u2",
+    "i": "<i4",
+    "I": "<u4",
+    "l": "<i%d" % array.array("l").itemsize,
+    "L": "<u%d" % array.array("L").itemsize,
+    "q": "<i8",
+    "Q": "<u8",
+    "f": "<f4",
+    "d": "<f8",
+}
+# 圧縮方式 -> (圧縮, 展開)
+_CODECS = {
+    "zlib": (lambda data, level: zlib.compress(data, 6 if level is None else level), zlib.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=6 if level is None else level), lzma.decompress),
+}
+
+# numpy の dtype 文字列 -> memoryview.cast の書式
+_DTYPE_FORMATS = {
+    "|i1": "b", "|u1": "B", "|b1": "?",
+    "<i2": "h", "<u2": "H",
+    "<i4": "i", "<u4": "I",
+    "<i8": "q", "<u8": "Q",
+    "<f4": "f", "<f8": "d",
+}
+
+
+def _as_block(value):
+    """値をブロックとして書けるバッファに変換する
+
+    Returns:
+        tuple: (bytes 互換オブジェクト, dtype 文字列, shape) または None
+    """
+    if isinstance(value, array.array):
+        return memoryview(value).cast("B"), _TYPECODE_DTYPES[value.typecode], [len(value)]
+    
+    if isinstance(value, memoryview):
+        return value.cast("B"), _TYPECODE_DTYPES[value.format], list(value.shape)
+    
+    dtype = getattr(value, "dtype", None)
+    if dtype is not None and hasattr(value, "tobytes"):
+        if dtype.hasobject:
+            return None
+        if dtype.byteorder == ">":
+            value = value.astype(dtype.newbyteorder("<"))
+        import numpy
+        value = numpy.ascontiguousarray(value)
+        return memoryview(value).cast("B"), value.dtype.str, list(value.shape)
+    
+    if isinstance(value, (str, bytes, dict, list, tuple, int, float, bool)) or value is None:
+        return None
+    
+    # MMatrix, MIntArray など数値のシーケンス
+    try:
+        items = list(value)
+    except TypeError:
+        return None
+    if items and all(isinstance(item, int) and not isinstance(item, bool) for item in items):
+        buffer = array.array("q", items) if max(map(abs, items)) >= 1 << 31 else array.array("i", items)
+    elif items and all(isinstance(item, (int, float)) for item in items):
+        buffer = array.array("d", items)
+    else:
+        return None
+    return _as_block(buffer)
+
+
+def _pack_chunk(data, codec, level, hash_name):
+    """チャンクを圧縮してハッシュを計算する (スレッドプールで実行する)
+
+    Returns:
+        tuple: (書き込むデータ, ハッシュの16進文字列 または None)
+    """
+    digest = hashlib.new(hash_name, data).hexdigest() if hash_name else None
+    if codec is not None:
+        data = _CODECS[codec][0](data, level)
+    return data, digest
+
+
+# NDJSON から読んだリストをバッファに戻す時の array 型コード
+# 型タグ -> 値がリストの場合の型コード
+_TAG_TYPECODES = {
+    "matrix":       "d",
+    "doubleArray":  "d",
+    "intArray":     "i",
+    "double2":      "d",
+    "double3":      "d",
+    "double4":      "d",
+    "float2":       "f",
+    "float3":       "f",
+    "long2":        "i",
+    "long3":        "i",
+    "short2":       "h",
+    "short3":       "h",
+}
+# "X[]" の要素の型タグ -> values の型コード
+_PACKED_TYPECODES = {
+    "bool":     "B",
+    "byte":     "B",
+    "short":    "h",
+    "long":     "i",
+    "float":    "f",
+    "double":   "d",
+    "matrix":   "d",
+}
+# dict の値 (スキンウェイト, メッシュ) のキー -> 型コード
+_FIELD_TYPECODES = {
+    "weights":          "d",
+    "indptr":           "q",
+    "indices":          "i",
+    "data":             "d",
+    "points":           "f",
+    "normals":          "f",
+    "face_counts":      "i",
+    "face_connects":    "i",
+}
+
+def _list_to_buffer(items, typecode):
+    """数値のリスト (入れ子の場合は各階層の長さが揃っていること) を array / 多次元の memoryview にする"""
+    shape = []
+    probe = items
+    while isinstance(probe, list):
+        shape.append(len(probe))
+        probe = probe[0] if probe else None
+    if len(shape) == 1:
+        return array.array(typecode, items)
+    buffer = array.array(typecode, _as_numbers(items))
+    if 0 in shape:
+        return buffer
+    return memoryview(buffer).cast("B").cast(typecode, shape)
+
+def json_to_buffers(type_tag, value):
+    """NDJSON から読んだ値のリストを型タグに応じてバッファに戻す (BinaryWriter でブロックにするため)
+
+    型の分からないリストはそのまま返す。
+    """
+    if isinstance(value, list):
+        typecode = _TAG_TYPECODES.get(type_tag)
+        if typecode is not None:
+            return _list_to_buffer(value, typecode)
+        return value
+    if not isinstance(value, dict):
+        return value
+    if type_tag.endswith("[]") and type_tag[:-2] in _PACKED_TYPECODES:
+        return {"indices": array.array("i", value["indices"]),
+                "values": array.array(_PACKED_TYPECODES[type_tag[:-2]], value["values"])}
+    converted = {}
+    for key, item in value.items():
+        typecode = _FIELD_TYPECODES.get(key)
+        converted[key] = _list_to_buffer(item, typecode) if typecode is not None and isinstance(item, list) else item
+    return converted
+
+
+class _Packed(object):
+    """処理済みのチャンク (Future と同じく done / result で結果を返す)"""
+    __slots__ = ("_result",)
+
+    def __init__(self, result):
+        self._result = result
+
+    def done(self):
+        return True
+
+    def result(self):
+        return self._result
+
+
+class BinaryWriter(object):
+    """レコードを列形式のバイナリに逐次書き出す
+
+    データブロックは書き込み時にそのままファイルへ出力し、
+    メモリ上にはインデックスだけを保持する。
+
+    compress か hash_name を指定した場合はブロックをチャンクに分けてスレッドプールで
+    圧縮とハッシュ計算を行う。処理中のチャンクは workers * 4 個までに制限する。
+
+    Args:
+        path_or_file (str | file): 出力先
+        compress (str): "zlib" または "lzma" (True の場合は "zlib")
+        level (int): 圧縮レベル
+        hash_name (str): hashlib のアルゴリズム名 ("sha1", "blake2b" など)
+        chunk_size (int): チャンクの最大バイト数
+        workers (int): スレッド数 (None の場合は CPU 数)
+        merkle (bool): True の場合は MerkleTree を計算して保存する (diff で使う)
+    """
+    def __init__(self, path_or_file, compress=None, level=None, hash_name=None, chunk_size=1 << 20,
+                 workers=None, merkle=False):
+        if isinstance(path_or_file, str):
+            self._file = io.open(path_or_file, "wb")
+            self._owns_file = True
+        else:
+            self._file = path_or_file
+            self._owns_file = False
+        if compress is True:
+            compress = "zlib"
+        if compress and compress not in _CODECS:
+            raise ValueError(u"未対応の圧縮方式です: %s" % compress)
+        self._codec = compress or None
+        self._level = level
+        self._hash_name = hash_name
+        self._chunk_size = chunk_size
+        self._executor = None
+        self._pending = collections.deque()
+        self._max_pending = 0
+        if self._codec or self._hash_name:
+            workers = workers or os.cpu_count() or 1
+            # concurrent.futures は読み込みに時間がかかるため、使う時だけ import する (_query の起動時間)
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._max_pending = workers * 4
+        self.merkle = MerkleTree(keep_values=False) if merkle else None
+        self._blocks = []
+        self._placeholders = []
+        self._records = []
+        self._file.write(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, 0, 0))
+        self._offset = _HEADER.size
+        self.record_count = 0
+        self.byte_count = _HEADER.size
+        self.raw_byte_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _align(self):
+        padding = -self._offset % _ALIGNMENT
+        if padding:
+            self._file.write(b"\0" * padding)
+            self._offset += padding
+
+    def _write_block(self, data, dtype, shape):
+        self.raw_byte_count += data.nbytes
+        if self._executor is None:
+            self._align()
+            self._file.write(data)
+            self._blocks.append([dtype, self._offset, data.nbytes, shape])
+            self._offset += data.nbytes
+            return self._placeholder()
+        
+        # 位置は書き込み時に決まるため、ここではチャンクの処理を投入するだけ
+        entry = [dtype, 0, data.nbytes, shape, {"codec": self._codec}]
+        self._blocks.append(entry)
+        if data.nbytes < _INLINE_CHUNK_SIZE:
+            # 小さいブロックはスレッドプールに渡す手間の方が大きいためこのスレッドで処理する
+            futures = [_Packed(_pack_chunk(data, self._codec, self._level, self._hash_name))]
+        else:
+            futures = [self._executor.submit(_pack_chunk, data[start:start + self._chunk_size],
+                                             self._codec, self._level, self._hash_name)
+                       for start in range(0, data.nbytes, self._chunk_size)]
+        self._pending.append((entry, futures))
+        self._drain(self._max_pending)
+        return self._placeholder()
+
+    def _placeholder(self):
+        # ブロックの位置は書き込み完了まで決まらないため、close で記述を埋め込む
+        placeholder = {"$block": len(self._blocks) - 1}
+        self._placeholders.append(placeholder)
+        return placeholder
+
+    def _drain(self, limit=0):
+        """処理済みのブロックを投入順に書き込む (limit を超えている分は完了を待つ)"""
+        while self._pending:
+            entry, futures = self._pending[0]
+            if len(self._pending) <= limit and not all(future.done() for future in futures):
+                break
+            self._pending.popleft()
+            self._align()
+            entry[1] = self._offset
+            chunks = []
+            digests = []
+            for future, start in zip(futures, range(0, max(entry[2], 1), self._chunk_size)):
+                data, digest = future.result()
+                self._file.write(data)
+                chunks.append([self._offset, len(data), min(self._chunk_size, entry[2] - start)])
+                digests.append(digest)
+                self._offset += len(data)
+            info = entry[4]
+            if self._codec:
+                info["chunks"] = chunks
+                entry[2] = self._offset - entry[1]
+            if self._hash_name:
+                # 複数チャンクのブロックはチャンクのハッシュを連結したもののハッシュにする
+                info["hash"] = digests[0] if len(digests) == 1 else \
+                    hashlib.new(self._hash_name, "".join(digests).encode("ascii")).hexdigest()
+                info["hash_name"] = self._hash_name
+                if len(digests) > 1:
+                    info["chunk_size"] = self._chunk_size
+                    info["chunk_hashes"] = digests
+
+    def _encode(self, value):
+        if isinstance(value, dict):
+            return dict((str(key), self._encode(item)) for key, item in value.items())
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        block = _as_block(value)
+        if block is not None:
+            return self._write_block(*block)
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return value
+        toDict = getattr(value, "toDict", None)
+        if toDict is not None:
+            return self._encode(toDict())
+        return _json_default(value)
+
+    def write(self, plug_path, type_tag, value):
+        """レコードを1つ書き込む"""
+        if self.merkle is not None:
+            self.merkle.add(plug_path, type_tag, value)
+        self._records.append([plug_path, type_tag, self._encode(value)])
+        self.record_count += 1
+
+    def write_records(self, records):
+        count = 0
+        write = self.write
+        for plug_path, type_tag, value in records:
+            write(plug_path, type_tag, value)
+            count += 1
+        return count
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._executor is not None:
+            self._drain()
+            self._executor.shutdown()
+            self._executor = None
+        for placeholder in self._placeholders:
+            placeholder["$desc"] = self._blocks[placeholder["$block"]]
+        
+        # レコード領域 (1行1レコード)
+        self._align()
+        record_offset = self._offset
+        entries = []
+        for record in self._records:
+            line = _ENCODER.encode(record).encode("utf-8") + b"\n"
+            entries.append((record[0].encode("utf-8"), self._offset, len(line) - 1))
+            self._file.write(line)
+            self._offset += len(line)
+        record_size = self._offset - record_offset
+        
+        # パス表 (パスの昇順)
+        entries.sort(key=lambda entry: entry[0])
+        path_offset = self._offset
+        for path, _, _ in entries:
+            self._file.write(path)
+        self._offset += sum(len(entry[0]) for entry in entries)
+        self._align()
+        table_offset = self._offset
+        position = path_offset
+        for path, offset, size in entries:
+            self._file.write(_PATH_ENTRY.pack(position, len(path), offset, size))
+            position += len(path)
+        self._offset += _PATH_ENTRY.size * len(entries)
+        
+        # ブロック表は blockHash / verify でのみ使うため別の領域にする
+        blocks = _ENCODER.encode(self._blocks).encode("utf-8")
+        block_offset = self._offset
+        self._file.write(blocks)
+        self._offset += len(blocks)
+        
+        sections = {
+            "version":  BINARY_VERSION,
+            "records":  [record_offset, record_size, len(entries)],
+            "paths":    [table_offset, len(entries)],
+            "blocks":   [block_offset, len(blocks)],
+        }
+        if self.merkle is not None:
+            merkle = _ENCODER.encode(self.merkle.toDict()).encode("utf-8")
+            sections["merkle"] = [self._offset, len(merkle)]
+            self._file.write(merkle)
+            self._offset += len(merkle)
+        index = _ENCODER.encode(sections).encode("utf-8")
+        self._align()
+        index_offset = self._offset
+        self._file.write(index)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, index_offset, len(index)))
+        self.byte_count = index_offset + len(index)
+        if self._owns_file:
+            self._file.close()
+        self._file = None
+
+
+def glob_to_regex(pattern):
+    """プラグのパスのパターンを正規表現にする
+
+    "*" は "." を含まない任意の文字列、"**" は任意の文字列、"?" は任意の1文字。
+    "[" と "]" は文字どおりに扱うため "weightList[*].weights" は全要素の weights に一致する。
+    パターンの後ろに子や要素が続くパス ("weightList[0].weights[3]" など) にも一致する。
+    """
+    regex = re.escape(pattern).replace(r"\*\*", ".*").replace(r"\*", r"[^.]*").replace(r"\?", ".")
+    return re.compile(regex + r"(?=$|[.\[])")
+
+def _split_element(plug_path):
+    """"node.attr[12]" -> ("node.attr", 12)"""
+    if not plug_path.endswith("]"):
+        return None, None
+    start = plug_path.rfind("[")
+    try:
+        return plug_path[:start], int(plug_path[start + 1:-1])
+    except ValueError:
+        return None, None
+
+
+class BinaryReader(object):
+    """列形式のバイナリを mmap で開き、問い合わせたプラグだけを参照する
+
+    返されるバッファはファイルを直接参照するビューのため、
+    値を使い終わるまでリーダーを閉じないこと。
+
+    Example:
+        with BinaryReader("rig.snap") as reader:
+            tag, value = reader.get("skinCluster1.bindPreMatrix")
+            tag, matrix = reader.get("skinCluster1.bindPreMatrix[12]")
+            for plug_path, tag, value in reader.query("*.weightList[*].weights"):
+                pass
+    """
+    def __init__(self, path, use_numpy=True):
+        self.path = path
+        self._file = io.open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, index_offset, index_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            self.close()
+            if magic != BINARY_MAGIC:
+                raise ValueError(u"スナップショットのバイナリではありません: %s" % path)
+            raise ValueError(u"未対応のバージョンです: %d" % version)
+        index = json.loads(self._mmap[index_offset:index_offset + index_size].decode("utf-8"))
+        self.version = version
+        self._decompressed = {}
+        self._record_section = index["records"]
+        self._table_offset, self._count = index["paths"]
+        self._block_section = index["blocks"]
+        self._blocks = None
+        self._merkle_section = index.get("merkle")
+        self._numpy = None
+        if use_numpy:
+            try:
+                import numpy
+                self._numpy = numpy
+            except ImportError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, plug_path):
+        return self._find(plug_path) is not None
+
+    def __iter__(self):
+        for plug_path, type_tag, value in self._iter_raw():
+            yield plug_path, type_tag, self._decode(value)
+
+    def _iter_raw(self):
+        offset, size, _ = self._record_section
+        for line in self._mmap[offset:offset + size].splitlines():
+            yield json.loads(line.decode("utf-8"))
+
+    # ------------------------------------------------------------------------------ #
+    # パス表
+    # ------------------------------------------------------------------------------ #
+    def _entry(self, i):
+        return _PATH_ENTRY.unpack_from(self._mmap, self._table_offset + i * _PATH_ENTRY.size)
+
+    def _key(self, i):
+        path_offset, path_size, _, _ = self._entry(i)
+        return self._mmap[path_offset:path_offset + path_size]
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _read_record(self, i):
+        _, _, offset, size = self._entry(i)
+        return json.loads(self._mmap[offset:offset + size].decode("utf-8"))
+
+    def _find(self, plug_path):
+        """レコード (plug_path, type_tag, 値の JSON) を返す (無い場合は None)"""
+        key = plug_path.encode("utf-8")
+        i = self._lower_bound(key)
+        if i < self._count and self._key(i) == key:
+            return self._read_record(i)
+        return None
+
+    def plugs(self, prefix=""):
+        """プラグのパスの一覧 (パスの昇順)"""
+        return [plug_path for _, plug_path in self._iter_plugs(prefix)]
+
+    def _iter_plugs(self, prefix=""):
+        """prefix で始まるプラグの (パス表の位置, パス) を順に返す"""
+        key = prefix.encode("utf-8")
+        for i in range(self._lower_bound(key), self._count):
+            path = self._key(i)
+            if not path.startswith(key):
+                break
+            yield i, path.decode("utf-8")
+
+    def nodes(self):
+        """ノード名を順に返す
+
+        パス表の上で "ノード名." の次の位置まで読み飛ばすため、
+        ノード数 x log(レコード数) 回の比較で済む。
+        """
+        i = 0
+        while i < self._count:
+            node_name = self._key(i).split(b".", 1)[0]
+            yield node_name.decode("utf-8")
+            # "." の次の文字 "/" より前のパスはすべてこのノードのもの
+            i = self._lower_bound(node_name + b"/")
+
+    def query(self, pattern):
+        """パターンに一致するプラグのレコードを返す
+
+        "*" を含まない先頭部分でパス表の範囲を絞り込んでから照合する。
+
+        Args:
+            pattern (str): "skinCluster1.weightList[*].weights", "*.bindPreMatrix" など (glob_to_regex を参照)
+
+        Returns:
+            generator: (プラグのパス, 型タグ, 値)
+        """
+        regex = glob_to_regex(pattern)
+        literal = re.split(r"[*?]", pattern, 1)[0]
+        for i, plug_path in self._iter_plugs(literal):
+            if regex.match(plug_path):
+                record = self._read_record(i)
+                yield record[0], record[1], self._decode(record[2])
+
+    def merkleTree(self):
+        """保存された MerkleTree (保存されていない場合はレコードから作成する)
+
+        値は差分の確認時にこのリーダーから読むため、木を使い終わるまで閉じないこと。
+        """
+        if self._merkle_section is not None:
+            offset, size = self._merkle_section
+            return MerkleTree.fromDict(json.loads(self._mmap[offset:offset + size].decode("utf-8")), source=self)
+        return MerkleTree.fromRecords(self, keep_values=False, source=self)
+
+    # ------------------------------------------------------------------------------ #
+    # ブロック
+    # ------------------------------------------------------------------------------ #
+    def _block_table(self):
+        if self._blocks is None:
+            offset, size = self._block_section
+            self._blocks = json.loads(self._mmap[offset:offset + size].decode("utf-8"))
+        return self._blocks
+
+    def block(self, index):
+        """ブロックをコピーせずに参照する
+
+        Returns:
+            numpy.ndarray | memoryview: ブロックのビュー
+        """
+        return self._view(index, self._block_table()[index])
+
+    def _view(self, index, entry):
+        dtype, offset, size, shape = entry[:4]
+        source = self._mmap
+        info = entry[4] if len(entry) > 4 else None
+        if info and info.get("codec"):
+            # 圧縮されたブロックは展開したものをキャッシュする
+            source = self._decompressed.get(index)
+            if source is None:
+                source = self._decompressed[index] = self._inflate(info)
+            offset = 0
+            size = len(source)
+        if self._numpy is not None:
+            view = self._numpy.frombuffer(source, dtype=dtype, count=size // self._numpy.dtype(dtype).itemsize, offset=offset)
+            return view.reshape(shape)
+        view = memoryview(source)[offset:offset + size].cast(_DTYPE_FORMATS[dtype])
+        if len(shape) > 1:
+            view = view.cast("B").cast(_DTYPE_FORMATS[dtype], shape)
+        return view
+
+    def _inflate(self, info):
+        decompress = _CODECS[info["codec"]][1]
+        return b"".join(decompress(self._mmap[offset:offset + size]) for offset, size, _ in info["chunks"])
+
+    def blockHash(self, index):
+        """書き込み時に計算したブロックのハッシュ (計算していない場合は None)"""
+        entry = self._block_table()[index]
+        return entry[4].get("hash") if len(entry) > 4 else None
+
+    def blockCount(self):
+        return len(self._block_table())
+
+    def verify(self):
+        """ブロックのハッシュを再計算して一致しないブロックの番号を返す"""
+        mismatched = []
+        for index, entry in enumerate(self._block_table()):
+            info = entry[4] if len(entry) > 4 else {}
+            if not info.get("hash"):
+                continue
+            hash_name = info["hash_name"]
+            data = memoryview(self.block(index)).cast("B")
+            digests = []
+            if info.get("chunk_hashes"):
+                chunk_size = info["chunk_size"]
+                for start in range(0, len(data), chunk_size):
+                    digests.append(hashlib.new(hash_name, data[start:start + chunk_size]).hexdigest())
+                digest = hashlib.new(hash_name, "".join(digests).encode("ascii")).hexdigest()
+            else:
+                digest = hashlib.new(hash_name, data).hexdigest()
+            if digest != info["hash"]:
+                mismatched.append(index)
+        return mismatched
+
+    def _decode(self, value):
+        if isinstance(value, dict):
+            if "$block" in value and "$desc" in value:
+                return self._view(value["$block"], value["$desc"])
+            return dict((key, self._decode(item)) for key, item in value.items())
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        return value
+
+    def get(self, plug_path):
+        """プラグの値を取得する
+
+        配列の要素 ("node.bindPreMatrix[12]") は、配列がまとめて書かれている場合
+        ("X[]" の型タグ) その中から要素だけを取り出す。
+
+        Returns:
+            tuple: (型タグ, 値)
+        """
+        record = self._find(plug_path)
+        if record is not None:
+            return record[1], self._decode(record[2])
+        
+        array_path, logical_index = _split_element(plug_path)
+        if array_path is not None:
+            record = self._find(array_path)
+            if record is not None and record[1].endswith("[]"):
+                element = _packed_element(self._decode(record[2]), logical_index)
+                if element is not None:
+                    return record[1][:-2], element
+        raise KeyError(plug_path)
+
+    def close(self):
+        if self._mmap is None:
+            return
+        try:
+            self._mmap.close()
+        except BufferError:
+            # 参照中のビューが残っている場合は GC に任せる
+            pass
+        self._file.close()
+        self._mmap = None
+
+
+def _packed_element(packed, logical_index):
+    """{"indices", "values"} にまとめた配列から論理インデックスの要素を取り出す"""
+    indices = packed["indices"]
+    values = packed["values"]
+    count = len(indices)
+    i = bisect.bisect_left(indices, logical_index)
+    if i == count or indices[i] != logical_index:
+        return None
+    stride = len(values) // count if count else 1
+    if stride == 1:
+        return values[i]
+    return values[i * stride:(i + 1) * stride]
+
+
+def open_writer(path, compress=None, buffer_size=1 << 16, **kwargs):
+    """拡張子に応じたライターを返す (.snap はバイナリ、それ以外は NDJSON)
+
+    .snap の場合 compress は圧縮方式 ("zlib", "lzma")、kwargs は BinaryWriter に渡す。
+    NDJSON の場合に kwargs を指定すると TypeError になる (指定した引数が黙って無視されないように)。
+    """
+    if path.endswith(BINARY_EXTENSION):
+        return BinaryWriter(path, compress=compress, **kwargs)
+    if kwargs:
+        raise TypeError(u"%s は %s にのみ指定できます" % (", ".join(sorted(kwargs)), BINARY_EXTENSION))
+    return NDJSONWriter(path, compress=compress, buffer_size=buffer_size)
+
+
+def iter_records(path, use_numpy=True):
+    """拡張子に応じてスナップショットのレコードを順に返す"""
+    if path.endswith(BINARY_EXTENSION):
+        with BinaryReader(path, use_numpy=use_numpy) as reader:
+            for record in reader:
+                yield record
+    else:
+        for record in iter_ndjson(path):
+            yield record
+
+
+def merge_snapshots(sources, path, prefixes=None, **kwargs):
+    """複数のスナップショットを1つの .snap にまとめる
+
+    同じ名前のノードが複数のシーンにある場合は prefixes で名前空間を付けて区別する。
+    まとめた結果はパス表で索引付けされるため、ソースの数に関係なく BinaryReader で直接引ける。
+
+    Args:
+        sources (list[str]): スナップショットのパス (.snap または NDJSON)
+        path (str): 出力先 (.snap)
+        prefixes (list[str]): ソース毎にノード名の前に付ける文字列 ("scene01:" など)
+        **kwargs: BinaryWriter に渡す引数 (compress, hash_name, merkle など)
+
+    Returns:
+        int: 書き込んだレコード数
+    """
+    count = 0
+    with BinaryWriter(path, **kwargs) as writer:
+        for i, source in enumerate(sources):
+            prefix = prefixes[i] if prefixes else ""
+            for plug_path, type_tag, value in iter_records(source):
+                writer.write(prefix + plug_path, type_tag, value)
+                count += 1
+    return count
+
+
+def convert_snapshot(source, path, use_numpy=True, **kwargs):
+    """スナップショットの形式を変換する (NDJSON <-> .snap、拡張子で判定する)
+
+    レコードを1件ずつ読み書きするため、ファイルの大きさに関係なくメモリ使用量は一定になる。
+
+    Args:
+        source (str): 変換元
+        path (str): 出力先
+        use_numpy (bool): .snap のブロックを numpy で読む (False の場合は memoryview)
+        **kwargs: open_writer に渡す引数 (compress, hash_name など)
+
+    Returns:
+        int: 書き込んだレコード数
+    """
+    to_buffers = path.endswith(BINARY_EXTENSION) and not source.endswith(BINARY_EXTENSION)
+    count = 0
+    with open_writer(path, **kwargs) as writer:
+        for plug_path, type_tag, value in iter_records(source, use_numpy=use_numpy):
+            if to_buffers:
+                value = json_to_buffers(type_tag, value)
+            writer.write(plug_path, type_tag, value)
+            count += 1
+    return count
+
+
+# ---------------------------------------------------------------------------------- #
+# 差分
+# ---------------------------------------------------------------------------------- #
+# プラグのパスを "node" / "attr" / "[3]" / "child" の階層に分け、各階層にその下の値のハッシュを持たせる。
+# 2つの木を根から比べ、ハッシュが同じ部分木は読み飛ばすため、比較のコストは変更の量に比例する。
+# 数値の並びは float64 / int64 に揃えた値と shape でハッシュするため、NDJSON のリスト, array, ndarray の
+# どれから作った木でも同じ値なら一致する (float32 は float64 に広げた値を使う。NDJSON にもその値が書かれる)。
+_PATH_SEGMENT = re.compile(r"[^.\[]+|\[[^\]]*\]")
+
+def _list_shape(items):
+    shape = []
+    probe = items
+    while isinstance(probe, (list, tuple)):
+        shape.append(len(probe))
+        probe = probe[0] if probe else None
+    return shape
+
+def _canonical_numbers(value):
+    """数値の並びを (種類 "f" | "i" | "", shape, float64 / int64 のバイト列) にする
+
+    リストとバッファで同じ値なら同じ結果になる。数値の並びでない場合は None。
+    """
+    if isinstance(value, (list, tuple)):
+        shape = _list_shape(value)
+        flat = _as_numbers(value) if len(shape) > 1 else value
+        count = 1
+        for size in shape:
+            count *= size
+        if len(flat) != count:
+            return None
+        is_float = False
+        for item in flat:
+            if isinstance(item, float):
+                is_float = True
+            elif not isinstance(item, int):
+                return None
+        if not flat:
+            return "", shape, b""
+        try:
+            return ("f", shape, array.array("d", flat)) if is_float else ("i", shape, array.array("q", flat))
+        except OverflowError:
+            return None
+    
+    block = _as_block(value)
+    if block is None:
+        return None
+    data, dtype, shape = block
+    if not data.nbytes:
+        return "", shape, b""
+    if dtype in ("<f8", "<i8"):
+        return dtype[1], shape, data
+    fmt = _DTYPE_FORMATS.get(dtype)
+    if fmt is None:
+        return None
+    if dtype[1] == "f":
+        return "f", shape, array.array("d", data.cast(fmt))
+    return "i", shape, array.array("q", data.cast(fmt))
+
+def _digest_value(update, value):
+    if value is None:
+        update(b"N")
+    elif isinstance(value, bool):
+        update(b"T" if value else b"F")
+    elif isinstance(value, int):
+        update(b"i%d;" % value)
+    elif isinstance(value, float):
+        update(b"f" + repr(value).encode("ascii") + b";")
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        update(b"s%d:" % len(data))
+        update(data)
+    elif isinstance(value, dict):
+        update(b"{")
+        for key in sorted(value, key=str):
+            _digest_value(update, str(key))
+            _digest_value(update, value[key])
+        update(b"}")
+    else:
+        toDict = getattr(value, "toDict", None)
+        if toDict is not None:
+            _digest_value(update, toDict())
+            return
+        numbers = _canonical_numbers(value)
+        if numbers is not None:
+            kind, shape, data = numbers
+            update(("n%s%r:" % (kind, list(shape))).encode("ascii"))
+            update(data)
+        elif isinstance(value, (list, tuple)):
+            update(b"[")
+            for item in value:
+                _digest_value(update, item)
+            update(b"]")
+        else:
+            _digest_value(update, _json_default(value))
+
+def value_digest(type_tag, value):
+    """レコードの値のハッシュ (16 バイト)"""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(type_tag.encode("utf-8") + b"\0")
+    _digest_value(hasher.update, value)
+    return hasher.digest()
+
+
+class _MerkleNode(object):
+    __slots__ = ("digest", "leaf", "tag", "children")
+
+    def __init__(self):
+        self.digest = None
+        self.leaf = None
+        self.tag = None
+        self.children = None
+
+
+class MerkleTree(object):
+    """プラグのパスの階層毎にハッシュを持つ木
+
+    Example:
+        tree = MerkleTree.fromRecords(records)
+        tree.digest("skinCluster1.weightList")
+        changes = diff(tree, "old.snap", tolerances={"double": 1e-6, "matrix": 1e-5})
+    """
+    def __init__(self, keep_values=True, source=None):
+        self.root = _MerkleNode()
+        self._values = {} if keep_values else None
+        self._source = source
+        self._reader = None
+        self._finalized = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @classmethod
+    def fromRecords(cls, records, keep_values=True, source=None):
+        tree = cls(keep_values, source)
+        for plug_path, type_tag, value in records:
+            tree.add(plug_path, type_tag, value)
+        return tree
+
+    def __len__(self):
+        return sum(1 for _ in self.leaves())
+
+    def _node(self, plug_path, create=False):
+        node = self.root
+        for segment in _PATH_SEGMENT.findall(plug_path):
+            if node.children is None:
+                if not create:
+                    return None
+                node.children = {}
+            child = node.children.get(segment)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[segment] = _MerkleNode()
+            node = child
+        return node
+
+    def add(self, plug_path, type_tag, value):
+        """レコードを追加する"""
+        node = self._node(plug_path, create=True)
+        node.tag = type_tag
+        node.leaf = value_digest(type_tag, value)
+        if self._values is not None:
+            self._values[plug_path] = (type_tag, value)
+        self._finalized = False
+
+    def finalize(self):
+        """葉から根に向かって部分木のハッシュを計算する"""
+        if self._finalized:
+            return
+        stack = [(self.root, False)]
+        while stack:
+            node, visited = stack.pop()
+            if node.children and not visited:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+                continue
+            hasher = hashlib.blake2b(node.leaf or b"", digest_size=16)
+            if node.children:
+                for segment in sorted(node.children):
+                    hasher.update(segment.encode("utf-8") + b"\0" + node.children[segment].digest)
+            node.digest = hasher.digest()
+        self._finalized = True
+
+    def digest(self, plug_path=""):
+        """部分木のハッシュ (16進文字列、無い場合は None)"""
+        self.finalize()
+        node = self._node(plug_path)
+        return None if node is None else node.digest.hex()
+
+    def getValue(self, plug_path):
+        """(型タグ, 値)"""
+        if self._values is not None and plug_path in self._values:
+            return self._values[plug_path]
+        if self._source is not None:
+            return self._source.get(plug_path)
+        raise KeyError(plug_path)
+
+    def leaves(self, node=None, plug_path=""):
+        """部分木の値を持つプラグのパス"""
+        stack = [(node or self.root, plug_path)]
+        while stack:
+            node, path = stack.pop()
+            if node.leaf is not None:
+                yield path
+            if node.children:
+                for segment, child in node.children.items():
+                    stack.append((child, _join_segment(path, segment)))
+
+    def toDict(self):
+        self.finalize()
+        def encode(node):
+            data = {"h": node.digest.hex()}
+            if node.leaf is not None:
+                data["l"] = node.leaf.hex()
+                data["t"] = node.tag
+            if node.children:
+                data["c"] = dict((segment, encode(child)) for segment, child in node.children.items())
+            return data
+        return encode(self.root)
+
+    @classmethod
+    def fromDict(cls, data, source=None):
+        tree = cls(keep_values=False, source=source)
+        stack = [(tree.root, data)]
+        while stack:
+            node, item = stack.pop()
+            node.digest = bytes.fromhex(item["h"])
+            if "l" in item:
+                node.leaf = bytes.fromhex(item["l"])
+                node.tag = item["t"]
+            if "c" in item:
+                node.children = {}
+                for segment, child_item in item["c"].items():
+                    child = node.children[segment] = _MerkleNode()
+                    stack.append((child, child_item))
+        tree._finalized = True
+        return tree
+
+    def close(self):
+        """load_merkle_tree がパスから開いたリーダーを閉じる (閉じた後は値を読めない)"""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+            self._source = None
+
+
+def _join_segment(path, segment):
+    if not path:
+        return segment
+    if segment.startswith("["):
+        return path + segment
+    return path + "." + segment
+
+def _as_numbers(value):
+    tolist = getattr(value, "tolist", None)
+    values = tolist() if tolist is not None else list(value)
+    flat = []
+    stack = [values]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(reversed(item))
+        else:
+            flat.append(item)
+    return flat
+
+def values_close(a, b, tolerance=0.0):
+    """値が許容差以内で一致するかどうか (dict と配列は要素毎に比べる)
+
+    toDict を持つ値 (MeshHandle など) は NDJSON に書かれる dict にしてから比べる。
+    """
+    toDict = getattr(a, "toDict", None)
+    if toDict is not None:
+        a = toDict()
+    toDict = getattr(b, "toDict", None)
+    if toDict is not None:
+        b = toDict()
+    if isinstance(a, dict) or isinstance(b, dict):
+        if not (isinstance(a, dict) and isinstance(b, dict)):
+            return False
+        a = dict((str(key), item) for key, item in a.items())
+        b = dict((str(key), item) for key, item in b.items())
+        return set(a) == set(b) and all(values_close(a[key], b[key], tolerance) for key in a)
+    
+    if a is None or b is None or isinstance(a, (str, bool)) or isinstance(b, (str, bool)):
+        return a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) <= tolerance
+    try:
+        a = _as_numbers(a)
+        b = _as_numbers(b)
+    except TypeError:
+        return a == b
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if isinstance(x, (int, float)) and isinstance(y, (int, float)) and not isinstance(x, bool):
+            if abs(x - y) > tolerance:
+                return False
+        elif x != y:
+            return False
+    return True
+
+def _tolerance(tolerances, type_tag):
+    if not tolerances or type_tag is None:
+        return 0.0
+    if type_tag in tolerances:
+        return tolerances[type_tag]
+    if type_tag.endswith("[]") and type_tag[:-2] in tolerances:
+        return tolerances[type_tag[:-2]]
+    return tolerances.get("default", 0.0)
+
+def _detach(value):
+    """(型タグ, 値) の値を mmap を参照しないコピーにする"""
+    if value is None:
+        return None
+    type_tag, item = value
+    return type_tag, _copy_value(item)
+
+def _copy_value(value):
+    if isinstance(value, dict):
+        return dict((key, _copy_value(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    if isinstance(value, memoryview):
+        return value.tolist()
+    copy = getattr(value, "copy", None)
+    if copy is not None and hasattr(value, "base"):
+        # numpy.frombuffer のビュー
+        return copy()
+    return value
+
+def load_merkle_tree(source):
+    """スナップショットのファイルまたはレコードの並びから MerkleTree を取得する
+
+    .snap に木が保存されている場合はそれを使い、値は差分の確認時にパス表から読む。
+    .snap のパスから開いたリーダーは木が持つため、使い終わったら close() するか with で使う。
+
+    Example:
+        with load_merkle_tree("rig.snap") as tree:
+            tree.digest("skinCluster1")
+    """
+    if isinstance(source, MerkleTree):
+        return source
+    if isinstance(source, str):
+        if source.endswith(BINARY_EXTENSION):
+            reader = BinaryReader(source)
+            try:
+                tree = reader.merkleTree()
+            except Exception:
+                reader.close()
+                raise
+            tree._reader = reader
+            return tree
+        return MerkleTree.fromRecords(iter_ndjson(source))
+    return MerkleTree.fromRecords(source)
+
+def diff(a, b, tolerances=None):
+    """2つのスナップショットの変更されたプラグを返す
+
+    ハッシュが一致する部分木は比較しない。ハッシュが異なる値は型タグ毎の許容差で比べる。
+
+    Args:
+        a, b (MerkleTree | str | list): 木、スナップショットのパス、またはレコードの並び
+        tolerances (dict): 型タグ -> 許容差 ({"double": 1e-6, "matrix": 1e-5, "default": 0.0} など)
+                           "double[]" のような配列の型タグは "double" の許容差も使う
+
+    Returns:
+        list: (プラグのパス, "changed" | "added" | "removed", a の (型タグ, 値), b の (型タグ, 値))
+    """
+    # パスから開いたリーダーは差分を取った後に閉じる
+    opened = []
+    try:
+        a = load_merkle_tree(a)
+        if a._reader is not None:
+            opened.append(a)
+        b = load_merkle_tree(b)
+        if b._reader is not None:
+            opened.append(b)
+        a.finalize()
+        b.finalize()
+        changes = []
+        stack = [("", a.root, b.root)]
+        while stack:
+            path, node_a, node_b = stack.pop()
+            if node_a.digest == node_b.digest:
+                continue
+            
+            if node_a.leaf != node_b.leaf:
+                if node_a.leaf is None:
+                    changes.append((path, "added", None, _detach(b.getValue(path))))
+                elif node_b.leaf is None:
+                    changes.append((path, "removed", _detach(a.getValue(path)), None))
+                else:
+                    value_a = a.getValue(path)
+                    value_b = b.getValue(path)
+                    if value_a[0] != value_b[0] or not values_close(value_a[1], value_b[1], _tolerance(tolerances, value_b[0])):
+                        changes.append((path, "changed", _detach(value_a), _detach(value_b)))
+            
+            children_a = node_a.children or {}
+            children_b = node_b.children or {}
+            for segment in set(children_a) | set(children_b):
+                child_path = _join_segment(path, segment)
+                if segment not in children_a:
+                    changes.extend((leaf, "added", None, _detach(b.getValue(leaf))) for leaf in b.leaves(children_b[segment], child_path))
+                elif segment not in children_b:
+                    changes.extend((leaf, "removed", _detach(a.getValue(leaf)), None) for leaf in a.leaves(children_a[segment], child_path))
+                else:
+                    stack.append((child_path, children_a[segment], children_b[segment]))
+    finally:
+        # mmap のビューを参照したままだと閉じられない
+        value_a = value_b = None
+        for tree in opened:
+            tree.close()
+    changes.sort(key=lambda change: change[0])
+    return changes
@@ -1,5 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import array
+import bisect
+import collections
+import heapq
+import itertools
+import json
+import os
+import re
+import time
+
 import maya.cmds as cmds
 import maya.mel as mel
 import maya.OpenMaya as om
@@ -7,6 +17,19 @@ import maya.api.OpenMaya as om2
 import maya.api.OpenMayaAnim as oma2
 import maya.api.OpenMayaUI as omui2
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import _snapshot
+
+try:
+    import _skinweights
+except ImportError:
+    # numpy が無い場合はウェイトのミラー・コピーを使えない
+    _skinweights = None
+
 
 ATRRIBUTE_TYPES = [
     om2.MFn.kAttribute2Double,
@@ -97,25 +120,186 @@ def get_numeric_attribute(mPlug):
         
     return value
 
+class ComponentRanges(object):
+    """コンポーネントのインデックスを連続範囲 [start, stop) の並びで保持する
+
+    範囲は昇順に並び、重なりも隣接もしない。starts / stops は int64 の array で、
+    密なメッシュのデフォーマメンバーシップでも範囲の数だけのサイズになる。
+    ダブルインデックスのコンポーネント (u, v) は u << 32 | v に詰めて扱う。
+
+    Example:
+        ranges = ComponentRanges.fromElements([0, 1, 2, 3, 10, 11])
+        ranges.ranges()     # [(0, 4), (10, 12)]
+        2 in ranges         # True
+        ranges & ComponentRanges.fromRange(3, 11)   # [(3, 4), (10, 11)]
+    """
+    def __init__(self, starts=(), stops=(), double_indexed=False):
+        self.starts = array.array("q", starts)
+        self.stops = array.array("q", stops)
+        self.double_indexed = double_indexed
+
+    @classmethod
+    def fromElements(cls, elements, double_indexed=False):
+        """インデックスの並び (順不同・重複可) から作成する
+
+        Args:
+            elements (list): インデックス、ダブルインデックスの場合は (u, v) の並び
+            double_indexed (bool): ダブルインデックスのコンポーネントかどうか
+        """
+        if double_indexed:
+            elements = [(u << 32) | v for u, v in elements]
+        if np is not None and len(elements) > 0:
+            keys = np.unique(np.asarray(elements, dtype=np.int64))
+            breaks = np.flatnonzero(np.diff(keys) != 1) + 1
+            starts = keys[np.concatenate(([0], breaks))]
+            stops = keys[np.concatenate((breaks - 1, [len(keys) - 1]))] + 1
+            ranges = cls(double_indexed=double_indexed)
+            ranges.starts.frombytes(starts.tobytes())
+            ranges.stops.frombytes(stops.tobytes())
+            return ranges
+        
+        starts = array.array("q")
+        stops = array.array("q")
+        for key in sorted(set(elements)):
+            if stops and stops[-1] == key:
+                stops[-1] = key + 1
+            else:
+                starts.append(key)
+                stops.append(key + 1)
+        return cls(starts, stops, double_indexed)
+
+    @classmethod
+    def fromRange(cls, start, stop, double_indexed=False):
+        if stop <= start:
+            return cls(double_indexed=double_indexed)
+        return cls((start,), (stop,), double_indexed)
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data["starts"], data["stops"], data.get("double_indexed", False))
+
+    def toDict(self):
+        return {
+            "starts":           self.starts,
+            "stops":            self.stops,
+            "double_indexed":   self.double_indexed,
+        }
+
+    @property
+    def nbytes(self):
+        return (len(self.starts) + len(self.stops)) * self.starts.itemsize
+
+    def ranges(self):
+        return list(zip(self.starts, self.stops))
+
+    def __len__(self):
+        return sum(self.stops) - sum(self.starts)
+
+    def __iter__(self):
+        for start, stop in zip(self.starts, self.stops):
+            if self.double_indexed:
+                for key in range(start, stop):
+                    yield (key >> 32, key & 0xFFFFFFFF)
+            else:
+                for key in range(start, stop):
+                    yield key
+
+    def __contains__(self, element):
+        key = (element[0] << 32) | element[1] if self.double_indexed else element
+        i = bisect.bisect_right(self.starts, key) - 1
+        return i >= 0 and key < self.stops[i]
+
+    def __eq__(self, other):
+        if not isinstance(other, ComponentRanges):
+            return NotImplemented
+        return (self.double_indexed == other.double_indexed
+                and self.starts == other.starts and self.stops == other.stops)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return "ComponentRanges(%r)" % (self.ranges(),)
+
+    def _check(self, other):
+        if self.double_indexed != other.double_indexed:
+            raise ValueError("single and double indexed components cannot be combined")
+
+    def union(self, other):
+        """和集合"""
+        self._check(other)
+        result = ComponentRanges(double_indexed=self.double_indexed)
+        starts = result.starts
+        stops = result.stops
+        for start, stop in heapq.merge(zip(self.starts, self.stops), zip(other.starts, other.stops)):
+            # 重なる範囲と隣接する範囲は一つにまとめる
+            if stops and start <= stops[-1]:
+                if stop > stops[-1]:
+                    stops[-1] = stop
+            else:
+                starts.append(start)
+                stops.append(stop)
+        return result
+
+    def intersection(self, other):
+        """積集合"""
+        self._check(other)
+        result = ComponentRanges(double_indexed=self.double_indexed)
+        i = j = 0
+        while i < len(self.starts) and j < len(other.starts):
+            start = max(self.starts[i], other.starts[j])
+            stop = min(self.stops[i], other.stops[j])
+            if start < stop:
+                result.starts.append(start)
+                result.stops.append(stop)
+            if self.stops[i] < other.stops[j]:
+                i += 1
+            else:
+                j += 1
+        return result
+
+    __or__ = union
+    __and__ = intersection
+
+def _get_component_ranges(comp):
+    if comp.hasFn(om2.MFn.kSingleIndexedComponent):
+        mFnSingleIndexedComponent = om2.MFnSingleIndexedComponent(comp)
+        if mFnSingleIndexedComponent.isComplete:
+            return ComponentRanges.fromRange(0, mFnSingleIndexedComponent.getCompleteData())
+        return ComponentRanges.fromElements(mFnSingleIndexedComponent.getElements())
+        
+    if comp.hasFn(om2.MFn.kDoubleIndexedComponent):
+        mFnDoubleIndexedComponent = om2.MFnDoubleIndexedComponent(comp)
+        if mFnDoubleIndexedComponent.isComplete:
+            count_u, count_v = mFnDoubleIndexedComponent.getCompleteData()
+            return ComponentRanges([u << 32 for u in range(count_u)],
+                                   [(u << 32) + count_v for u in range(count_u)], True)
+        return ComponentRanges.fromElements(mFnDoubleIndexedComponent.getElements(), double_indexed=True)
+        
+    return None
+
 def get_component_list(mPlug):
-    value = None
+    """コンポーネントリストをコンポーネントの種類毎の ComponentRanges にまとめる
+
+    同じ種類のコンポーネントが複数含まれる場合は和集合にする。
+
+    Returns:
+        dict: {apiTypeStr: ComponentRanges}
+    """
+    values = {}
     mFnComponentListData = om2.MFnComponentListData(mPlug.asMObject())
     for i in range(mFnComponentListData.length()):
         comp = mFnComponentListData.get(i)
-        if comp.hasFn(om2.MFn.kSingleIndexedComponent):
-            mFnSingleIndexedComponent = om2.MFnSingleIndexedComponent(comp)
-            # print(mFnSingleIndexedComponent.getElements(), "kComponentList")
-            value = mFnSingleIndexedComponent.getElements()
-            
-        elif comp.hasFn(om2.MFn.kDoubleIndexedComponent):
-            mFnDoubleIndexedComponent = om2.MFnDoubleIndexedComponent(comp)
-            # print(mFnDoubleIndexedComponent.getElements(), "kComponentList")
-            value = mFnDoubleIndexedComponent.getElements()
-            
-        else:
+        ranges = _get_component_ranges(comp)
+        if ranges is None:
             print("Other", comp.apiTypeStr)
+            continue
+            
+        key = comp.apiTypeStr
+        values[key] = values[key].union(ranges) if key in values else ranges
                 
-    return value
+    return values
 
 def get_typed_Attribute(mPlug):
     mObject_attr = mPlug.attribute()
@@ -145,10 +329,11 @@ def get_typed_Attribute(mPlug):
             value = get_component_list(mPlug)
             
         elif mFnTypedAttribute.attrType() == om2.MFnData.kMesh: #14
-            value = mPlug.asMObject()
+            value = MeshHandle(mPlug.asMObject())
                     
         elif mFnTypedAttribute.attrType() == om2.MFnData.kAny: #24
-            print("kAny")
+            # メッシュを持つ場合のみ MeshHandle (それ以外は None)
+            value = _read_geometry(mPlug)
             
         else:
             print(u"MFnTypedAttribute無効な値: ", mFnTypedAttribute.attrType())
@@ -215,156 +400,2418 @@ def get_compound_attribute(mPlug):
     return values
     
 def get_array_attribute(mPlug):
-    values = {}
-    if not mPlug.numConnectedElements():
-        return None
-        
-    for i in range(mPlug.numElements()):
-        elem_plug = mPlug.elementByPhysicalIndex(i)
-        mObject_elem = elem_plug.attribute()
-        print(mObject_elem.apiTypeStr)
-        
-    return values
+    """配列アトリビュートの既存の要素をすべて取得する
 
+    要素は物理インデックス順に読み、論理インデックスを保持する。
+    数値と行列の配列は要素毎の dict ではなく型付きの連続バッファにまとめる。
 
-sl = om2.MGlobal.getSelectionListByName("skinCluster1")
-mObject = sl.getDependNode(0)
-mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    Returns:
+        dict: 数値と行列の配列は {"indices": array('i') 論理インデックス, "values": array}
+              (行列は1要素 16 個の double)、それ以外は {論理インデックス: 値}
+    """
+    entry = find_plan_entry(mPlug)
+    if entry is None or entry.tag != "array":
+        entry = build_plan_entry(mPlug.attribute())
+    return entry.reader(mPlug)
 
-try:
-    mFnDagNode = om2.MFnDagNode(mObject)
-    mDagPath = mFnDagNode.getPath()
-except RuntimeError:
-    fnDagNode = None
-    mDagPath = None
-    
-print(mFnDependencyNode.name())
-attribute_count = mFnDependencyNode.attributeCount()
-for i in range(attribute_count):
-    mObject_attr = mFnDependencyNode.attribute(i)
-    mPlug = om2.MPlug(mObject, mObject_attr)
-    
+
+def get_attribute_value(mPlug):
+    """apiType で分岐してプラグの値を取得する (汎用経路)
+
+    ノードタイプ毎の読み取り計画に含まれないダイナミックアトリビュートで使用する。
+    """
+    mObject_attr = mPlug.attribute()
     attr_type = mObject_attr.apiType()
-    attr_type_str = mObject_attr.apiTypeStr
-    mFnAttribute = om2.MFnAttribute(mObject_attr)
-    
-    # 最上位のアトリビュートを探索
-    if not mFnAttribute.parent.isNull():
-        continue    
+    value = None
 
     if mPlug.isArray:
-        print(mPlug.info, "isArray")
-        if mPlug.info == "skinCluster1.weightList":
-            break
-        print(mPlug.numElements())
-        #if not mPlug.numConnectedElements():
-            #continue
-        print(mPlug.numElements())
-        
-        values = {}
+        value = {}
         for i in range(mPlug.numElements()):
             elem_plug = mPlug.elementByPhysicalIndex(i)
             mObject_elem = elem_plug.attribute()
             attr_type = mObject_elem.apiType()
             
             if attr_type == om2.MFn.kCompoundAttribute:
-                values[elem_plug.partialName(useLongNames=True)] = get_compound_attribute(elem_plug)
+                value[elem_plug.partialName(useLongNames=True)] = get_compound_attribute(elem_plug)
                 
             elif attr_type == om2.MFn.kNumericAttribute:
-                values[elem_plug.partialName(useLongNames=True)] = get_numeric_attribute(elem_plug)
+                value[elem_plug.partialName(useLongNames=True)] = get_numeric_attribute(elem_plug)
                 
             elif attr_type == om2.MFn.kTypedAttribute:
-                values[elem_plug.partialName(useLongNames=True)] = get_typed_Attribute(elem_plug)
+                value[elem_plug.partialName(useLongNames=True)] = get_typed_Attribute(elem_plug)
                 
             elif attr_type == om2.MFn.kAttribute3Float:
-                values[elem_plug.partialName(useLongNames=True)] = get_attribute_num_float(elem_plug)
+                value[elem_plug.partialName(useLongNames=True)] = get_attribute_num_float(elem_plug)
                 
             else:
                 print(elem_plug.info, elem_plug.attribute().apiTypeStr, "-------------------------------")
-                
-        print(values)
     
     elif attr_type == om2.MFn.kCompoundAttribute:
-        print(mPlug.info, "kCompoundAttribute")
         value = get_compound_attribute(mPlug)
-        print(value)
             
     elif attr_type == om2.MFn.kEnumAttribute:
-        print(mPlug.info, "kEnumAttribute")
         value = get_enum_attribute(mPlug)
-        print(value)
     
     elif attr_type == om2.MFn.kNumericAttribute:
-        print(mPlug.info, "kNumericAttribute")
         value = get_numeric_attribute(mPlug)
-        print(value)
         
     elif attr_type == om2.MFn.kAttribute3Int:
-        print(mPlug.info, "kAttribute3Int")
         value = get_numeric_attribute(mPlug)
-        print(value)
         
     elif attr_type == om2.MFn.kTypedAttribute:
-        print(mPlug.info, "kTypedAttribute")  
         value = get_typed_Attribute(mPlug)     
-        print(value)
         
     elif attr_type == om2.MFn.kMatrixAttribute:
-        print(mPlug.info, "kMatrixAttribute")  
         value = get_typed_Attribute(mPlug)     
-        print(value)
         
     elif attr_type == om2.MFn.kAttribute2Float:
-        print(mPlug.info, "kAttribute2Float")  
         value = get_attribute_num_float(mPlug)
-        print(value)
         
     elif attr_type == om2.MFn.kAttribute3Float:
-        print(mPlug.info, "kAttribute3Float")  
         value = get_attribute_num_float(mPlug)     
-        print(value)
         
     elif attr_type == om2.MFn.kAttribute3Double:
-        print(mPlug.info, "kAttribute3Double")  
         value = get_attribute_num_double(mPlug)     
-        print(value)
         
     elif attr_type == om2.MFn.kAttribute4Double:
-        print(mPlug.info, "kAttribute4Double")
         value = get_attribute_num_double(mPlug)
-        print(value)
-        
-    elif attr_type == om2.MFn.kMessageAttribute:
-        print(mPlug.info, "kMessageAttribute")  
-        value = None     
-        print(value)
-       
-    elif attr_type == om2.MFn.kGenericAttribute:
-        print(mPlug.info, "kGenericAttribute")
+        
+    elif attr_type in (om2.MFn.kMessageAttribute, om2.MFn.kGenericAttribute, om2.MFn.kOpaqueAttribute):
         value = None
-        print(value)
 
-    elif attr_type == om2.MFn.kOpaqueAttribute:
-        print(mPlug.info, "kOpaqueAttribute")
-        value = None
-        print(value)
+    else:
+        print(mPlug.info, mObject_attr.apiTypeStr, attr_type, "---------------------------------------") 
+
+    return value
+
+
+# ---------------------------------------------------------------------------------- #
+# スキンウェイト
+# ---------------------------------------------------------------------------------- #
+# weightList[*].weights[*] をプラグ単位で読むと頂点数 x インフルエンス数の呼び出しになるため、
+# MFnSkinCluster.getWeights で一括取得して (頂点数 x インフルエンス数) の連続バッファにする。
+def get_skin_weights(mObject, sparse=False, index=0):
+    """スキンクラスターのウェイトを一括で取得する
+
+    Args:
+        mObject (om2.MObject): スキンクラスター
+        sparse (bool): True の場合は CSR 形式で返す
+        index (int): 出力ジオメトリのインデックス
+
+    Returns:
+        dict: shape (頂点数, インフルエンス数), influences (インフルエンス名),
+              weights (numpy.ndarray または array('d') の行優先バッファ)
+              sparse の場合は weights の代わりに indptr, indices, data
+    """
+    mFnSkinCluster = oma2.MFnSkinCluster(mObject)
+    mDagPath = mFnSkinCluster.getPathAtIndex(index)
+    
+    vertex_count = om2.MItGeometry(mDagPath).count()
+    mFnSingleIndexedComponent = om2.MFnSingleIndexedComponent()
+    components = mFnSingleIndexedComponent.create(om2.MFn.kMeshVertComponent)
+    mFnSingleIndexedComponent.setCompleteData(vertex_count)
+    
+    mDoubleArray, influence_count = mFnSkinCluster.getWeights(mDagPath, components)
+    influences = [mDagPath_inf.partialPathName() for mDagPath_inf in mFnSkinCluster.influenceObjects()]
+    
+    weights = _weights_to_buffer(mDoubleArray)
+    if np is not None:
+        weights = weights.reshape(vertex_count, influence_count)
+    
+    result = {
+        "shape": (vertex_count, influence_count),
+        "influences": influences,
+    }
+    if sparse:
+        result.update(skin_weights_to_csr(weights, vertex_count, influence_count))
+    else:
+        result["weights"] = weights
+    return result
+
+def _weights_to_buffer(mDoubleArray):
+    """MDoubleArray を numpy.ndarray (無い場合は array('d')) にする
+
+    om2 の配列はバッファプロトコルを持たないため、要素毎に Python の float を経由する変換は避けられない。
+    np.array は要素の型を調べながら入れ子のリストとして変換するため、
+    要素数を指定した np.fromiter で確保を1回にする (_bench.py skin_weights を参照)。
+    """
+    if np is not None:
+        return np.fromiter(mDoubleArray, dtype=np.float64, count=len(mDoubleArray))
+    return array.array("d", mDoubleArray)
+
+def skin_weights_to_csr(weights, vertex_count, influence_count):
+    """密なウェイトを CSR 形式 (ゼロ以外のみ) に変換する
+
+    Args:
+        weights (numpy.ndarray | array.array): 行優先のウェイト
+        vertex_count (int): 頂点数
+        influence_count (int): インフルエンス数
+
+    Returns:
+        dict: indptr (頂点毎の開始位置), indices (インフルエンス番号), data (ウェイト)
+    """
+    if np is not None:
+        dense = np.asarray(weights, dtype=np.float64).reshape(vertex_count, influence_count)
+        mask = dense != 0.0
+        indptr = np.zeros(vertex_count + 1, dtype=np.int64)
+        np.cumsum(mask.sum(axis=1), out=indptr[1:])
+        indices = np.nonzero(mask)[1].astype(np.int32)
+        return {"indptr": indptr, "indices": indices, "data": dense[mask]}
+    
+    indptr = array.array("q", [0])
+    indices = array.array("i")
+    data = array.array("d")
+    for v in range(vertex_count):
+        offset = v * influence_count
+        for j in range(influence_count):
+            w = weights[offset + j]
+            if w != 0.0:
+                indices.append(j)
+                data.append(w)
+        indptr.append(len(data))
+    return {"indptr": indptr, "indices": indices, "data": data}
+
+def _read_skin_weight_list(mPlug):
+    return get_skin_weights(mPlug.node())
+
+
+# ---------------------------------------------------------------------------------- #
+# メッシュ
+# ---------------------------------------------------------------------------------- #
+# kMesh (とメッシュを持つ kAny) のアトリビュートは MeshHandle として返し、
+# 頂点座標や トポロジーは参照されるまで取得しない。
+class MeshHandle(object):
+    """メッシュデータを遅延取得するハンドル
+
+    取得した値はハンドル毎にキャッシュし、release() で破棄する。
+    頂点座標などは numpy がある場合は float32 / int32 の ndarray、無い場合は array になる。
+
+    Example:
+        mesh = dump_node(mObject)["outputGeometry"][0]
+        points = mesh.getPoints()       # (頂点数, 3)
+        counts, connects = mesh.getTopology()
+        mesh.release()
+
+    Args:
+        mObject (om2.MObject | om2.MDagPath): メッシュまたはメッシュデータ
+        space (int): 頂点座標と法線の座標系 (om2.MSpace.kWorld の場合は MDagPath を渡す)
+    """
+    def __init__(self, mObject, space=om2.MSpace.kObject):
+        # MFnMesh は MObject から作るとワールド座標に変換できないため、MDagPath はそのまま保持する
+        if isinstance(mObject, om2.MDagPath):
+            self._mDagPath = mObject
+            mObject = mObject.node()
+        else:
+            self._mDagPath = None
+        self._mObject = mObject
+        self._space = space
+        self._cache = {}
+
+    @property
+    def object(self):
+        return self._mObject
+
+    def _fnMesh(self):
+        if self._mDagPath is not None:
+            return om2.MFnMesh(self._mDagPath)
+        return om2.MFnMesh(self._mObject)
+
+    @property
+    def numVertices(self):
+        return self._fnMesh().numVertices
+
+    def _get(self, key, func):
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = func(self._fnMesh())
+        return value
+
+    def getPoints(self):
+        """頂点座標 (頂点数, 3)"""
+        return self._get("points", self._read_points)
+
+    def getNormals(self):
+        """法線 (法線数, 3)"""
+        return self._get("normals", self._read_normals)
+
+    def getFaceCounts(self):
+        """ポリゴン毎の頂点数"""
+        return self._get("topology", self._read_topology)[0]
+
+    def getFaceConnects(self):
+        """ポリゴン毎の頂点番号を連結したもの"""
+        return self._get("topology", self._read_topology)[1]
+
+    def getTopology(self):
+        """(face_counts, face_connects)"""
+        return self._get("topology", self._read_topology)
+
+    def isLoaded(self, key):
+        """key ("points", "normals", "topology") を取得済みかどうか"""
+        return key in self._cache
+
+    def release(self):
+        """キャッシュした値を破棄する"""
+        self._cache.clear()
+
+    def toDict(self, normals=False, topology=False):
+        """書き出し用の dict (既定では頂点座標のみ)"""
+        data = {"points": self.getPoints()}
+        if normals:
+            data["normals"] = self.getNormals()
+        if topology:
+            data["face_counts"], data["face_connects"] = self.getTopology()
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __repr__(self):
+        return "MeshHandle(%s)" % ", ".join(sorted(self._cache))
+
+    def _read_points(self, mFnMesh):
+        # om2 には getRawPoints が無いため getFloatPoints の一括取得から (x, y, z, w) の列を切り出す
+        return _vector_array_to_buffer(mFnMesh.getFloatPoints(self._space), 4)
+
+    def _read_normals(self, mFnMesh):
+        return _vector_array_to_buffer(mFnMesh.getNormals(self._space), 3)
+
+    def _read_topology(self, mFnMesh):
+        counts, connects = mFnMesh.getVertices()
+        if np is not None:
+            return np.array(counts, dtype=np.int32), np.array(connects, dtype=np.int32)
+        return array.array("i", counts), array.array("i", connects)
+
+def _vector_array_to_buffer(mArray, size):
+    # om2 の配列はバッファプロトコルを持たず、om2 には getRawPoints も無いため、要素毎に Python の float を経由する
+    # (10 万頂点で約 30 ms)。np.array に MFloatPoint の列を渡すと要素毎に入れ子の列として型を調べるため
+    # 約 3 倍遅くなる。成分を平らに並べて np.fromiter で一度に確保し、(x, y, z) を切り出す
+    count = len(mArray)
+    if np is not None:
+        values = np.fromiter(itertools.chain.from_iterable(mArray), dtype=np.float32, count=count * size)
+        return values.reshape(count, size)[:, :3]
+    return array.array("f", [c for item in mArray for c in (item.x, item.y, item.z)])
+
+def _read_mesh(mPlug):
+    return MeshHandle(mPlug.asMObject())
+
+def _read_geometry(mPlug):
+    # kAny はメッシュの場合のみハンドルにする (未接続の場合は取得に失敗する)
+    try:
+        mObject = mPlug.asMObject()
+    except RuntimeError:
+        return None
+    if mObject.hasFn(om2.MFn.kMeshData) or mObject.hasFn(om2.MFn.kMesh):
+        return MeshHandle(mObject)
+    return None
+
+
+# ---------------------------------------------------------------------------------- #
+# 変換
+# ---------------------------------------------------------------------------------- #
+# Maya の値オブジェクトをバッファプロトコル対応の型に変換する。
+# array は Maya の配列をシーケンスとして直接受け取るため、途中で Python のリストを作らない。
+# 距離と角度は MPlug.asDouble で内部単位 (cm, ラジアン) のまま読むため変換自体が不要。
+def matrix_to_array(mMatrix):
+    """MMatrix / MFloatMatrix を 16 要素の array('d') にする"""
+    return array.array("d", mMatrix)
+
+def int_array_to_buffer(mIntArray):
+    """MIntArray を int32 の memoryview にする"""
+    return memoryview(array.array("i", mIntArray))
+
+def double_array_to_buffer(mDoubleArray):
+    """MDoubleArray を float64 の memoryview にする"""
+    return memoryview(array.array("d", mDoubleArray))
+
+def float_array_to_buffer(mFloatArray):
+    """MFloatArray を float32 の memoryview にする"""
+    return memoryview(array.array("f", mFloatArray))
+
+def distance_to_float(mDistance):
+    """MDistance を内部単位 (cm) の float にする"""
+    return mDistance.asUnits(om2.MDistance.kCentimeters)
 
+def angle_to_float(mAngle):
+    """MAngle をラジアンの float にする"""
+    return mAngle.asRadians()
+
+def time_to_float(mTime):
+    """MTime を秒の float にする"""
+    return mTime.asUnits(om2.MTime.kSeconds)
+
+def vector_to_array(mVector):
+    """MVector を (x, y, z) の array('d') にする (MFloatVector は array('f'))"""
+    return array.array("f" if isinstance(mVector, om2.MFloatVector) else "d", (mVector.x, mVector.y, mVector.z))
+
+def point_to_array(mPoint):
+    """MPoint を同次座標 w で割った (x, y, z) の array('d') にする (MFloatPoint は array('f'))"""
+    w = mPoint.w
+    if w == 1.0 or w == 0.0:
+        values = (mPoint.x, mPoint.y, mPoint.z)
     else:
-        print(mPlug.info, attr_type_str, attr_type, "---------------------------------------") 
+        values = (mPoint.x / w, mPoint.y / w, mPoint.z / w)
+    return array.array("f" if isinstance(mPoint, om2.MFloatPoint) else "d", values)
+
+_VALUE_CONVERTERS = {
+    om2.MMatrix:        matrix_to_array,
+    om2.MFloatMatrix:   matrix_to_array,
+    om2.MIntArray:      int_array_to_buffer,
+    om2.MDoubleArray:   double_array_to_buffer,
+    om2.MFloatArray:    float_array_to_buffer,
+    om2.MDistance:      distance_to_float,
+    om2.MAngle:         angle_to_float,
+    om2.MTime:          time_to_float,
+    om2.MVector:        vector_to_array,
+    om2.MFloatVector:   vector_to_array,
+    om2.MPoint:         point_to_array,
+    om2.MFloatPoint:    point_to_array,
+    ComponentRanges:    ComponentRanges.toDict,
+}
+
+def convert_value(value):
+    """読み取った値をバッファプロトコル対応の型に変換する (dict は再帰的に変換)
+
+    汎用経路 (get_attribute_value) の結果に使う。読み取り計画の読み取り関数は最初から変換済みの値を返す。
+    """
+    converter = _VALUE_CONVERTERS.get(type(value))
+    if converter is not None:
+        return converter(value)
+    if isinstance(value, dict):
+        return dict((key, convert_value(item)) for key, item in value.items())
+    return value
 
 
+# ---------------------------------------------------------------------------------- #
+# スキーマ
+# ---------------------------------------------------------------------------------- #
+# ノードタイプの最上位アトリビュートの構成 (ロング名, 種類, 配列かどうか, 子の構成) を
+# typeId とプラグインのバージョン毎にキャッシュする。
+# attributeCount() の走査と parent の確認はタイプ毎に一度だけになり、
+# save_schema_cache / load_schema_cache でセッションをまたいで再利用できる。
+_NODE_SCHEMAS = {}
+_PLUGIN_VERSIONS = {}
+
+def describe_attribute(mObject_attr):
+    """アトリビュートの構成を dict にする
+
+    Returns:
+        dict: name, api_type, array, (numeric_type | data_type), children
+    """
+    mFnAttribute = om2.MFnAttribute(mObject_attr)
+    attr_type = mObject_attr.apiType()
+    item = {
+        "name":     mFnAttribute.name,
+        "api_type": attr_type,
+        "array":    mFnAttribute.array,
+    }
+    if attr_type in _COMPOUND_TAGS:
+        mFnCompoundAttribute = om2.MFnCompoundAttribute(mObject_attr)
+        item["children"] = [describe_attribute(mFnCompoundAttribute.child(i)) for i in range(mFnCompoundAttribute.numChildren())]
+    elif attr_type == om2.MFn.kNumericAttribute:
+        item["numeric_type"] = om2.MFnNumericAttribute(mObject_attr).numericType()
+    elif attr_type == om2.MFn.kTypedAttribute:
+        item["data_type"] = om2.MFnTypedAttribute(mObject_attr).attrType()
+    return item
+
+def get_plugin_version(plugin_name):
+    """ノードを提供するプラグインのバージョン (標準ノードは API バージョン)"""
+    version = _PLUGIN_VERSIONS.get(plugin_name)
+    if version is None:
+        if plugin_name:
+            try:
+                version = cmds.pluginInfo(plugin_name, query=True, version=True)
+            except Exception:
+                version = "unknown"
+        else:
+            version = str(om2.MGlobal.apiVersion())
+        _PLUGIN_VERSIONS[plugin_name] = version
+    return version
+
+
+class NodeSchema(object):
+    """ノードタイプの最上位アトリビュートの構成"""
+    def __init__(self, key, type_name, attribute_count, attributes, is_skin_cluster=False):
+        self.key = key
+        self.type_name = type_name
+        self.attribute_count = attribute_count
+        self.attributes = attributes
+        self.is_skin_cluster = is_skin_cluster
+
+    @staticmethod
+    def makeKey(mFnDependencyNode):
+        plugin_name = mFnDependencyNode.pluginName
+        return "%d:%s:%s" % (mFnDependencyNode.typeId.id(), plugin_name, get_plugin_version(plugin_name))
+
+    @classmethod
+    def fromNode(cls, mFnDependencyNode):
+        attributes = []
+        attribute_count = 0
+        for i in range(mFnDependencyNode.attributeCount()):
+            mObject_attr = mFnDependencyNode.attribute(i)
+            mFnAttribute = om2.MFnAttribute(mObject_attr)
+            # ダイナミックアトリビュートは静的アトリビュートの後ろに並ぶ
+            if mFnAttribute.dynamic:
+                break
+            attribute_count += 1
+            
+            # 最上位のアトリビュートを探索
+            if not mFnAttribute.parent.isNull():
+                continue
+            attributes.append(describe_attribute(mObject_attr))
         
+        return cls(cls.makeKey(mFnDependencyNode), mFnDependencyNode.typeName, attribute_count, attributes,
+                   mFnDependencyNode.object().hasFn(om2.MFn.kSkinClusterFilter))
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data["key"], data["type_name"], data["attribute_count"], data["attributes"], data.get("is_skin_cluster", False))
+
+    def toDict(self):
+        return {
+            "key":              self.key,
+            "type_name":        self.type_name,
+            "attribute_count":  self.attribute_count,
+            "attributes":       self.attributes,
+            "is_skin_cluster":  self.is_skin_cluster,
+        }
+
+
+def get_node_schema(mFnDependencyNode):
+    """ノードタイプのスキーマをキャッシュから取得する (無ければ作成する)
+
+    Args:
+        mFnDependencyNode (om2.MFnDependencyNode): 対象ノードの関数セット
+
+    Returns:
+        NodeSchema: スキーマ
+    """
+    key = NodeSchema.makeKey(mFnDependencyNode)
+    schema = _NODE_SCHEMAS.get(key)
+    if schema is None:
+        schema = NodeSchema.fromNode(mFnDependencyNode)
+        _NODE_SCHEMAS[key] = schema
+    return schema
+
+def save_schema_cache(path):
+    """スキーマのキャッシュを JSON に保存する"""
+    data = [schema.toDict() for schema in _NODE_SCHEMAS.values()]
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+def load_schema_cache(path):
+    """保存したスキーマのキャッシュを読み込む
+
+    Returns:
+        int: 読み込んだスキーマの数
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    for item in data:
+        schema = NodeSchema.fromDict(item)
+        _NODE_SCHEMAS[schema.key] = schema
+        # 読み込んだスキーマで計画を作り直す
+        _READER_PLANS.pop(schema.key, None)
+    return len(data)
+
+def clear_schema_cache():
+    """スキーマのキャッシュを破棄する (スキーマから作成した読み取り計画も破棄する)"""
+    _NODE_SCHEMAS.clear()
+    _PLUGIN_VERSIONS.clear()
+    _READER_PLANS.clear()
+
+
+# ---------------------------------------------------------------------------------- #
+# 読み取り計画
+# ---------------------------------------------------------------------------------- #
+# アトリビュートの種類による分岐はノードタイプ (スキーマと同じ typeId, プラグイン, バージョン) 毎に一度だけ行い、
+# (アトリビュート, 読み取り関数) の並びとしてキャッシュする。
+# 同じタイプの2つ目以降のノードはプラグの読み取りだけで済む。
+PlanEntry = collections.namedtuple("PlanEntry", ["attribute", "name", "tag", "reader", "children"])
+
+_READER_PLANS = {}
+
+
+def _read_none(mPlug):
+    return None
+
+def _read_matrix(mPlug):
+    return array.array("d", om2.MFnMatrixData(mPlug.asMObject()).matrix())
+
+def _read_int_array(mPlug):
+    return memoryview(array.array("i", om2.MFnIntArrayData(mPlug.asMObject()).array()))
+
+def _read_double_array(mPlug):
+    return memoryview(array.array("d", om2.MFnDoubleArrayData(mPlug.asMObject()).array()))
+
+def _read_component_list(mPlug):
+    return convert_value(get_component_list(mPlug))
+
+def _read_time(mPlug):
+    return mPlug.asMTime().asUnits(om2.MTime.kSeconds)
+
+_NUMERIC_READERS = {
+    om2.MFnNumericData.kBoolean:    ("bool",    om2.MPlug.asBool),
+    om2.MFnNumericData.kByte:       ("byte",    om2.MPlug.asInt),
+    om2.MFnNumericData.kShort:      ("short",   om2.MPlug.asShort),
+    om2.MFnNumericData.kLong:       ("long",    om2.MPlug.asInt),
+    om2.MFnNumericData.kFloat:      ("float",   om2.MPlug.asFloat),
+    om2.MFnNumericData.kDouble:     ("double",  om2.MPlug.asDouble),
+}
+
+_TYPED_READERS = {
+    om2.MFnData.kInvalid:           ("invalid",         _read_none),
+    om2.MFnData.kString:            ("string",          om2.MPlug.asString),
+    om2.MFnData.kMatrix:            ("matrix",          _read_matrix),
+    om2.MFnData.kDoubleArray:       ("doubleArray",     _read_double_array),
+    om2.MFnData.kIntArray:          ("intArray",        _read_int_array),
+    om2.MFnData.kComponentList:     ("componentList",   _read_component_list),
+    om2.MFnData.kMesh:              ("mesh",            _read_mesh),
+    om2.MFnData.kAny:               ("any",             _read_geometry),
+}
+
+_API_TYPE_READERS = {
+    om2.MFn.kMatrixAttribute:       ("matrix",      _read_matrix),
+    om2.MFn.kFloatMatrixAttribute:  ("matrix",      _read_matrix),
+    om2.MFn.kDoubleLinearAttribute: ("distance",    om2.MPlug.asDouble),
+    om2.MFn.kFloatLinearAttribute:  ("distance",    om2.MPlug.asDouble),
+    om2.MFn.kDoubleAngleAttribute:  ("angle",       om2.MPlug.asDouble),
+    om2.MFn.kFloatAngleAttribute:   ("angle",       om2.MPlug.asDouble),
+    om2.MFn.kTimeAttribute:         ("time",        _read_time),
+    om2.MFn.kMessageAttribute:      ("message",     _read_none),
+    om2.MFn.kGenericAttribute:      ("generic",     _read_none),
+    om2.MFn.kOpaqueAttribute:       ("opaque",      _read_none),
+}
+
+_COMPOUND_TAGS = {
+    om2.MFn.kCompoundAttribute:     "compound",
+    om2.MFn.kAttribute2Double:      "double2",
+    om2.MFn.kAttribute2Float:       "float2",
+    om2.MFn.kAttribute2Int:         "long2",
+    om2.MFn.kAttribute2Short:       "short2",
+    om2.MFn.kAttribute3Double:      "double3",
+    om2.MFn.kAttribute3Float:       "float3",
+    om2.MFn.kAttribute3Int:         "long3",
+    om2.MFn.kAttribute3Short:       "short3",
+    om2.MFn.kAttribute4Double:      "double4",
+}
+
+def _make_enum_reader(mObject_attr):
+    field_name = om2.MFnEnumAttribute(mObject_attr).fieldName
+    def read_enum(mPlug):
+        value_index = mPlug.asInt()
+        return [value_index, field_name(value_index)]
+    return read_enum
+
+# 数値コンパウンド (double3 など) は子の値を array にまとめる
+_NUMERIC_COMPOUND_TYPECODES = {
+    "double2":  "d",
+    "double3":  "d",
+    "double4":  "d",
+    "float2":   "f",
+    "float3":   "f",
+    "long2":    "i",
+    "long3":    "i",
+    "short2":   "h",
+    "short3":   "h",
+}
+
+def _make_numeric_compound_reader(children, typecode):
+    attributes = [entry.attribute for entry in children]
+    readers = [entry.reader for entry in children]
+    def read_numeric_compound(mPlug):
+        return array.array(typecode, [reader(mPlug.child(mObject_child)) for mObject_child, reader in zip(attributes, readers)])
+    return read_numeric_compound
+
+def _make_compound_reader(children):
+    def read_compound(mPlug):
+        values = {}
+        for mObject_child, name, tag, reader, _ in children:
+            values[name] = reader(mPlug.child(mObject_child))
+        return values
+    return read_compound
+
+# 要素を連続バッファに詰める配列の array 型コード
+_PACKED_TYPECODES = {
+    "bool":     "B",
+    "byte":     "B",
+    "short":    "h",
+    "long":     "i",
+    "float":    "f",
+    "double":   "d",
+    "matrix":   "d",
+}
+
+def is_packed_entry(entry):
+    """配列の要素が連続バッファに詰められるかどうか"""
+    return entry.tag == "array" and entry.children[0].tag in _PACKED_TYPECODES
+
+def is_leaf_entry(entry):
+    """子に分けずに1つの値として読み取るかどうか (一括取得, 連続バッファの配列, 数値コンパウンド)"""
+    return not entry.children or is_packed_entry(entry) or entry.tag in _NUMERIC_COMPOUND_TYPECODES
+
+def _make_array_reader(element):
+    reader = element.reader
+    typecode = _PACKED_TYPECODES.get(element.tag)
+    
+    if typecode is None:
+        def read_array(mPlug):
+            values = {}
+            for i in range(mPlug.numElements()):
+                elem_plug = mPlug.elementByPhysicalIndex(i)
+                values[elem_plug.logicalIndex()] = reader(elem_plug)
+            return values
+    
+    elif element.tag == "matrix":
+        def read_array(mPlug):
+            indices = array.array("i", mPlug.getExistingArrayAttributeIndices())
+            values = array.array("d")
+            for i in range(len(indices)):
+                values.extend(reader(mPlug.elementByPhysicalIndex(i)))
+            return {"indices": indices, "values": values}
+    
+    else:
+        def read_array(mPlug):
+            indices = array.array("i", mPlug.getExistingArrayAttributeIndices())
+            element_by_physical_index = mPlug.elementByPhysicalIndex
+            values = array.array(typecode, [reader(element_by_physical_index(i)) for i in range(len(indices))])
+            return {"indices": indices, "values": values}
+    
+    return read_array
+
+def build_plan_entry(mObject_attr, element=False, item=None):
+    """アトリビュート1つ分の読み取り計画を作成する
+
+    Args:
+        mObject_attr (om2.MObject): アトリビュート
+        element (bool): 配列アトリビュートの要素として扱う
+        item (dict): describe_attribute の結果 (スキーマのキャッシュ)
+
+    Returns:
+        PlanEntry: (アトリビュート, ロング名, 型タグ, 読み取り関数, 子の計画)
+    """
+    if item is None:
+        item = describe_attribute(mObject_attr)
+    name = item["name"]
+    
+    if item["array"] and not element:
+        entry = build_plan_entry(mObject_attr, element=True, item=item)
+        return PlanEntry(mObject_attr, name, "array", _make_array_reader(entry), (entry,))
+    
+    attr_type = item["api_type"]
+    if attr_type in _COMPOUND_TAGS:
+        mFnCompoundAttribute = om2.MFnCompoundAttribute(mObject_attr)
+        children = tuple(build_plan_entry(mFnCompoundAttribute.child(i), item=child) for i, child in enumerate(item["children"]))
+        tag = _COMPOUND_TAGS[attr_type]
+        typecode = _NUMERIC_COMPOUND_TYPECODES.get(tag)
+        if typecode is not None and all(not child.children for child in children):
+            return PlanEntry(mObject_attr, name, tag, _make_numeric_compound_reader(children, typecode), children)
+        return PlanEntry(mObject_attr, name, tag, _make_compound_reader(children), children)
+    
+    elif attr_type == om2.MFn.kEnumAttribute:
+        return PlanEntry(mObject_attr, name, "enum", _make_enum_reader(mObject_attr), ())
+    
+    elif attr_type == om2.MFn.kNumericAttribute:
+        tag, reader = _NUMERIC_READERS.get(item["numeric_type"], ("numeric", get_numeric_attribute))
+        return PlanEntry(mObject_attr, name, tag, reader, ())
+    
+    elif attr_type == om2.MFn.kTypedAttribute:
+        tag, reader = _TYPED_READERS.get(item["data_type"], ("typed", get_typed_Attribute))
+        return PlanEntry(mObject_attr, name, tag, reader, ())
+    
+    tag, reader = _API_TYPE_READERS.get(attr_type, (mObject_attr.apiTypeStr, _read_none))
+    return PlanEntry(mObject_attr, name, tag, reader, ())
+
+
+class ReaderPlan(object):
+    """ノードタイプ毎の最上位アトリビュートの読み取り計画
+    
+    ダイナミックアトリビュートは静的アトリビュートの後ろに並ぶため、
+    attribute_count 以降のインデックスはノード毎に汎用経路で読み取る。
+    """
+    def __init__(self, mFnDependencyNode):
+        schema = get_node_schema(mFnDependencyNode)
+        self.type_id = mFnDependencyNode.typeId.id()
+        self.type_name = schema.type_name
+        self.attribute_count = schema.attribute_count
+        self.entries = [build_plan_entry(mFnDependencyNode.attribute(item["name"]), item=item) for item in schema.attributes]
         
+        # スキンクラスターの weightList は一括取得に置き換える
+        if schema.is_skin_cluster:
+            for i, entry in enumerate(self.entries):
+                if entry.name == "weightList":
+                    self.entries[i] = PlanEntry(entry.attribute, entry.name, "skinWeights", _read_skin_weight_list, ())
         
+        self.names = [entry.name for entry in self.entries]
+        self.entries_by_name = dict(zip(self.names, self.entries))
+        self.default_table = None
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def get_reader_plan(mFnDependencyNode):
+    """ノードタイプの読み取り計画をキャッシュから取得する (無ければ作成する)
+
+    Args:
+        mFnDependencyNode (om2.MFnDependencyNode): 対象ノードの関数セット
+
+    Returns:
+        ReaderPlan: 読み取り計画
+    """
+    # スキーマと同じキー (typeId, プラグイン, バージョン) で引き、プラグインの更新後に古い計画を使わない
+    key = NodeSchema.makeKey(mFnDependencyNode)
+    plan = _READER_PLANS.get(key)
+    if plan is None:
+        plan = ReaderPlan(mFnDependencyNode)
+        _READER_PLANS[key] = plan
+    return plan
+
+def clear_reader_plans():
+    """読み取り計画のキャッシュを破棄する (プラグインの再読み込み後など)"""
+    _READER_PLANS.clear()
+
+def find_plan_entry(mPlug):
+    """プラグのアトリビュートに対応する読み取り計画の要素を返す
+
+    ノードタイプの計画を最上位のアトリビュートから辿るため、計画を作り直さずに済む。
+
+    Returns:
+        PlanEntry: 要素 (ダイナミックアトリビュートや一括取得するアトリビュートの下の場合は None)
+    """
+    names = []
+    mFnAttribute = om2.MFnAttribute(mPlug.attribute())
+    while True:
+        names.append(mFnAttribute.name)
+        mObject_parent = mFnAttribute.parent
+        if mObject_parent.isNull():
+            break
+        mFnAttribute = om2.MFnAttribute(mObject_parent)
+    
+    plan = get_reader_plan(om2.MFnDependencyNode(mPlug.node()))
+    entry = plan.entries_by_name.get(names.pop())
+    while names and entry is not None:
+        if entry.tag == "array":
+            entry = entry.children[0]
+        name = names.pop()
+        for child in entry.children:
+            if child.name == name:
+                entry = child
+                break
+        else:
+            entry = None
+    return entry
+
+def read_plan_values(mObject, plan):
+    """読み取り計画の順にプラグの値を読み取る
+
+    Returns:
+        list: plan.entries と同じ並びの値
+    """
+    if _PROFILER is not None:
+        return _read_plan_values_profiled(mObject, plan, _PROFILER)
+    
+    values = []
+    append = values.append
+    for mObject_attr, name, tag, reader, _ in plan.entries:
+        try:
+            append(reader(om2.MPlug(mObject, mObject_attr)))
+        except Exception as e:
+            print(name, e)
+            append(None)
+    return values
+
+def read_dynamic_values(mObject, mFnDependencyNode, plan):
+    """読み取り計画に含まれないダイナミックアトリビュートの値を読み取る
+
+    Returns:
+        dict: {アトリビュートのロング名: 値}
+    """
+    values = {}
+    for i in range(plan.attribute_count, mFnDependencyNode.attributeCount()):
+        mObject_attr = mFnDependencyNode.attribute(i)
+        mFnAttribute = om2.MFnAttribute(mObject_attr)
+        if not mFnAttribute.parent.isNull():
+            continue
+        values[mFnAttribute.name] = convert_value(get_attribute_value(om2.MPlug(mObject, mObject_attr)))
+    return values
+
+def dump_node(mObject):
+    """ノードの最上位アトリビュートの値をすべて取得する
+
+    Args:
+        mObject (om2.MObject): 対象ノード
+
+    Returns:
+        dict: {アトリビュートのロング名: 値}
+    """
+    mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    plan = get_reader_plan(mFnDependencyNode)
+    values = dict(zip(plan.names, read_plan_values(mObject, plan)))
+    values.update(read_dynamic_values(mObject, mFnDependencyNode, plan))
+    return values
+
+
+# ---------------------------------------------------------------------------------- #
+# 既定値
+# ---------------------------------------------------------------------------------- #
+# アトリビュートの定義から既定値を求め、読み取り計画と同じくノードタイプ毎に一度だけ作成する。
+# 既定値と許容差以内で一致するプラグはレコードを省略し、復元時に既定値で埋め戻す。
+# 配列の要素の下のプラグは要素の有無を残すため省略しない (要素の無い配列は省略する)。
+# 復元は値を書き込むだけで配列の要素は削除しない。スナップショットに無い要素が
+# 書き戻し先にある場合 (後から追加した要素や、要素の無い配列として省略した配列の要素) はそのまま残る。
+
+# 既定値を省略したノードを示すレコードのパス (ノード名.$defaults)
+ELIDED_DEFAULTS = "$defaults"
+
+# 型タグ毎の許容差 (float は単精度で保持されるため既定値の倍精度と一致しない)
+ELISION_TOLERANCES = {
+    "float":    1e-6,
+    "float2":   1e-6,
+    "float3":   1e-6,
+    "double":   1e-9,
+    "double2":  1e-9,
+    "double3":  1e-9,
+    "double4":  1e-9,
+    "distance": 1e-9,
+    "angle":    1e-9,
+    "time":     1e-9,
+    "matrix":   1e-9,
+}
+
+_NUMERIC_DEFAULT_TYPES = {
+    "bool":     bool,
+    "byte":     int,
+    "short":    int,
+    "long":     int,
+    "float":    float,
+    "double":   float,
+}
+
+_EMPTY_DEFAULTS = {
+    "string":       "",
+    "doubleArray":  "d",
+    "intArray":     "i",
+    "message":      None,
+    "generic":      None,
+    "opaque":       None,
+    "invalid":      None,
+    "mesh":         None,
+    "any":          None,
+}
+
+# 既定値を持たない (常に書き出す) ことを示す
+_NO_DEFAULT = object()
+
+def attribute_default(entry):
+    """読み取り計画の要素 (配列以外) の既定値を読み取り関数と同じ形式で返す
+
+    Returns:
+        object: 既定値 (求められない場合は _NO_DEFAULT)
+    """
+    mObject_attr = entry.attribute
+    tag = entry.tag
+    try:
+        if tag in _NUMERIC_DEFAULT_TYPES:
+            return _NUMERIC_DEFAULT_TYPES[tag](om2.MFnNumericAttribute(mObject_attr).default)
+        if tag == "enum":
+            mFnEnumAttribute = om2.MFnEnumAttribute(mObject_attr)
+            value_index = mFnEnumAttribute.default
+            return [value_index, mFnEnumAttribute.fieldName(value_index)]
+        if tag == "distance":
+            return om2.MFnUnitAttribute(mObject_attr).default.asCentimeters()
+        if tag == "angle":
+            return om2.MFnUnitAttribute(mObject_attr).default.asRadians()
+        if tag == "time":
+            return om2.MFnUnitAttribute(mObject_attr).default.asUnits(om2.MTime.kSeconds)
+        if tag == "matrix":
+            if mObject_attr.hasFn(om2.MFn.kMatrixAttribute):
+                return array.array("d", om2.MFnMatrixAttribute(mObject_attr).default)
+            return array.array("d", om2.MMatrix())
+        if tag in _NUMERIC_COMPOUND_TYPECODES:
+            values = [attribute_default(child) for child in entry.children]
+            if _NO_DEFAULT in values:
+                return _NO_DEFAULT
+            return array.array(_NUMERIC_COMPOUND_TYPECODES[tag], values)
+        if tag in _EMPTY_DEFAULTS:
+            value = _EMPTY_DEFAULTS[tag]
+            return array.array(value) if tag.endswith("Array") else value
+    except (RuntimeError, TypeError, ValueError):
+        pass
+    return _NO_DEFAULT
+
+
+class DefaultTable(object):
+    """ノードタイプ毎のプラグの既定値 {ノード名を除いたパス: (型タグ, 既定値)}"""
+    def __init__(self, plan):
+        self.type_id = plan.type_id
+        self.defaults = collections.OrderedDict()
+        # 既定の許容差 (ELISION_TOLERANCES) で比べる関数 {パス: 関数}
+        self._checks = {}
+        stack = [(entry, entry.name) for entry in reversed(plan.entries)]
+        while stack:
+            entry, attr_path = stack.pop()
+            if entry.tag == "array":
+                if is_packed_entry(entry):
+                    element = entry.children[0]
+                    self.defaults[attr_path] = (element.tag + "[]", {"indices": array.array("i"),
+                                                                     "values": array.array(_PACKED_TYPECODES[element.tag])})
+            elif not is_leaf_entry(entry):
+                stack.extend((child, attr_path + "." + child.name) for child in reversed(entry.children))
+            else:
+                value = attribute_default(entry)
+                if value is not _NO_DEFAULT:
+                    self.defaults[attr_path] = (entry.tag, value)
+
+    def __len__(self):
+        return len(self.defaults)
+
+    def __contains__(self, attr_path):
+        return attr_path in self.defaults
+
+    def items(self):
+        return self.defaults.items()
+
+    def isDefault(self, attr_path, value, tolerances=None):
+        """値が既定値と許容差以内で一致するかどうか (既定値の無いパスは False)
+
+        読み取りに失敗した値 (None) は既定値が None のプラグ (message など) 以外では False にし、
+        省略せずにレコードを残す (省略すると復元時に既定値で上書きされてしまう)。
+        """
+        if tolerances is None:
+            check = self._checks.get(attr_path)
+            if check is None:
+                item = self.defaults.get(attr_path)
+                if item is None:
+                    return False
+                check = self._checks[attr_path] = _make_default_check(item[1], _snapshot._tolerance(ELISION_TOLERANCES, item[0]))
+            return check(value)
+        
+        item = self.defaults.get(attr_path)
+        if item is None:
+            return False
+        tag, default = item
+        return _snapshot.values_close(value, default, _snapshot._tolerance(tolerances, tag))
+
+
+def _make_default_check(default, tolerance):
+    """既定値と比べる関数を既定値の型毎に作る
+
+    values_close と同じ結果を返すが、読み取り関数が返す型 (float, array) は values_close を経由せずに比べる。
+    """
+    values_close = _snapshot.values_close
+    if default is None:
+        return lambda value: value is None
+    
+    default_type = type(default)
+    if default_type in (int, float):
+        def check(value):
+            if type(value) in (int, float):
+                return abs(value - default) <= tolerance
+            return values_close(value, default, tolerance)
+        return check
+    
+    if default_type is array.array:
+        count = len(default)
+        def check(value):
+            if type(value) is array.array and len(value) == count:
+                if value == default:
+                    return True
+                return tolerance > 0.0 and all(abs(x - y) <= tolerance for x, y in zip(value, default))
+            return values_close(value, default, tolerance)
+        return check
+    
+    def check(value):
+        if type(value) is default_type and value == default:
+            return True
+        return values_close(value, default, tolerance)
+    return check
+
+
+def get_default_table(plan):
+    """読み取り計画の既定値表を取得する (無ければ作成して計画と一緒にキャッシュする)
+
+    Args:
+        plan (ReaderPlan): 読み取り計画
+
+    Returns:
+        DefaultTable: 既定値表
+    """
+    if plan.default_table is None:
+        plan.default_table = DefaultTable(plan)
+    return plan.default_table
+
+def elide_default_records(records, node_name, plan, tolerances=None):
+    """既定値と一致するレコードを省略する
+
+    先頭に (ノード名.$defaults, "defaults", {"type", "typeId"}) のレコードを加え、
+    復元時に省略したプラグを既定値で埋め戻せるようにする。
+
+    Args:
+        records (iterable): 1ノード分の (プラグのパス, 型タグ, 値)
+        node_name (str): ノード名
+        plan (ReaderPlan): ノードの読み取り計画
+        tolerances (dict): {型タグ: 許容差} (省略時は ELISION_TOLERANCES)
+
+    Yields:
+        tuple: 既定値と異なるレコード
+    """
+    table = get_default_table(plan)
+    yield node_name + "." + ELIDED_DEFAULTS, "defaults", {"type": plan.type_name, "typeId": plan.type_id}
+    start = len(node_name) + 1
+    isDefault = table.isDefault
+    for record in records:
+        if not isDefault(record[0][start:], record[2], tolerances):
+            yield record
+
+
+# ---------------------------------------------------------------------------------- #
+# 複数ノード
+# ---------------------------------------------------------------------------------- #
+def get_selection_list(targets):
+    """ノード名 (ワイルドカード可) と MObject をまとめて1つの MSelectionList にする
+
+    Args:
+        targets (str | om2.MObject | list): 対象
+
+    Returns:
+        om2.MSelectionList: 選択リスト
+    """
+    if isinstance(targets, (str, om2.MObject)):
+        targets = [targets]
+    
+    mSelectionList = om2.MSelectionList()
+    for target in targets:
+        try:
+            mSelectionList.add(target)
+        except RuntimeError:
+            print(u"ノードが見つかりません:", target)
+    return mSelectionList
+
+def snapshot_nodes(targets):
+    """複数ノードの値をノードタイプ毎に列形式で取得する
+
+    関数セットは1つを setObject で使い回し、読み取り計画もタイプ毎に1度だけ引く。
+    処理時間の大半はプラグの読み取りのため、dump_node をノード毎に呼ぶ場合と速さは変わらない。
+    速さではなく、同じタイプのノードを列で比べられる形にまとめるために使う。
+
+    Args:
+        targets (str | om2.MObject | list): ノード名のパターンまたは MObject
+
+    Returns:
+        dict: {タイプ名: {"type_id": int,
+                         "nodes": [ノード名, ...],
+                         "columns": {アトリビュートのロング名: [ノード毎の値, ...]},
+                         "dynamic": [ノード毎のダイナミックアトリビュートの dict, ...]}}
+    """
+    mSelectionList = get_selection_list(targets)
+    mFnDependencyNode = om2.MFnDependencyNode()
+    
+    snapshots = {}
+    tables = {}
+    for i in range(mSelectionList.length()):
+        mObject = mSelectionList.getDependNode(i)
+        mFnDependencyNode.setObject(mObject)
+        type_id = mFnDependencyNode.typeId.id()
+        
+        table = tables.get(type_id)
+        if table is None:
+            plan = get_reader_plan(mFnDependencyNode)
+            snapshot = {
+                "type_id": type_id,
+                "nodes": [],
+                "columns": dict((name, []) for name in plan.names),
+                "dynamic": [],
+            }
+            columns = [snapshot["columns"][name] for name in plan.names]
+            table = tables[type_id] = (plan, snapshot, columns)
+            snapshots[plan.type_name] = snapshot
+        plan, snapshot, columns = table
+        
+        snapshot["nodes"].append(mFnDependencyNode.name())
+        for column, value in zip(columns, read_plan_values(mObject, plan)):
+            column.append(value)
+        snapshot["dynamic"].append(read_dynamic_values(mObject, mFnDependencyNode, plan))
+    
+    return snapshots
+
+
+# ---------------------------------------------------------------------------------- #
+# 差分更新
+# ---------------------------------------------------------------------------------- #
+class SnapshotSession(object):
+    """アトリビュート変更コールバックで変更されたプラグだけを再読み込みするスナップショット
+
+    Example:
+        session = SnapshotSession("skinCluster*")
+        ...
+        changed = session.refresh()   # 変更されたプラグだけを読み直す
+        session.values("skinCluster1")["envelope"]
+        session.close()
+    """
+    kDirtyMessages = (om2.MNodeMessage.kAttributeSet |
+                      om2.MNodeMessage.kAttributeArrayAdded |
+                      om2.MNodeMessage.kAttributeArrayRemoved |
+                      om2.MNodeMessage.kConnectionMade |
+                      om2.MNodeMessage.kConnectionBroken)
+
+    def __init__(self, targets):
+        self._nodes = {}
+        self._dirty = {}
+        self._callback_ids = []
+        
+        mSelectionList = get_selection_list(targets)
+        mFnDependencyNode = om2.MFnDependencyNode()
+        for i in range(mSelectionList.length()):
+            mObject = mSelectionList.getDependNode(i)
+            mFnDependencyNode.setObject(mObject)
+            plan = get_reader_plan(mFnDependencyNode)
+            
+            values = dict(zip(plan.names, read_plan_values(mObject, plan)))
+            values.update(read_dynamic_values(mObject, mFnDependencyNode, plan))
+            
+            handle = om2.MObjectHandle(mObject)
+            key = handle.hashCode()
+            self._nodes[key] = [handle, mFnDependencyNode.name(), plan, plan.entries_by_name, values]
+            self._callback_ids.append(om2.MNodeMessage.addAttributeChangedCallback(mObject, self._attributeChanged, key))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _attributeChanged(self, msg, mPlug, otherPlug, clientData):
+        if not msg & self.kDirtyMessages:
+            return
+        # 同じプラグへの通知は最後のものを残す (追加後の削除は削除、削除後の追加は読み直し)
+        self._dirty[(clientData, mPlug.partialName(useFullAttributePath=True, useLongNames=True))] = \
+            (om2.MPlug(mPlug), bool(msg & om2.MNodeMessage.kAttributeArrayRemoved))
+
+    def close(self):
+        """コールバックを解除する"""
+        if self._callback_ids:
+            om2.MMessage.removeCallbacks(self._callback_ids)
+            self._callback_ids = []
+
+    def isDirty(self):
+        return bool(self._dirty)
+
+    def nodes(self):
+        return [node[1] for node in self._nodes.values()]
+
+    def values(self, node_name):
+        """キャッシュされたノードの値を返す
+
+        Returns:
+            dict: dump_node と同じ形式
+        """
+        for handle, name, plan, entries, values in self._nodes.values():
+            if name == node_name:
+                return values
+        raise KeyError(node_name)
+
+    def refresh(self):
+        """変更されたプラグだけを読み直してキャッシュを更新する
+
+        Returns:
+            list[str]: 読み直したプラグのパス ("ノード名.プラグ")
+        """
+        dirty, self._dirty = self._dirty, {}
+        refreshed = []
+        # まとめて読み直したプラグはノード毎に記録する (同じプラグのパスが別ノードでも変更され得る)
+        bulk_done = {}
+        for (key, plug_path), (mPlug, removed) in dirty.items():
+            node = self._nodes.get(key)
+            if node is None or not node[0].isAlive():
+                continue
+            handle, name, plan, entries, values = node
+            top = self._patch(mPlug, plan, entries, values, bulk_done.setdefault(key, set()), removed)
+            if top is not None:
+                refreshed.append("%s.%s" % (name, top))
+        return refreshed
+
+    def _patch(self, mPlug, plan, entries, values, bulk_done, removed=False):
+        # プラグの階層をルートから辿れるように並べる
+        chain = []
+        mPlug_top = mPlug
+        while True:
+            if mPlug_top.isElement:
+                chain.append((None, mPlug_top.logicalIndex(), mPlug_top))
+                mPlug_top = mPlug_top.array()
+            if mPlug_top.isChild:
+                chain.append((mPlug_top.attribute(), None, mPlug_top))
+                mPlug_top = mPlug_top.parent()
+            else:
+                break
+        chain.reverse()
         
+        name = om2.MFnAttribute(mPlug_top.attribute()).name
+        entry = entries.get(name)
+        if entry is None:
+            # ダイナミックアトリビュートは最上位ごと読み直す
+            values[name] = convert_value(get_attribute_value(mPlug_top))
+            return name
+        
+        container, key, mPlug_current = values, name, mPlug_top
+        for mObject_attr, index, mPlug_level in chain:
+            # 一括取得するアトリビュート (スキンウェイトなど), 連続バッファの配列, 数値コンパウンドはまとめて読み直す
+            if is_leaf_entry(entry):
+                break
+            if index is not None:
+                child, child_key = entry.children[0], index
+            else:
+                child_key = om2.MFnAttribute(mObject_attr).name
+                for child in entry.children:
+                    if child.name == child_key:
+                        break
+                else:
+                    # 計画に無い子はこの階層ごと読み直す
+                    break
+            value = container.get(key)
+            if not isinstance(value, dict):
+                if removed:
+                    # 削除された要素の親がキャッシュに無い場合は何もしない
+                    return None
+                value = container[key] = {}
+            container, entry, key, mPlug_current = value, child, child_key, mPlug_level
+        else:
+            if removed and chain:
+                # 削除された要素は読み直さずにキャッシュから取り除く
+                container.pop(key, None)
+                return mPlug_current.partialName(useFullAttributePath=True, useLongNames=True)
+        
+        plug_path = mPlug_current.partialName(useFullAttributePath=True, useLongNames=True)
+        if plug_path in bulk_done:
+            return None
+        bulk_done.add(plug_path)
+        start = time.perf_counter()
+        try:
+            container[key] = entry.reader(mPlug_current)
+        except Exception as e:
+            print(mPlug_current.info, e)
+            container[key] = None
+        if _PROFILER is not None:
+            _PROFILER.add(plan, entry, time.perf_counter() - start, value_nbytes(container[key]))
+        return plug_path
+
+
+# ---------------------------------------------------------------------------------- #
+# 接続グラフ
+# ---------------------------------------------------------------------------------- #
+# ノードとプラグを1つの名前表で整数に割り当て、辺を隣接配列 (CSR) で保持する。
+# 辺は 接続 (出力プラグ -> 入力プラグ)、入力プラグ -> ノード、ノード -> 出力プラグ の3種類で、
+# ノード内ではすべての入力がすべての出力に影響するとみなす。
+# 接続は listConnections の2回の呼び出しでまとめて取得し、辺毎に Maya へ問い合わせない。
+class ConnectionGraph(object):
+    """プラグ単位の接続グラフ
+
+    トポロジカル順と強連結成分 (循環) はキャッシュし、接続の追加時は影響する範囲だけを
+    並べ替える (Pearce-Kelly)。循環ができた場合と循環内の接続が切れた場合だけ再計算する。
+
+    Example:
+        graph = get_connection_graph("*", watch=True)
+        graph.upstream("joint1")            # joint1 を駆動しているノード
+        graph.upstream("joint1.rotateX", plugs=True)
+        graph.cycles()
+        graph.close()
+    """
+    # CSR の作成後に追加・削除した辺がこの割合を超えたら作り直す
+    kRebuildRatio = 0.125
+
+    def __init__(self):
+        self.names = []
+        self._ids = {}
+        self._nodes = set()
+        self._src = array.array("i")
+        self._dst = array.array("i")
+        self._edges = {}
+        self._removed = set()
+        self._out = None
+        self._in = None
+        self._added_out = collections.defaultdict(list)
+        self._added_in = collections.defaultdict(list)
+        self._added_count = 0
+        self._components = None
+        self._members = None
+        self._order = None
+        self._position = None
+        self._order_names = {}
+        self._callback_ids = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def edgeCount(self):
+        return len(self._edges)
+
+    # ------------------------------------------------------------------------------ #
+    # 辺の追加と削除
+    # ------------------------------------------------------------------------------ #
+    def vertex(self, name):
+        """名前の頂点番号 (無い場合は追加する)"""
+        vertex = self._ids.get(name)
+        if vertex is None:
+            vertex = self._ids[name] = len(self.names)
+            self.names.append(name)
+            if self._components is not None:
+                # 孤立した頂点は新しい成分として末尾に置く
+                self._order_names = {}
+                self._components.append(len(self._members))
+                self._position.append(len(self._order))
+                self._order.append(len(self._members))
+                self._members.append([vertex])
+        return vertex
+
+    def addNodes(self, node_names):
+        for node_name in node_names:
+            self._nodes.add(node_name)
+            self.vertex(node_name)
+
+    def connect(self, source, destination):
+        """接続を追加する
+
+        Args:
+            source (str): 出力側のプラグ "node.attr"
+            destination (str): 入力側のプラグ
+        """
+        source_node = source.split(".", 1)[0]
+        destination_node = destination.split(".", 1)[0]
+        self._add_edge(self.vertex(source_node), self.vertex(source))
+        self._add_edge(self.vertex(destination), self.vertex(destination_node))
+        self._add_edge(self._ids[source], self._ids[destination])
+
+    def disconnect(self, source, destination):
+        """接続を削除する (プラグとノードの間の辺は残す)"""
+        u = self._ids.get(source)
+        v = self._ids.get(destination)
+        if u is not None and v is not None:
+            self._remove_edge(u, v)
+
+    def _add_edge(self, u, v):
+        if (u, v) in self._edges:
+            return
+        edge = len(self._src)
+        self._src.append(u)
+        self._dst.append(v)
+        self._edges[(u, v)] = edge
+        if self._out is not None:
+            self._added_out[u].append(v)
+            self._added_in[v].append(u)
+            self._added_count += 1
+        self._update_order(u, v)
+
+    def _remove_edge(self, u, v):
+        edge = self._edges.pop((u, v), None)
+        if edge is None:
+            return
+        self._removed.add(edge)
+        if u in self._added_out and v in self._added_out[u]:
+            self._added_out[u].remove(v)
+            self._added_in[v].remove(u)
+        if self._components is not None:
+            component = self._components[u]
+            if component == self._components[v] and len(self._members[component]) > 1:
+                # 循環が分かれる可能性があるため再計算する
+                self._components = None
+
+    # ------------------------------------------------------------------------------ #
+    # 隣接配列
+    # ------------------------------------------------------------------------------ #
+    def _build(self):
+        """生きている辺だけで CSR を作り直す"""
+        if self._removed:
+            live = [edge for edge in range(len(self._src)) if edge not in self._removed]
+            self._src = array.array("i", [self._src[edge] for edge in live])
+            self._dst = array.array("i", [self._dst[edge] for edge in live])
+            self._edges = dict(((u, v), edge) for edge, (u, v) in enumerate(zip(self._src, self._dst)))
+            self._removed = set()
+        count = len(self.names)
+        self._out = _build_csr(self._src, self._dst, count)
+        self._in = _build_csr(self._dst, self._src, count)
+        self._added_out.clear()
+        self._added_in.clear()
+        self._added_count = 0
+
+    def _ensure_csr(self):
+        if self._out is None or self._added_count + len(self._removed) > self.kRebuildRatio * len(self._src) + 64:
+            self._build()
+
+    def _neighbors(self, vertex, csr, added, forward):
+        indptr, indices = csr
+        if vertex + 1 < len(indptr):
+            neighbors = indices[indptr[vertex]:indptr[vertex + 1]]
+            if self._removed:
+                edges = self._edges
+                neighbors = [w for w in neighbors if ((vertex, w) if forward else (w, vertex)) in edges]
+        else:
+            neighbors = ()
+        extra = added.get(vertex)
+        if extra:
+            return list(neighbors) + extra
+        return neighbors
+
+    def successors(self, name):
+        self._ensure_csr()
+        return [self.names[w] for w in self._neighbors(self._ids[name], self._out, self._added_out, True)]
+
+    def predecessors(self, name):
+        self._ensure_csr()
+        return [self.names[w] for w in self._neighbors(self._ids[name], self._in, self._added_in, False)]
+
+    def csr(self):
+        """出力方向の隣接配列
+
+        Returns:
+            tuple: (indptr, indices) 頂点 v の出力先は indices[indptr[v]:indptr[v + 1]]
+        """
+        self._build()
+        return self._out
+
+    # ------------------------------------------------------------------------------ #
+    # 探索
+    # ------------------------------------------------------------------------------ #
+    def _walk(self, name, forward, plugs):
+        self._ensure_csr()
+        csr, added = (self._out, self._added_out) if forward else (self._in, self._added_in)
+        start = self._ids[name]
+        visited = set([start])
+        queue = collections.deque([start])
+        while queue:
+            vertex = queue.popleft()
+            for w in self._neighbors(vertex, csr, added, forward):
+                if w not in visited:
+                    visited.add(w)
+                    queue.append(w)
+        visited.discard(start)
+        names = [self.names[vertex] for vertex in sorted(visited)]
+        if plugs:
+            return names
+        return [name for name in names if "." not in name]
+
+    def upstream(self, name, plugs=False):
+        """name を駆動しているノード (plugs が True の場合はプラグも含む)"""
+        return self._walk(name, False, plugs)
+
+    def downstream(self, name, plugs=False):
+        """name が駆動しているノード (plugs が True の場合はプラグも含む)"""
+        return self._walk(name, True, plugs)
+
+    # ------------------------------------------------------------------------------ #
+    # トポロジカル順と強連結成分
+    # ------------------------------------------------------------------------------ #
+    def _ensure_components(self):
+        if self._components is not None:
+            return
+        self._ensure_csr()
+        count = len(self.names)
+        index = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack = []
+        components = [-1] * count
+        members = []
+        counter = 0
+        out, added = self._out, self._added_out
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, iter(self._neighbors(root, out, added, True)))]
+            while work:
+                v, neighbors = work[-1]
+                for w in neighbors:
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, iter(self._neighbors(w, out, added, True))))
+                        break
+                    elif on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                else:
+                    work.pop()
+                    if work and low[v] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[v]
+                    if low[v] == index[v]:
+                        group = []
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = False
+                            components[w] = len(members)
+                            group.append(w)
+                            if w == v:
+                                break
+                        members.append(group)
         
+        # Tarjan は成分を逆トポロジカル順に返す
+        self._order_names = {}
+        self._components = components
+        self._members = members
+        self._order = list(range(len(members) - 1, -1, -1))
+        self._position = [0] * len(members)
+        for position, component in enumerate(self._order):
+            self._position[component] = position
+
+    def _component_neighbors(self, component, forward):
+        csr, added = (self._out, self._added_out) if forward else (self._in, self._added_in)
+        components = self._components
+        for vertex in self._members[component]:
+            for w in self._neighbors(vertex, csr, added, forward):
+                yield components[w]
+
+    def _update_order(self, u, v):
+        """辺 u -> v の追加でトポロジカル順が崩れた範囲だけを並べ替える"""
+        if self._components is None:
+            return
+        position = self._position
+        cu = self._components[u]
+        cv = self._components[v]
+        if cu == cv or position[cu] < position[cv]:
+            return
+        self._ensure_csr()
+        if self._components is None:
+            return
+        lower, upper = position[cv], position[cu]
         
+        forward = set([cv])
+        stack = [cv]
+        while stack:
+            for c in self._component_neighbors(stack.pop(), True):
+                if c == cu:
+                    # 循環ができたため成分ごと再計算する
+                    self._components = None
+                    return
+                if c not in forward and position[c] < upper:
+                    forward.add(c)
+                    stack.append(c)
         
+        backward = set([cu])
+        stack = [cu]
+        while stack:
+            for c in self._component_neighbors(stack.pop(), False):
+                if c not in backward and position[c] > lower:
+                    backward.add(c)
+                    stack.append(c)
         
+        self._order_names = {}
+        moved = sorted(backward, key=position.__getitem__) + sorted(forward, key=position.__getitem__)
+        slots = sorted(position[c] for c in moved)
+        for slot, c in zip(slots, moved):
+            self._order[slot] = c
+            position[c] = slot
+
+    def topologicalOrder(self, plugs=False):
+        """駆動する側から順に並べた名前 (循環内の順序は不定)"""
+        self._ensure_components()
+        names = self._order_names.get(plugs)
+        if names is None:
+            names = [self.names[vertex] for component in self._order for vertex in self._members[component]]
+            if not plugs:
+                names = [name for name in names if "." not in name]
+            self._order_names[plugs] = names
+        return list(names)
+
+    def cycles(self):
+        """循環している (2つ以上の頂点を持つ強連結成分の) ノードとプラグの名前"""
+        self._ensure_components()
+        return [sorted(self.names[vertex] for vertex in group) for group in self._members if len(group) > 1]
+
+    # ------------------------------------------------------------------------------ #
+    # 接続の監視
+    # ------------------------------------------------------------------------------ #
+    def watch(self):
+        """接続の変更を監視してグラフを更新する"""
+        if not self._callback_ids:
+            self._callback_ids.append(om2.MDGMessage.addConnectionCallback(self._connectionChanged))
+
+    def _connectionChanged(self, srcPlug, destPlug, made, clientData):
+        source = srcPlug.partialName(includeNodeName=True, useLongNames=True)
+        destination = destPlug.partialName(includeNodeName=True, useLongNames=True)
+        if source.split(".", 1)[0] not in self._nodes and destination.split(".", 1)[0] not in self._nodes:
+            return
+        if made:
+            self.connect(source, destination)
+        else:
+            self.disconnect(source, destination)
 
+    def close(self):
+        """コールバックを解除する"""
+        if self._callback_ids:
+            om2.MMessage.removeCallbacks(self._callback_ids)
+            self._callback_ids = []
+
+
+def _build_csr(rows, columns, count):
+    """(行, 列) の並びから CSR (indptr, indices) を作る"""
+    if np is not None and len(rows):
+        rows_np = np.frombuffer(rows, dtype=np.int32)
+        order = np.argsort(rows_np, kind="stable")
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows_np, minlength=count), out=indptr[1:])
+        indices = np.frombuffer(columns, dtype=np.int32)[order]
+        return array.array("q", indptr.tobytes()), array.array("i", indices.tobytes())
+    
+    indptr = array.array("q", [0]) * (count + 1)
+    for row in rows:
+        indptr[row + 1] += 1
+    for i in range(count):
+        indptr[i + 1] += indptr[i]
+    cursor = array.array("q", indptr)
+    indices = array.array("i", [0]) * len(rows)
+    for row, column in zip(rows, columns):
+        indices[cursor[row]] = column
+        cursor[row] += 1
+    return indptr, indices
+
+def get_connection_graph(targets, watch=False):
+    """ノードのプラグ単位の接続グラフを取得する
+
+    Args:
+        targets (str | om2.MObject | list): 対象ノード (get_selection_list を参照)
+        watch (bool): True の場合は接続の変更を監視して更新する (使い終わったら close を呼ぶ)
+
+    Returns:
+        ConnectionGraph: 接続グラフ
+    """
+    mSelectionList = get_selection_list(targets)
+    mFnDependencyNode = om2.MFnDependencyNode()
+    node_names = []
+    for i in range(mSelectionList.length()):
+        mFnDependencyNode.setObject(mSelectionList.getDependNode(i))
+        node_names.append(mFnDependencyNode.name())
+    
+    graph = ConnectionGraph()
+    graph.addNodes(node_names)
+    if node_names:
+        # 接続は (対象のプラグ, 相手のプラグ) の組で返る
+        incoming = cmds.listConnections(node_names, source=True, destination=False, connections=True, plugs=True) or []
+        for i in range(0, len(incoming), 2):
+            graph.connect(incoming[i + 1], incoming[i])
+        outgoing = cmds.listConnections(node_names, source=False, destination=True, connections=True, plugs=True) or []
+        for i in range(0, len(outgoing), 2):
+            graph.connect(outgoing[i], outgoing[i + 1])
+    if watch:
+        graph.watch()
+    return graph
+
+
+# ---------------------------------------------------------------------------------- #
+# 時間サンプリング
+# ---------------------------------------------------------------------------------- #
+# 各フレームの MDGContext を評価コンテキストにしてプラグを読む。
+# currentTime を動かさないのでシーン全体の再評価やビューポートの更新が起きず、
+# 値は getAttr を経由せずに (フレーム数 x プラグ数) の float64 バッファへ直接書き込む。
+def sample_plugs(plugs, frames):
+    """複数のプラグを複数フレームで評価する
+
+    Args:
+        plugs (list[om2.MPlug | str]): プラグ ("node.attr[0].child" 形式のパスも可)
+        frames (iterable): フレーム (UI の時間単位)
+
+    Returns:
+        numpy.ndarray | array.array: (フレーム数, プラグ数) の float64
+                                     numpy が無い場合は行優先の array("d")
+    """
+    plugs = [get_plug(mPlug) if isinstance(mPlug, str) else mPlug for mPlug in plugs]
+    frames = list(frames)
+    plug_count = len(plugs)
+    if np is not None:
+        samples = np.empty((len(frames), plug_count), dtype=np.float64)
+    else:
+        samples = array.array("d", bytes(8 * len(frames) * plug_count))
+    
+    unit = om2.MTime.uiUnit()
+    # Maya 2018 以降は makeCurrent で評価コンテキストを切り替える (asDouble(context) は非推奨)
+    make_current = hasattr(om2.MDGContext, "makeCurrent")
+    for i, frame in enumerate(frames):
+        mDGContext = om2.MDGContext(om2.MTime(frame, unit))
+        if make_current:
+            previous = mDGContext.makeCurrent()
+            try:
+                row = [mPlug.asDouble() for mPlug in plugs]
+            finally:
+                previous.makeCurrent()
+        else:
+            row = [mPlug.asDouble(mDGContext) for mPlug in plugs]
+        if np is not None:
+            samples[i] = row
+        else:
+            samples[i * plug_count:(i + 1) * plug_count] = array.array("d", row)
+    return samples
+
+
+# ---------------------------------------------------------------------------------- #
+# ストリーミング
+# ---------------------------------------------------------------------------------- #
+def _iter_children(mPlug, children, path):
+    for entry in children:
+        yield mPlug.child(entry.attribute), entry, path + "." + entry.name
+
+def _iter_elements(mPlug, element, path):
+    for i in range(mPlug.numElements()):
+        elem_plug = mPlug.elementByPhysicalIndex(i)
+        yield elem_plug, element, "%s[%d]" % (path, elem_plug.logicalIndex())
+
+def iter_entry_records(mPlug, entry, path):
+    """読み取り計画に従ってプラグを深さ優先で走査する
+
+    配列とコンパウンドはイテレータのスタックで展開するため、
+    保持するのは階層の深さ分だけで要素数には依存しない。
+    数値と行列の配列は要素に分けず "double[]" などの型タグで1レコードにする。
+    数値コンパウンド (double3 など) も子に分けず1レコードにする。
+
+    Yields:
+        tuple: (プラグのパス, 型タグ, 値)
+    """
+    stack = [iter(((mPlug, entry, path),))]
+    while stack:
+        for mPlug, entry, path in stack[-1]:
+            tag = entry.tag
+            if tag == "array":
+                if not is_packed_entry(entry):
+                    stack.append(_iter_elements(mPlug, entry.children[0], path))
+                    break
+                # 数値と行列の配列は連続バッファとして1レコードにまとめる
+                tag = entry.children[0].tag + "[]"
+            elif not is_leaf_entry(entry):
+                stack.append(_iter_children(mPlug, entry.children, path))
+                break
+            try:
+                value = entry.reader(mPlug)
+            except Exception as e:
+                print(path, e)
+                value = None
+            yield path, tag, value
+        else:
+            stack.pop()
+
+def iter_plug_records(mObject, elide_defaults=False, tolerances=None):
+    """ノードの全プラグを (プラグのパス, 型タグ, 値) として順に返す
+
+    必要なアトリビュートを読んだ時点でループを抜ければ残りは読み込まれない。
+
+    Args:
+        mObject (om2.MObject): 対象ノード
+        elide_defaults (bool): 既定値と一致するプラグを省略する (elide_default_records を参照)
+                               省略したスナップショットを restore_snapshot しても
+                               スナップショットに無い配列の要素は削除されない
+        tolerances (dict): 既定値との比較に使う {型タグ: 許容差}
+
+    Yields:
+        tuple: ("skinCluster1.weightList[0].weights[3]", "double", 0.5) など
+    """
+    mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    plan = get_reader_plan(mFnDependencyNode)
+    node_name = mFnDependencyNode.name()
+    
+    records = _iter_static_records(mObject, plan, node_name)
+    if elide_defaults:
+        records = elide_default_records(records, node_name, plan, tolerances)
+    for record in records:
+        yield record
+    
+    # ダイナミックアトリビュート (ノードタイプの既定値表に含まれないため省略しない)
+    for i in range(plan.attribute_count, mFnDependencyNode.attributeCount()):
+        mObject_attr = mFnDependencyNode.attribute(i)
+        if not om2.MFnAttribute(mObject_attr).parent.isNull():
+            continue
+        entry = build_plan_entry(mObject_attr)
+        for record in iter_entry_records(om2.MPlug(mObject, mObject_attr), entry, node_name + "." + entry.name):
+            yield record
+
+def _iter_static_records(mObject, plan, node_name):
+    profiler = _PROFILER
+    for entry in plan.entries:
+        records = iter_entry_records(om2.MPlug(mObject, entry.attribute), entry, node_name + "." + entry.name)
+        if profiler is not None:
+            records = _iter_records_profiled(records, plan, entry, profiler)
+        for record in records:
+            yield record
+
+def write_node_records(mObjects, path, compress=None, buffer_size=1 << 16, elide_defaults=False,
+                       callback=None, **kwargs):
+    """ノードのレコードを逐次書き出す
+
+    拡張子が .snap の場合は列形式のバイナリ、それ以外は NDJSON (.gz の場合は gzip)。
+
+    Args:
+        mObjects (list[om2.MObject]): 対象ノード
+        path (str): 出力先
+        compress (bool | str): None の場合は拡張子で判定する (.snap の場合は "zlib" / "lzma")
+        buffer_size (int): 書き出し前に溜めておく最大バイト数
+        elide_defaults (bool): 既定値と一致するプラグを省略する (restore_snapshot は配列の要素を削除しない)
+        callback (callable): ノード毎に callback(書き込んだレコード数) を呼ぶ
+                             (進捗表示や UI のイベント処理に使う。False を返すと中断する)
+        **kwargs: .snap の場合に _snapshot.BinaryWriter に渡す引数 (hash_name, workers, merkle など)
+
+    Returns:
+        int: 書き込んだレコード数
+    """
+    count = 0
+    writer = _snapshot.open_writer(path, compress=compress, buffer_size=buffer_size, **kwargs)
+    with writer:
+        for mObject in mObjects:
+            count += writer.write_records(iter_plug_records(mObject, elide_defaults=elide_defaults))
+            if callback is not None and callback(count) is False:
+                break
+    return count
+
+def hash_nodes(targets, keep_values=True):
+    """ノードのレコードを読みながら MerkleTree を作成する
+
+    Example:
+        changes = _snapshot.diff(hash_nodes("skinCluster*"), "rig_v1.snap", tolerances={"matrix": 1e-5})
+
+    Args:
+        targets (str | om2.MObject | list): 対象ノード (get_selection_list を参照)
+        keep_values (bool): 値を保持するかどうか (diff で変更前後の値を返すために必要)
+
+    Returns:
+        _snapshot.MerkleTree: 木
+    """
+    tree = _snapshot.MerkleTree(keep_values=keep_values)
+    mSelectionList = get_selection_list(targets)
+    for i in range(mSelectionList.length()):
+        for plug_path, type_tag, value in iter_plug_records(mSelectionList.getDependNode(i)):
+            tree.add(plug_path, type_tag, value)
+    return tree
+
+
+# ---------------------------------------------------------------------------------- #
+# 計測
+# ---------------------------------------------------------------------------------- #
+_PROFILER = None
+
+def value_nbytes(value):
+    """読み取った値のおおよそのバイト数"""
+    if value is None:
+        return 0
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    if isinstance(value, array.array):
+        return len(value) * value.itemsize
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(value_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_nbytes(item) for item in value)
+    return 0
+
+
+class DumpProfiler(object):
+    """ダンプの読み取りを読み取り関数の種類 (型タグ) 別・プラグ別に計測する
+
+    with ブロック内の dump_node, snapshot_nodes, iter_plug_records, SnapshotSession の
+    読み取りを最上位アトリビュート単位で集計する。
+
+    Example:
+        with DumpProfiler() as profiler:
+            snapshot_nodes("skinCluster*")
+        print(profiler.report())
+        profiler.save("dump_profile.json")
+    """
+    def __init__(self):
+        self.branches = {}
+        self.plugs = {}
+        self._branch_names = {}
+        self._previous = None
+
+    def __enter__(self):
+        global _PROFILER
+        self._previous = _PROFILER
+        _PROFILER = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _PROFILER
+        _PROFILER = self._previous
+
+    def add(self, plan, entry, seconds, nbytes, calls=1):
+        """1回分の読み取りを記録する"""
+        key = (plan.type_id, entry.name)
+        names = self._branch_names.get(key)
+        if names is None:
+            # 分岐は読み取り関数の種類 (レコードの型タグ) で分ける。apiType ではスキンウェイトの一括取得が
+            # kCompoundAttribute として他のコンパウンドと混ざってしまう
+            branch = entry.children[0].tag + "[]" if is_packed_entry(entry) else entry.tag
+            names = self._branch_names[key] = (branch, "%s.%s" % (plan.type_name, entry.name))
+        branch, plug = names
+        for table, name in ((self.branches, branch), (self.plugs, plug)):
+            stats = table.get(name)
+            if stats is None:
+                stats = table[name] = [0, 0.0, 0]
+            stats[0] += calls
+            stats[1] += seconds
+            stats[2] += nbytes
+
+    def toDict(self):
+        def rows(table):
+            return [{"name": name, "calls": calls, "seconds": seconds, "bytes": nbytes}
+                    for name, (calls, seconds, nbytes) in sorted(table.items(), key=lambda item: -item[1][1])]
+        return {"branches": rows(self.branches), "plugs": rows(self.plugs)}
+
+    def save(self, path):
+        """集計結果を JSON に保存する (CI での比較用)"""
+        with open(path, "w") as f:
+            json.dump(self.toDict(), f, indent=2)
+
+    def report(self, limit=20):
+        """所要時間の降順に並べた集計表を返す"""
+        data = self.toDict()
+        lines = []
+        for title, rows in (("branch", data["branches"]), ("plug", data["plugs"][:limit])):
+            lines.append("%-48s %10s %12s %14s" % (title, "calls", "ms", "bytes"))
+            for row in rows:
+                lines.append("%-48s %10d %12.3f %14d" % (row["name"], row["calls"], row["seconds"] * 1000.0, row["bytes"]))
+            lines.append("")
+        return "\n".join(lines)
+
+
+def _read_plan_values_profiled(mObject, plan, profiler):
+    values = []
+    append = values.append
+    clock = time.perf_counter
+    for entry in plan.entries:
+        start = clock()
+        try:
+            value = entry.reader(om2.MPlug(mObject, entry.attribute))
+        except Exception as e:
+            print(entry.name, e)
+            value = None
+        profiler.add(plan, entry, clock() - start, value_nbytes(value))
+        append(value)
+    return values
+
+def _iter_records_profiled(records, plan, entry, profiler):
+    # 利用側の処理時間を含めないよう、次のレコードを取り出す時間だけを計測する
+    clock = time.perf_counter
+    seconds = 0.0
+    nbytes = 0
+    while True:
+        start = clock()
+        record = next(records, None)
+        seconds += clock() - start
+        if record is None:
+            break
+        nbytes += value_nbytes(record[2])
+        yield record
+    profiler.add(plan, entry, seconds, nbytes)
+
+
+# ---------------------------------------------------------------------------------- #
+# 復元
+# ---------------------------------------------------------------------------------- #
+# プラグのパス "weightList[3].weights[2]" を (アトリビュート名 | 論理インデックス) に分解する
+_PLUG_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+def find_plug(mObject, attr_path, mFnDependencyNode=None):
+    """ノード上のパス "weightList[3].weights[2]" のプラグを取得する
+
+    Args:
+        mObject (om2.MObject): ノード
+        attr_path (str): ノード名を除いたプラグのパス
+        mFnDependencyNode (om2.MFnDependencyNode): mObject を設定済みのもの (省略時は作成する)
+
+    Returns:
+        om2.MPlug: プラグ
+    """
+    if mFnDependencyNode is None:
+        mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    mPlug = None
+    for name, index in _PLUG_PATH_TOKEN.findall(attr_path):
+        if name:
+            mObject_attr = mFnDependencyNode.attribute(name)
+            mPlug = om2.MPlug(mObject, mObject_attr) if mPlug is None else mPlug.child(mObject_attr)
+        else:
+            mPlug = mPlug.elementByLogicalIndex(int(index))
+    return mPlug
+
+def get_plug(plug_path):
+    """ノード名を含むパス "node.attr[0].child" のプラグを取得する
+
+    Args:
+        plug_path (str): ノード名を含むプラグのパス
+
+    Returns:
+        om2.MPlug: プラグ
+    """
+    node_name, attr_path = plug_path.split(".", 1)
+    mObject = om2.MGlobal.getSelectionListByName(node_name).getDependNode(0)
+    return find_plug(mObject, attr_path)
+
+def _set_matrix(mDGModifier, mPlug, value):
+    mDGModifier.newPlugValue(mPlug, om2.MFnMatrixData().create(om2.MMatrix(list(value))))
+
+def _set_int_array(mDGModifier, mPlug, value):
+    mDGModifier.newPlugValue(mPlug, om2.MFnIntArrayData().create(om2.MIntArray(list(value))))
+
+def _set_double_array(mDGModifier, mPlug, value):
+    mDGModifier.newPlugValue(mPlug, om2.MFnDoubleArrayData().create(om2.MDoubleArray(list(value))))
+
+def _set_enum(mDGModifier, mPlug, value):
+    mDGModifier.newPlugValueInt(mPlug, value[0] if isinstance(value, (list, tuple)) else value)
+
+def _set_time(mDGModifier, mPlug, value):
+    if not isinstance(value, om2.MTime):
+        value = om2.MTime(float(value), om2.MTime.kSeconds)
+    mDGModifier.newPlugValueMTime(mPlug, value)
+
+def _make_numeric_compound_writer(set_value, convert):
+    def set_numeric_compound(mDGModifier, mPlug, value):
+        for i, item in enumerate(value):
+            set_value(mDGModifier, mPlug.child(i), convert(item))
+    return set_numeric_compound
+
+_PLUG_WRITERS = {
+    "bool":         om2.MDGModifier.newPlugValueBool,
+    "byte":         om2.MDGModifier.newPlugValueInt,
+    "short":        om2.MDGModifier.newPlugValueShort,
+    "long":         om2.MDGModifier.newPlugValueInt,
+    "float":        om2.MDGModifier.newPlugValueFloat,
+    "double":       om2.MDGModifier.newPlugValueDouble,
+    "string":       om2.MDGModifier.newPlugValueString,
+    "enum":         _set_enum,
+    "matrix":       _set_matrix,
+    "intArray":     _set_int_array,
+    "doubleArray":  _set_double_array,
+    "distance":     om2.MDGModifier.newPlugValueDouble,
+    "angle":        om2.MDGModifier.newPlugValueDouble,
+    "time":         _set_time,
+}
+for _tag, _typecode in _NUMERIC_COMPOUND_TYPECODES.items():
+    if _typecode in ("d", "f"):
+        _PLUG_WRITERS[_tag] = _make_numeric_compound_writer(om2.MDGModifier.newPlugValueDouble, float)
+    else:
+        _PLUG_WRITERS[_tag] = _make_numeric_compound_writer(om2.MDGModifier.newPlugValueInt, int)
+
+
+class SnapshotRestore(object):
+    """スナップショットの値を1つの MDGModifier にまとめて適用する
+
+    スキンウェイトは setWeights の一括呼び出しで適用し、変更前のウェイトを保持する。
+    undoIt() 1回ですべての変更が元に戻るため、_restore_command の MPxCommand の doIt/undoIt/redoIt から
+    そのまま呼び出して Maya のアンドゥも1ステップにする (execute_restore を参照)。
+    """
+    def __init__(self):
+        self._modifier = om2.MDGModifier()
+        self._skin_weights = []
+        self.plug_count = 0
+        self.skipped = []
+
+    def doIt(self):
+        self._modifier.doIt()
+        for item in self._skin_weights:
+            mFnSkinCluster, mDagPath, components, influences, weights, _ = item
+            item[5] = mFnSkinCluster.setWeights(mDagPath, components, influences, weights, False, True)
+
+    redoIt = doIt
+
+    def undoIt(self):
+        for mFnSkinCluster, mDagPath, components, influences, weights, old_weights in reversed(self._skin_weights):
+            if old_weights is not None:
+                mFnSkinCluster.setWeights(mDagPath, components, influences, old_weights, False)
+        self._modifier.undoIt()
+
+    def addPlugValue(self, mPlug, type_tag, value):
+        """プラグの値をモディファイヤーに追加する"""
+        if value is None:
+            return
+        
+        if type_tag.endswith("[]"):
+            # 連続バッファの配列 {"indices": [...], "values": [...]}
+            element_tag = type_tag[:-2]
+            indices = value["indices"]
+            values = value["values"]
+            stride = 16 if element_tag == "matrix" else 1
+            for i, logical_index in enumerate(indices):
+                element = values[i * stride:(i + 1) * stride] if stride > 1 else values[i]
+                self.addPlugValue(mPlug.elementByLogicalIndex(int(logical_index)), element_tag, element)
+            return
+        
+        writer = _PLUG_WRITERS.get(type_tag)
+        if writer is None:
+            self.skipped.append(mPlug.info)
+            return
+        try:
+            if type_tag in ("bool", "byte", "short", "long"):
+                value = int(value)
+            elif type_tag in ("float", "double", "distance", "angle"):
+                value = float(value)
+            writer(self._modifier, mPlug, value)
+        except (TypeError, ValueError):
+            self.skipped.append(mPlug.info)
+            return
+        self.plug_count += 1
+
+    def addSkinWeights(self, mObject, value, index=0):
+        """get_skin_weights の結果を setWeights の一括呼び出しとして追加する
+
+        インフルエンスは名前で対応付けるため、並び順が異なるスキンクラスターにも適用できる。
+        """
+        mFnSkinCluster = oma2.MFnSkinCluster(mObject)
+        mDagPath = mFnSkinCluster.getPathAtIndex(index)
+        vertex_count, influence_count = value["shape"]
+        
+        influence_indices = dict((mDagPath_inf.partialPathName(), i) for i, mDagPath_inf in enumerate(mFnSkinCluster.influenceObjects()))
+        columns = []
+        influences = om2.MIntArray()
+        for column, name in enumerate(value["influences"]):
+            if name in influence_indices:
+                columns.append(column)
+                influences.append(influence_indices[name])
+            else:
+                print(u"インフルエンスが見つかりません:", name)
+        
+        if "weights" in value:
+            weights = value["weights"]
+        else:
+            weights = _csr_to_dense(value, vertex_count, influence_count)
+        
+        if np is not None:
+            weights = np.asarray(weights, dtype=np.float64).reshape(vertex_count, influence_count)
+            if len(columns) != influence_count:
+                weights = weights[:, columns]
+            mDoubleArray = om2.MDoubleArray(weights.ravel().tolist())
+        else:
+            flat = [w for row in weights for w in row] if weights and isinstance(weights[0], (list, tuple)) else list(weights)
+            mDoubleArray = om2.MDoubleArray([flat[v * influence_count + column] for v in range(vertex_count) for column in columns])
+        
+        mFnSingleIndexedComponent = om2.MFnSingleIndexedComponent()
+        components = mFnSingleIndexedComponent.create(om2.MFn.kMeshVertComponent)
+        mFnSingleIndexedComponent.setCompleteData(vertex_count)
+        self._skin_weights.append([mFnSkinCluster, mDagPath, components, influences, mDoubleArray, None])
+
+def _csr_to_dense(value, vertex_count, influence_count):
+    indptr, indices, data = value["indptr"], value["indices"], value["data"]
+    if np is not None:
+        dense = np.zeros((vertex_count, influence_count), dtype=np.float64)
+        rows = np.repeat(np.arange(vertex_count), np.diff(np.asarray(indptr)))
+        dense[rows, np.asarray(indices)] = data
+        return dense
+    dense = array.array("d", bytes(8 * vertex_count * influence_count))
+    for v in range(vertex_count):
+        for k in range(indptr[v], indptr[v + 1]):
+            dense[v * influence_count + indices[k]] = data[k]
+    return dense
+
+def restore_snapshot(snapshot, nodes=None, execute=True):
+    """スナップショットをノードに書き戻す
+
+    Args:
+        snapshot (iterable): (プラグのパス, 型タグ, 値) のレコード
+                             (iter_plug_records, _snapshot.iter_records など)
+        nodes (dict): {スナップショット上のノード名: 書き戻すノード名または MObject}
+                      None の場合は同名のノードに書き戻す
+        execute (bool): True の場合は execute_restore でアンドゥ可能なコマンドとして適用する
+                        (False の場合は適用せずに返す)
+
+    既定値を省略したスナップショット (elide_defaults) は、レコードの無いプラグを
+    書き戻し先のノードタイプの既定値で埋め戻す。
+    配列の要素は削除しないため、スナップショットに無い要素が書き戻し先にある場合はそのまま残る。
+
+    Returns:
+        SnapshotRestore: 適用した変更 (cmds.undo または undoIt() で1回で元に戻せる)
+    """
+    restore = SnapshotRestore()
+    mFnDependencyNode = om2.MFnDependencyNode()
+    targets = {}
+    # 既定値を省略したノード {ノード名: 書き戻したパスの集合}
+    elided = collections.OrderedDict()
+    
+    for plug_path, type_tag, value in snapshot:
+        node_name, attr_path = plug_path.split(".", 1)
+        mObject = targets.get(node_name)
+        if mObject is None:
+            target = nodes.get(node_name) if nodes is not None else node_name
+            if target is None:
+                continue
+            if not isinstance(target, om2.MObject):
+                try:
+                    target = om2.MGlobal.getSelectionListByName(target).getDependNode(0)
+                except RuntimeError:
+                    print(u"ノードが見つかりません:", target)
+                    target = om2.MObject.kNullObj
+            mObject = targets[node_name] = target
+        if mObject.isNull():
+            continue
+        
+        if type_tag == "defaults":
+            elided[node_name] = set()
+            continue
+        written = elided.get(node_name)
+        if written is not None:
+            written.add(attr_path)
+        
+        if type_tag == "skinWeights":
+            restore.addSkinWeights(mObject, value)
+            continue
+        
+        mFnDependencyNode.setObject(mObject)
+        try:
+            mPlug = find_plug(mObject, attr_path, mFnDependencyNode)
+        except (RuntimeError, ValueError) as e:
+            print(plug_path, e)
+            continue
+        restore.addPlugValue(mPlug, type_tag, value)
+    
+    for node_name, written in elided.items():
+        mObject = targets[node_name]
+        mFnDependencyNode.setObject(mObject)
+        table = get_default_table(get_reader_plan(mFnDependencyNode))
+        for attr_path, (type_tag, value) in table.items():
+            if attr_path not in written:
+                restore.addPlugValue(find_plug(mObject, attr_path, mFnDependencyNode), type_tag, value)
+    
+    if execute:
+        execute_restore(restore)
+    return restore
+
+
+# ---------------------------------------------------------------------------------- #
+# アンドゥ
+# ---------------------------------------------------------------------------------- #
+# SnapshotRestore は _restore_command プラグインのコマンドから適用し、Maya のアンドゥキューに1ステップとして載せる。
+# コマンドの引数では Python のオブジェクトを渡せないため、実行の直前に _PENDING_RESTORE に預ける。
+RESTORE_COMMAND = "restoreSnapshot"
+_RESTORE_PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_restore_command.py")
+_PENDING_RESTORE = []
+
+def take_pending_restore():
+    """execute_restore が預けた SnapshotRestore を取り出す (_restore_command のコマンドの doIt から呼ぶ)"""
+    return _PENDING_RESTORE.pop() if _PENDING_RESTORE else None
+
+def execute_restore(restore):
+    """SnapshotRestore をアンドゥ可能なコマンドとして適用する
+
+    初回はプラグイン (_restore_command.py) を読み込む。適用後は cmds.undo / cmds.redo で戻せる。
+
+    Args:
+        restore (SnapshotRestore): 適用する変更
+
+    Returns:
+        SnapshotRestore: restore
+    """
+    if not cmds.pluginInfo(_RESTORE_PLUGIN, query=True, loaded=True):
+        cmds.loadPlugin(_RESTORE_PLUGIN, quiet=True)
+    _PENDING_RESTORE.append(restore)
+    try:
+        getattr(cmds, RESTORE_COMMAND)()
+    finally:
+        del _PENDING_RESTORE[:]
+    return restore
+
+
+
+# ---------------------------------------------------------------------------------- #
+# ウェイトのミラー・コピー
+# ---------------------------------------------------------------------------------- #
+# ウェイトと頂点座標を一括取得して _skinweights で転写し、SnapshotRestore の setWeights で書き戻す。
+# 頂点の対応は座標の k-d tree で求めるため、トポロジーが異なるメッシュ同士でも使える。
+def _get_skin_mesh(mFnSkinCluster, index=0, space=om2.MSpace.kObject):
+    return MeshHandle(mFnSkinCluster.getPathAtIndex(index), space)
+
+def mirror_skin_weights(mObject, axis=0, plane=0.0, direction=1, method="inverse_distance", k=4,
+                        tolerance=1e-4, execute=True):
+    """スキンクラスターのウェイトを鏡映面の反対側へミラーする
+
+    Args:
+        mObject (om2.MObject): スキンクラスター
+        axis (int): 鏡映面の法線の軸 (0: X, 1: Y, 2: Z)
+        plane (float): 鏡映面の位置 (オブジェクト空間)
+        direction (int): 1 の場合は + 側から - 側へ、-1 の場合は - 側から + 側へ
+        method (str): "inverse_distance" または "barycentric"
+        k (int): 逆距離で混ぜる近傍の数
+        tolerance (float): 面上とみなす距離
+        execute (bool): True の場合は execute_restore でアンドゥ可能なコマンドとして適用する
+
+    左右のインフルエンスは名前で対応付ける (_skinweights.mirror_name を参照)。
+
+    Returns:
+        SnapshotRestore: 適用した変更 (cmds.undo または undoIt() で1回で元に戻せる)
+    """
+    if _skinweights is None:
+        raise RuntimeError(u"ウェイトのミラーには numpy が必要です")
+    value = get_skin_weights(mObject)
+    with _get_skin_mesh(oma2.MFnSkinCluster(mObject)) as mesh:
+        triangles = _skinweights.triangulate(*mesh.getTopology()) if method == "barycentric" else None
+        value["weights"] = _skinweights.mirror_weights(
+            mesh.getPoints(), value, value["influences"], axis=axis, plane=plane, direction=direction,
+            tolerance=tolerance, method=method, k=k, triangles=triangles)
+    
+    restore = SnapshotRestore()
+    restore.addSkinWeights(mObject, value)
+    if execute:
+        execute_restore(restore)
+    return restore
+
+def copy_skin_weights(source, target, method="inverse_distance", k=4, space=om2.MSpace.kWorld, execute=True):
+    """スキンクラスターのウェイトを別のメッシュのスキンクラスターへコピーする
+
+    Args:
+        source (om2.MObject): コピー元のスキンクラスター
+        target (om2.MObject): コピー先のスキンクラスター
+        method (str): "inverse_distance" または "barycentric"
+        k (int): 逆距離で混ぜる近傍の数
+        space (int): 頂点座標を比べる空間 (既定ではワールド空間)
+        execute (bool): True の場合は execute_restore でアンドゥ可能なコマンドとして適用する
+
+    インフルエンスは名前で対応付け、コピー先に無いインフルエンスのウェイトは除く。
+
+    Returns:
+        SnapshotRestore: 適用した変更 (cmds.undo または undoIt() で1回で元に戻せる)
+    """
+    if _skinweights is None:
+        raise RuntimeError(u"ウェイトのコピーには numpy が必要です")
+    value = get_skin_weights(source)
+    mFnSkinCluster = oma2.MFnSkinCluster(target)
+    influences = [mDagPath_inf.partialPathName() for mDagPath_inf in mFnSkinCluster.influenceObjects()]
+    for name in set(value["influences"]).difference(influences):
+        print(u"コピー先にインフルエンスがありません:", name)
+    with _get_skin_mesh(oma2.MFnSkinCluster(source), space=space) as source_mesh, \
+            _get_skin_mesh(mFnSkinCluster, space=space) as target_mesh:
+        triangles = _skinweights.triangulate(*source_mesh.getTopology()) if method == "barycentric" else None
+        weights = _skinweights.copy_weights(
+            source_mesh.getPoints(), value, target_mesh.getPoints(), value["influences"], influences,
+            method=method, k=k, triangles=triangles)
+    
+    restore = SnapshotRestore()
+    restore.addSkinWeights(target, {"shape": weights.shape, "influences": influences, "weights": weights})
+    if execute:
+        execute_restore(restore)
+    return restore
 
 
+if __name__ == "__main__":
+    sl = om2.MGlobal.getSelectionListByName("skinCluster1")
+    mObject = sl.getDependNode(0)
+    mFnDependencyNode = om2.MFnDependencyNode(mObject)
 
+    print(mFnDependencyNode.name())
+    for name, value in dump_node(mObject).items():
+        print(name, value)
         
     
 # mFnDependencyNode.getAliasList()
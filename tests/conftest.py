@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""テスト共通の設定 (_fake_om2 を maya として使用する)"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import _fake_om2
+_fake_om2.install()
+
+import _utils
+
+
+@pytest.fixture(autouse=True)
+def scene():
+    """テスト毎にシーンと読み取り計画・スキーマのキャッシュを破棄する"""
+    _fake_om2.clear_scene()
+    _utils.clear_reader_plans()
+    _utils.clear_schema_cache()
+    yield
+    _fake_om2.clear_scene()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import _utils
+from _utils import ComponentRanges
+
+
+def test_from_elements_merges_runs():
+    ranges = ComponentRanges.fromElements([11, 3, 0, 1, 2, 10, 2])
+    assert ranges.ranges() == [(0, 4), (10, 12)]
+    assert len(ranges) == 6
+    assert list(ranges) == [0, 1, 2, 3, 10, 11]
+    assert 3 in ranges and 10 in ranges
+    assert 4 not in ranges and -1 not in ranges and 12 not in ranges
+
+
+def test_from_elements_without_numpy(monkeypatch):
+    monkeypatch.setattr(_utils, "np", None)
+    ranges = ComponentRanges.fromElements([11, 3, 0, 1, 2, 10, 2])
+    assert ranges.ranges() == [(0, 4), (10, 12)]
+
+
+def test_union_merges_overlapping_and_adjacent():
+    a = ComponentRanges([0, 10], [4, 12])
+    b = ComponentRanges([2, 4, 20], [3, 6, 21])
+    assert (a | b).ranges() == [(0, 6), (10, 12), (20, 21)]
+    assert a | b == b | a
+    assert (a | ComponentRanges()) == a
+
+
+def test_intersection():
+    a = ComponentRanges([0, 10], [4, 12])
+    assert (a & ComponentRanges.fromRange(3, 11)).ranges() == [(3, 4), (10, 11)]
+    assert (a & ComponentRanges.fromRange(4, 10)).ranges() == []
+    assert a & a == a
+
+
+def test_double_indexed():
+    ranges = ComponentRanges.fromElements([(1, 0), (0, 1), (0, 0), (0, 2)], double_indexed=True)
+    assert list(ranges) == [(0, 0), (0, 1), (0, 2), (1, 0)]
+    assert (0, 2) in ranges and (0, 3) not in ranges
+    with pytest.raises(ValueError):
+        ranges | ComponentRanges.fromRange(0, 4)
+
+
+def test_dict_round_trip():
+    ranges = ComponentRanges.fromElements([5, 6, 7, 100])
+    assert ComponentRanges.fromDict(ranges.toDict()) == ranges
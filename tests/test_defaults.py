@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+def _plan(mObject):
+    return _utils.get_reader_plan(om2.MFnDependencyNode(mObject))
+
+
+def test_elide_default_records():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    records = list(_utils.iter_plug_records(mObject, elide_defaults=True))
+    paths = [record[0] for record in records]
+    assert paths[0] == "skinCluster1." + _utils.ELIDED_DEFAULTS
+    # 既定値 (envelope = 1.0) は省略し、設定した値は残す
+    assert "skinCluster1.envelope" not in paths
+    assert "skinCluster1.bindPreMatrix" in paths
+
+
+def test_failed_read_is_not_elided():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    plan = _plan(mObject)
+    table = _utils.get_default_table(plan)
+    assert table.isDefault("envelope", 1.0)
+    assert not table.isDefault("envelope", None)
+    records = [("skinCluster1.envelope", "float", None), ("skinCluster1.nodeState", "enum", [0, "Normal"])]
+    kept = list(_utils.elide_default_records(records, "skinCluster1", plan))
+    assert [record[0] for record in kept[1:]] == ["skinCluster1.envelope"]
+
+
+def test_restore_keeps_failed_read():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    mPlug = om2.MFnDependencyNode(mObject).findPlug("envelope", False)
+    mPlug.setDouble(0.5)
+    plan = _plan(mObject)
+    records = list(_utils.elide_default_records([("skinCluster1.envelope", "float", None)], "skinCluster1", plan))
+    # 読めなかったプラグは既定値で上書きしない
+    _utils.restore_snapshot(records)
+    assert mPlug.asFloat() == 0.5
+
+
+def test_restore_keeps_array_elements_missing_from_snapshot():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    records = list(_utils.iter_plug_records(mObject, elide_defaults=True))
+    dropoff = mFnDependencyNode.findPlug("dropoff", False)
+    influence_color = mFnDependencyNode.findPlug("influenceColor", False)
+    dropoff.elementByLogicalIndex(0).setDouble(1.0)
+    dropoff.elementByLogicalIndex(5).setDouble(2.0)
+    influence_color.elementByLogicalIndex(7).child(0).setDouble(0.5)
+    _utils.restore_snapshot(records)
+    # 記録された要素は書き戻すが、スナップショットに無い要素は削除しない
+    assert dropoff.elementByLogicalIndex(0).asDouble() == 4.0
+    assert list(dropoff.getExistingArrayAttributeIndices()) == [0, 1, 2, 5]
+    assert list(influence_color.getExistingArrayAttributeIndices()) == [0, 1, 2, 7]
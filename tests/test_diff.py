@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import _fake_om2
+import _snapshot
+import _utils
+
+om2 = _fake_om2.install()
+
+
+@pytest.fixture
+def snapshots(tmpdir):
+    """同じノードを NDJSON と .snap に書き出す"""
+    _fake_om2.create_skin_cluster("skinCluster1", 20, 4)
+    _fake_om2.create_skin_cluster("skinCluster2", 20, 4, seed=1)
+    mObjects = [om2.MGlobal.getSelectionListByName(name).getDependNode(0) for name in ("skinCluster1", "skinCluster2")]
+    paths = {}
+    for name in ("dump.ndjson", "dump" + _snapshot.BINARY_EXTENSION):
+        paths[name.split(".")[-1]] = path = os.path.join(str(tmpdir), name)
+        _utils.write_node_records(mObjects, path)
+    return paths
+
+
+def test_values_close_mesh_handle(snapshots):
+    mObject = om2.MGlobal.getSelectionListByName("skinCluster1").getDependNode(0)
+    records = dict((record[0], record[2]) for record in _utils.iter_plug_records(mObject))
+    loaded = dict((record[0], record[2]) for record in _snapshot.iter_ndjson(snapshots["ndjson"]))
+    plug_path = "skinCluster1.outputGeometry[0]"
+    assert isinstance(records[plug_path], _utils.MeshHandle)
+    assert _snapshot.values_close(records[plug_path], loaded[plug_path])
+    assert _snapshot.values_close(loaded[plug_path], records[plug_path])
+
+
+@pytest.mark.parametrize("source", ["ndjson", "snap"])
+def test_diff_live_against_file(snapshots, source):
+    assert _snapshot.diff(_utils.hash_nodes("skinCluster*"), snapshots[source]) == []
+    
+    mObject = om2.MGlobal.getSelectionListByName("skinCluster2").getDependNode(0)
+    om2.MFnDependencyNode(mObject).findPlug("envelope", False).setDouble(0.5)
+    changes = _snapshot.diff(snapshots[source], _utils.hash_nodes("skinCluster*"))
+    assert [change[:2] for change in changes] == [("skinCluster2.envelope", "changed")]
+
+
+def test_value_digest_is_canonical():
+    import array
+    import numpy
+    values = [1.0, 0.5, -2.0]
+    digest = _snapshot.value_digest("double3", values)
+    assert _snapshot.value_digest("double3", array.array("d", values)) == digest
+    assert _snapshot.value_digest("double3", array.array("f", values)) == digest
+    assert _snapshot.value_digest("double3", numpy.array(values)) == digest
+    assert _snapshot.value_digest("double3", [1.0, 0.5, -1.0]) != digest
+    assert _snapshot.value_digest("intArray", [1, 2]) == _snapshot.value_digest("intArray", array.array("i", [1, 2]))
+    assert _snapshot.value_digest("intArray", [1, 2]) != _snapshot.value_digest("intArray", [1.0, 2.0])
+    # 形の違う同じ並びは一致しない
+    points = numpy.arange(6, dtype=numpy.float32).reshape(2, 3)
+    assert _snapshot.value_digest("mesh", points) == _snapshot.value_digest("mesh", points.tolist())
+    assert _snapshot.value_digest("mesh", points) != _snapshot.value_digest("mesh", points.ravel())
+    assert _snapshot.value_digest("doubleArray", []) == _snapshot.value_digest("doubleArray", array.array("d"))
+
+
+def test_mixed_source_trees_match(snapshots, monkeypatch):
+    with _snapshot.load_merkle_tree(snapshots["snap"]) as snap_tree:
+        trees = [_utils.hash_nodes("skinCluster*"),
+                 _snapshot.load_merkle_tree(snapshots["ndjson"]),
+                 snap_tree]
+        digests = set()
+        for tree in trees:
+            tree.finalize()
+            digests.add(tree.digest())
+        assert len(digests) == 1
+    assert snap_tree._reader is None
+    
+    # 一致する部分木は読み飛ばす (値の比較は変更したプラグだけ)
+    calls = []
+    values_close = _snapshot.values_close
+    monkeypatch.setattr(_snapshot, "values_close", lambda *args: calls.append(args) or values_close(*args))
+    assert _snapshot.diff(snapshots["ndjson"], snapshots["snap"]) == []
+    mObject = om2.MGlobal.getSelectionListByName("skinCluster1").getDependNode(0)
+    om2.MFnDependencyNode(mObject).findPlug("envelope", False).setDouble(0.5)
+    changes = _snapshot.diff(snapshots["ndjson"], _utils.hash_nodes("skinCluster*"))
+    assert [change[:2] for change in changes] == [("skinCluster1.envelope", "changed")]
+    assert len(calls) == 1
+
+
+def test_diff_closes_binary_readers(snapshots, monkeypatch):
+    readers = []
+    def open_reader(*args):
+        reader = BinaryReader(*args)
+        readers.append((reader, reader._mmap))
+        return reader
+    BinaryReader = _snapshot.BinaryReader
+    monkeypatch.setattr(_snapshot, "BinaryReader", open_reader)
+    mObject = om2.MGlobal.getSelectionListByName("skinCluster1").getDependNode(0)
+    mPlug = om2.MFnDependencyNode(mObject).findPlug("weightList", False).elementByLogicalIndex(3).child(0)
+    mPlug.elementByLogicalIndex(0).setDouble(0.25)
+    changes = _snapshot.diff(snapshots["snap"], _utils.hash_nodes("skinCluster*"))
+    assert len(readers) == 1
+    reader, mapped = readers[0]
+    assert reader._mmap is None and reader._file.closed
+    assert mapped.closed
+    # 変更された値はリーダーを閉じた後も読める
+    assert [change[:2] for change in changes] == [("skinCluster1.weightList", "changed")]
+    os.remove(snapshots["snap"])
+    loaded = dict((record[0], record[2]) for record in _snapshot.iter_ndjson(snapshots["ndjson"]))
+    assert _snapshot.values_close(changes[0][2][1], loaded["skinCluster1.weightList"])
+    assert not _snapshot.values_close(changes[0][3][1], loaded["skinCluster1.weightList"])
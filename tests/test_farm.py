@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+import pytest
+
+import _farm
+import _snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_fake_command_line(tmpdir):
+    output = str(tmpdir)
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "_farm.py"), "--fake", "2",
+                             "--output", output, "--workers", "1"],
+                            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert "2 files" in result.stdout and "failed 0" in result.stdout
+    with _snapshot.BinaryReader(os.path.join(output, "workers1", "merged" + _snapshot.BINARY_EXTENSION)) as reader:
+        node_names = set(plug_path.split(".", 1)[0] for plug_path, _, _ in reader)
+    assert node_names == set("scene%04d:skinCluster%d" % (i, j + 1) for i in range(2) for j in range(4))
+
+
+def test_files_per_minute_counts_successful_files(tmpdir):
+    scene_files = _farm._generate_fake_scenes(str(tmpdir.join("scenes")), 1, vertex_count=10, influence_count=2)
+    scene_files.append(str(tmpdir.join("scenes", "missing.json")))
+    result = _farm.run(scene_files, str(tmpdir.join("output")), workers=1, fake=True, merge=False)
+    assert result["files"] == 2
+    assert list(result["failed"]) == [scene_files[1]]
+    assert result["files_per_minute"] == pytest.approx(60.0 / result["seconds"])
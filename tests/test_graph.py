@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import random
+
+import maya.cmds as cmds
+
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+def _assert_ordered(graph, edges):
+    # 循環に含まれない接続は駆動する側が先に並ぶ
+    order = graph.topologicalOrder()
+    position = dict((name, i) for i, name in enumerate(order))
+    in_cycle = set(name for group in graph.cycles() for name in group)
+    for source, destination in edges:
+        if source not in in_cycle or destination not in in_cycle:
+            assert position[source] < position[destination], (source, destination)
+
+
+def test_topological_order():
+    graph = _utils.ConnectionGraph()
+    graph.addNodes(["c", "b", "a"])
+    graph.connect("b.output", "c.input[0]")
+    graph.connect("a.output", "b.input[0]")
+    assert graph.topologicalOrder() == ["a", "b", "c"]
+    assert sorted(graph.upstream("c")) == ["a", "b"]
+    assert sorted(graph.downstream("a")) == ["b", "c"]
+    assert graph.cycles() == []
+
+
+def test_incremental_order_and_cycles():
+    graph = _utils.ConnectionGraph()
+    graph.addNodes(["a", "b", "c", "d"])
+    graph.connect("a.output", "b.input[0]")
+    graph.connect("b.output", "c.input[0]")
+    graph.topologicalOrder()
+    
+    # キャッシュした順序の範囲だけを並べ替える
+    graph.connect("d.output", "a.input[0]")
+    _assert_ordered(graph, [("d", "a"), ("a", "b"), ("b", "c")])
+    
+    graph.connect("c.output", "a.input[1]")
+    assert ["a", "b", "c"] in [[name for name in group if "." not in name] for group in graph.cycles()]
+    _assert_ordered(graph, [("d", "a")])
+    
+    graph.disconnect("c.output", "a.input[1]")
+    assert graph.cycles() == []
+    _assert_ordered(graph, [("d", "a"), ("a", "b"), ("b", "c")])
+
+
+def test_watch_matches_rebuilt_graph():
+    nodes = _fake_om2.create_network(30, fan_in=2, seed=1)
+    names = [node.name for node in nodes]
+    rand = random.Random(0)
+    with _utils.get_connection_graph("network*", watch=True) as graph:
+        graph.topologicalOrder()
+        mFnDependencyNode = om2.MFnDependencyNode()
+        for k in range(20):
+            i, j = rand.sample(range(len(nodes)), 2)
+            mFnDependencyNode.setObject(om2.MGlobal.getSelectionListByName(names[i]).getDependNode(0))
+            mPlug_output = mFnDependencyNode.findPlug("output", False)
+            mFnDependencyNode.setObject(om2.MGlobal.getSelectionListByName(names[j]).getDependNode(0))
+            mPlug_input = mFnDependencyNode.findPlug("input", False).elementByLogicalIndex(10 + k)
+            om2.MDGModifier().connect(mPlug_output, mPlug_input).doIt()
+        
+        rebuilt = _utils.get_connection_graph("network*")
+        assert sorted(graph.cycles()) == sorted(rebuilt.cycles())
+        for name in names:
+            assert sorted(graph.upstream(name)) == sorted(rebuilt.upstream(name))
+        connections = cmds.listConnections(names, source=True, destination=False, connections=True, plugs=True)
+        _assert_ordered(graph, [(connections[i + 1].split(".")[0], connections[i].split(".")[0])
+                                for i in range(0, len(connections), 2)])
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+def test_typed_any_attribute_returns_mesh_handle():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 9, 3)
+    mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    mesh = _utils.get_typed_Attribute(mFnDependencyNode.findPlug("outputGeometry", False).elementByLogicalIndex(0))
+    assert isinstance(mesh, _utils.MeshHandle)
+    assert mesh.numVertices == 9
+    # メッシュを持たない kAny は None
+    assert _utils.get_typed_Attribute(mFnDependencyNode.findPlug("paintTrans", False)) is None
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_mesh_handle_reads_points_and_normals(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(_utils, "np", None)
+    data = _fake_om2.create_mesh_data(9)
+    mesh = _utils.MeshHandle(data)
+    points = mesh.getPoints()
+    normals = mesh.getNormals()
+    if use_numpy:
+        assert points.shape == normals.shape == (9, 3)
+        points, normals = points.ravel(), normals.ravel()
+    assert list(points) == [c for point in data.points for c in point]
+    assert list(normals) == [c for normal in data.normals for c in normal]
+    assert [list(a) for a in mesh.getTopology()] == [data.counts, data.connects]
+    mesh.release()
+    assert not mesh.isLoaded("points")
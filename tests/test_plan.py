@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+def _fn(mObject):
+    return om2.MFnDependencyNode(mObject)
+
+
+def test_reader_plan_shared_per_type():
+    a = _fake_om2.create_skin_cluster("skinClusterA", 10, 3)
+    b = _fake_om2.create_skin_cluster("skinClusterB", 10, 3, seed=1)
+    plan = _utils.get_reader_plan(_fn(a))
+    assert _utils.get_reader_plan(_fn(b)) is plan
+    # 2つ目のノードも自身の値を読む
+    values = _utils.dump_node(b)
+    assert len(values["bindPreMatrix"]["indices"]) == 3
+
+
+def test_plug_rejects_attribute_of_other_type():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    network = _fake_om2.create_network(1)[0]
+    output = _fn(network).attribute("output")
+    assert om2.MPlug(network, output).asDouble() == 0.0
+    with pytest.raises(RuntimeError):
+        om2.MPlug(mObject, output)
+
+
+def test_reader_plan_keyed_by_schema():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    plan = _utils.get_reader_plan(_fn(mObject))
+    # プラグインのバージョンが変わると typeId が同じでも計画を作り直す
+    _utils._PLUGIN_VERSIONS[_fn(mObject).pluginName] = "upgraded"
+    upgraded = _utils.get_reader_plan(_fn(mObject))
+    assert upgraded is not plan
+    assert _utils.get_reader_plan(_fn(mObject)) is upgraded
+
+
+def test_clear_schema_cache_clears_plans():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    plan = _utils.get_reader_plan(_fn(mObject))
+    _utils.clear_schema_cache()
+    assert _utils.get_reader_plan(_fn(mObject)) is not plan
+
+
+def test_get_array_attribute_uses_cached_plan(monkeypatch):
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    mFnDependencyNode = _fn(mObject)
+    expected = _utils.dump_node(mObject)["bindPreMatrix"]
+    
+    def build_plan_entry(*args, **kwargs):
+        raise AssertionError("plan entry rebuilt")
+    monkeypatch.setattr(_utils, "build_plan_entry", build_plan_entry)
+    value = _utils.get_array_attribute(mFnDependencyNode.findPlug("bindPreMatrix", False))
+    assert value["indices"] == expected["indices"]
+    assert value["values"] == expected["values"]
+
+
+def test_get_array_attribute_keeps_sparse_indices():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 2)
+    mObject.set((("dropoff", 7),), 2.5)
+    mObject.set((("matrix", 12),), om2.MMatrix([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 5, 0, 0, 1]))
+    mObject.set((("influenceColor", 9), ("influenceColorG", None)), 0.5)
+    mObject.set((("input", 3), ("groupId", None)), 4)
+    mFnDependencyNode = _fn(mObject)
+    
+    # 連続バッファの配列は論理インデックスと値を同じ並びで持つ
+    value = _utils.get_array_attribute(mFnDependencyNode.findPlug("dropoff", False))
+    assert list(value["indices"]) == [0, 1, 7]
+    assert list(value["values"]) == [4.0, 4.0, 2.5]
+    value = _utils.get_array_attribute(mFnDependencyNode.findPlug("matrix", False))
+    assert list(value["indices"]) == [0, 1, 12]
+    assert len(value["values"]) == 3 * 16 and value["values"][2 * 16 + 12] == 5.0
+    
+    # 要素毎の配列は論理インデックスをキーにする (物理インデックスに詰めない)
+    value = _utils.get_array_attribute(mFnDependencyNode.findPlug("influenceColor", False))
+    assert sorted(value) == [0, 1, 9]
+    assert list(value[9]) == [0.0, 0.5, 0.0]
+    value = _utils.get_array_attribute(mFnDependencyNode.findPlug("input", False))
+    assert sorted(value) == [0, 3]
+    assert value[3]["groupId"] == 4
+
+def test_find_plan_entry_for_child_plug():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    mPlug = _fn(mObject).findPlug("input", False).elementByLogicalIndex(0).child(0)
+    assert _utils.find_plan_entry(mPlug).name == "inputGeometry"
+    # 一括取得するアトリビュートの下は計画に無い
+    mPlug = _fn(mObject).findPlug("weightList", False).elementByLogicalIndex(0).child(0)
+    assert _utils.find_plan_entry(mPlug) is None
+    assert len(_utils.get_array_attribute(mPlug)["indices"]) == 3
+
+
+def test_convert_vector_and_point():
+    assert list(_utils.convert_value(om2.MVector(1.0, 2.0, 3.0))) == [1.0, 2.0, 3.0]
+    assert _utils.convert_value(om2.MFloatVector(1.0, 2.0, 3.0)).typecode == "f"
+    assert list(_utils.convert_value(om2.MPoint(1.0, 2.0, 3.0))) == [1.0, 2.0, 3.0]
+    assert list(_utils.convert_value(om2.MPoint(2.0, 4.0, 6.0, 2.0))) == [1.0, 2.0, 3.0]
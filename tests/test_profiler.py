@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+def test_profiler_branches_by_reader():
+    mObjects = [_fake_om2.create_skin_cluster("skinCluster%d" % i, 10, 3, seed=i) for i in (1, 2)]
+    with _utils.DumpProfiler() as profiler:
+        for mObject in mObjects:
+            _utils.dump_node(mObject)
+    assert _utils._PROFILER is None
+    
+    # スキンウェイトの一括取得はコンパウンドと別の分岐として集計する
+    assert profiler.branches["skinWeights"][0] == 2
+    assert profiler.branches["skinWeights"][2] >= 2 * 10 * 3 * 8
+    assert profiler.branches["matrix[]"][0] == 2 * 2
+    assert profiler.branches["array"][0] == 2 * 6
+    assert not [name for name in profiler.branches if name.startswith("k")]
+    assert profiler.plugs["skinCluster.weightList"][0] == 2
+    # 分岐とプラグの合計は一致する
+    assert sum(stats[0] for stats in profiler.branches.values()) == sum(stats[0] for stats in profiler.plugs.values())
+
+
+def test_profiler_report_and_save(tmpdir):
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    with _utils.DumpProfiler() as profiler:
+        list(_utils.iter_plug_records(mObject))
+    report = profiler.report(limit=3)
+    assert report.splitlines()[0].split() == ["branch", "calls", "ms", "bytes"]
+    assert "skinWeights" in report
+    
+    path = os.path.join(str(tmpdir), "profile.json")
+    profiler.save(path)
+    with open(path) as f:
+        data = json.load(f)
+    assert set(row["name"] for row in data["branches"]) == set(profiler.branches)
+    assert len(data["plugs"]) == len(profiler.plugs)
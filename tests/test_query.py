@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+import pytest
+
+import _fake_om2
+import _query
+import _snapshot
+import _utils
+
+om2 = _fake_om2.install()
+
+
+@pytest.fixture(params=["dump.ndjson", "dump" + _snapshot.BINARY_EXTENSION])
+def snapshot(request, tmpdir):
+    mObjects = [_fake_om2.create_skin_cluster("skinCluster%d" % (i + 1), 10, 3, seed=i) for i in range(2)]
+    path = os.path.join(str(tmpdir), request.param)
+    _utils.write_node_records(mObjects, path)
+    return path
+
+
+def _run(*argv):
+    out = io.BytesIO()
+    code = _query.main(list(argv), out)
+    return code, out.getvalue().decode("utf-8").splitlines()
+
+
+def _records(lines):
+    return list(_snapshot.iter_ndjson(io.BytesIO("\n".join(lines).encode("utf-8"))))
+
+
+def test_nodes(snapshot):
+    assert _run("nodes", snapshot) == (0, ["skinCluster1", "skinCluster2"])
+
+
+def test_get(snapshot, capsys):
+    code, lines = _run("get", snapshot, "skinCluster2.envelope", "skinCluster1.bindPreMatrix[1]")
+    assert code == 0
+    records = dict((record[0], record[1:]) for record in _records(lines))
+    assert records["skinCluster2.envelope"] == ("float", 1.0)
+    type_tag, matrix = records["skinCluster1.bindPreMatrix[1]"]
+    assert type_tag == "matrix" and len(matrix) == 16
+
+    # 見つからないパスは標準エラーに出して終了コード 1
+    code, lines = _run("get", snapshot, "skinCluster1.envelope", "skinCluster1.missing")
+    assert code == 1
+    assert [record[0] for record in _records(lines)] == ["skinCluster1.envelope"]
+    assert "not found: skinCluster1.missing" in capsys.readouterr().err
+
+
+def test_query(snapshot):
+    code, lines = _run("query", snapshot, "*.dropoff")
+    assert code == 0
+    records = _records(lines)
+    assert [record[:2] for record in records] == [("skinCluster1.dropoff", "double[]"), ("skinCluster2.dropoff", "double[]")]
+    assert list(records[0][2]["indices"]) == [0, 1, 2]
+
+    code, lines = _run("query", snapshot, "skinCluster2.influenceColor*", "--paths")
+    assert lines == ["skinCluster2.influenceColor[%d]" % i for i in range(3)]
+
+
+def test_convert_round_trip(snapshot, tmpdir, capsys):
+    output = os.path.join(str(tmpdir), "converted" + (".ndjson" if snapshot.endswith(_snapshot.BINARY_EXTENSION)
+                                                      else _snapshot.BINARY_EXTENSION))
+    assert _run("convert", snapshot, output)[0] == 0
+    count = len(list(_snapshot.iter_records(snapshot)))
+    assert capsys.readouterr().err == "%d records -> %s\n" % (count, output)
+    expected = sorted(_run("query", snapshot, "**")[1])
+    assert sorted(_run("query", output, "**")[1]) == expected
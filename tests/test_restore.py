@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import maya.cmds as cmds
+
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+def _envelope(mObject):
+    return om2.MFnDependencyNode(mObject).findPlug("envelope", False).asFloat()
+
+
+def test_restore_snapshot_is_undoable():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    before = _utils.get_skin_weights(mObject)["weights"].tolist()
+    value = _utils.get_skin_weights(mObject)
+    value["weights"] = value["weights"][:, ::-1].copy()
+    records = [("skinCluster1.envelope", "float", 0.5), ("skinCluster1.weightList", "skinWeights", value)]
+    
+    _utils.restore_snapshot(records)
+    after = _utils.get_skin_weights(mObject)["weights"].tolist()
+    assert _envelope(mObject) == 0.5
+    assert after == value["weights"].tolist() and after != before
+    
+    # プラグの値とウェイトを1回のアンドゥで戻す
+    cmds.undo()
+    assert _envelope(mObject) == 1.0
+    assert _utils.get_skin_weights(mObject)["weights"].tolist() == before
+    cmds.redo()
+    assert _envelope(mObject) == 0.5
+    assert _utils.get_skin_weights(mObject)["weights"].tolist() == after
+
+
+def test_restore_snapshot_undo_plug_values():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    records = [("skinCluster1.envelope", "float", 0.25)]
+    _utils.restore_snapshot(records)
+    assert _envelope(mObject) == 0.25
+    cmds.undo()
+    assert _envelope(mObject) == 1.0
+    # 既に読み込んだプラグインを使い回す
+    _utils.restore_snapshot(records)
+    assert _envelope(mObject) == 0.25
+
+
+def test_restore_snapshot_without_execute():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    restore = _utils.restore_snapshot([("skinCluster1.envelope", "float", 0.25)], execute=False)
+    assert _envelope(mObject) == 1.0
+    _utils.execute_restore(restore)
+    assert _envelope(mObject) == 0.25
+    cmds.undo()
+    assert _envelope(mObject) == 1.0
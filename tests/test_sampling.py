@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("make_current", [True, False])
+def test_sample_plugs_frames_by_plugs(monkeypatch, use_numpy, make_current):
+    if not use_numpy:
+        monkeypatch.setattr(_utils, "np", None)
+    if not make_current:
+        # Maya 2018 より前は asDouble(context) で評価する
+        monkeypatch.delattr(om2.MDGContext, "makeCurrent")
+    nodes = _fake_om2.create_animated_controls(2)
+    nodes[0].animate((("translateX", None),), lambda frame: frame * 2.0)
+    nodes[1].animate((("rotateY", None),), lambda frame: -frame)
+    mPlug = om2.MFnDependencyNode(om2.MGlobal.getSelectionListByName("control0").getDependNode(0)).findPlug("translateX", False)
+    frames = [1, 2.5, 10, -3]
+    samples = _utils.sample_plugs([mPlug, "control1.rotateY", "control0.translateX"], frames)
+
+    expected = [[frame * 2.0, -frame, frame * 2.0] for frame in frames]
+    if use_numpy:
+        assert samples.shape == (4, 3)
+        assert samples.tolist() == expected
+    else:
+        assert list(samples) == [value for row in expected for value in row]
+    # 現在の評価コンテキストは元に戻る
+    assert om2.MDGContext.current() is om2.MDGContext.kNormal
+    assert mPlug.asDouble() == 2.0
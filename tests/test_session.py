@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import _fake_om2
+import _utils
+
+om2 = _fake_om2.install()
+
+
+def _set_envelope(name, value):
+    mObject = om2.MGlobal.getSelectionListByName(name).getDependNode(0)
+    om2.MFnDependencyNode(mObject).findPlug("envelope", False).setDouble(value)
+
+
+def test_refresh_reads_changed_plug():
+    _fake_om2.create_skin_cluster("skinClusterA", 10, 3)
+    with _utils.SnapshotSession("skinClusterA") as session:
+        assert not session.isDirty()
+        _set_envelope("skinClusterA", 0.25)
+        assert session.isDirty()
+        assert session.refresh() == ["skinClusterA.envelope"]
+        assert session.values("skinClusterA")["envelope"] == 0.25
+        assert session.refresh() == []
+
+
+def test_refresh_same_plug_on_two_nodes():
+    # 同じプラグのパスが2つのノードで変更されても両方を読み直す
+    _fake_om2.create_skin_cluster("skinClusterA", 10, 3)
+    _fake_om2.create_skin_cluster("skinClusterB", 10, 3, seed=1)
+    with _utils.SnapshotSession(["skinClusterA", "skinClusterB"]) as session:
+        _set_envelope("skinClusterA", 0.5)
+        _set_envelope("skinClusterB", 0.75)
+        assert sorted(session.refresh()) == ["skinClusterA.envelope", "skinClusterB.envelope"]
+        assert session.values("skinClusterA")["envelope"] == 0.5
+        assert session.values("skinClusterB")["envelope"] == 0.75
+
+
+def _remove(mPlug):
+    om2.MDGModifier().removeMultiInstance(mPlug, True).doIt()
+
+
+def test_refresh_removes_array_elements():
+    mObject = _fake_om2.create_skin_cluster("skinClusterA", 10, 3)
+    mFnDependencyNode = om2.MFnDependencyNode(mObject)
+    with _utils.SnapshotSession("skinClusterA") as session:
+        values = session.values("skinClusterA")
+        assert sorted(values["influenceColor"]) == [0, 1, 2]
+        # 要素毎に持つ配列 (float3) と連続バッファの配列 (matrix[]) と コンパウンドの配列
+        _remove(mFnDependencyNode.findPlug("influenceColor", False).elementByLogicalIndex(1))
+        _remove(mFnDependencyNode.findPlug("bindPreMatrix", False).elementByLogicalIndex(1))
+        _remove(mFnDependencyNode.findPlug("input", False).elementByLogicalIndex(0))
+        assert sorted(session.refresh()) == ["skinClusterA.bindPreMatrix", "skinClusterA.influenceColor[1]",
+                                          "skinClusterA.input[0]"]
+        assert sorted(values["influenceColor"]) == [0, 2]
+        assert list(values["bindPreMatrix"]["indices"]) == [0, 2]
+        assert values["input"] == {}
+        dumped = _utils.dump_node(mObject)
+        assert sorted(dumped["influenceColor"]) == [0, 2] and dumped["input"] == {}
+
+
+def test_refresh_child_missing_from_plan():
+    mObject = _fake_om2.create_skin_cluster("skinClusterA", 10, 3)
+    with _utils.SnapshotSession("skinClusterA") as session:
+        # 計画に無い子が変更された場合は親の要素ごと読み直す
+        entries = session._nodes[om2.MObjectHandle(mObject).hashCode()][3] = dict(
+            _utils.get_reader_plan(om2.MFnDependencyNode(mObject)).entries_by_name)
+        element = entries["input"].children[0]
+        children = tuple(child for child in element.children if child.name != "groupId")
+        entries["input"] = entries["input"]._replace(children=(element._replace(children=children),))
+        
+        mPlug = om2.MFnDependencyNode(mObject).findPlug("input", False).elementByLogicalIndex(0)
+        mPlug.child(1).setInt(7)
+        assert session.refresh() == ["skinClusterA.input[0]"]
+        assert session.values("skinClusterA")["input"][0]["groupId"] == 7
+        assert sorted(session.values("skinClusterA")["input"][0]) == ["groupId", "inputGeometry"]
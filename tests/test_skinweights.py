@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy
+import pytest
+
+import _fake_om2
+import _skinweights
+
+om2 = _fake_om2.install()
+
+import maya.api.OpenMayaAnim as oma2
+
+import _utils
+
+
+def _plug_weights(mObject):
+    """weightList[頂点].weights[インフルエンス] をプラグ毎に読む"""
+    mPlug = om2.MFnDependencyNode(mObject).findPlug("weightList", False)
+    weights = {}
+    for i in range(mPlug.numElements()):
+        mPlug_element = mPlug.elementByPhysicalIndex(i)
+        mPlug_weights = mPlug_element.child(0)
+        for j in range(mPlug_weights.numElements()):
+            mPlug_weight = mPlug_weights.elementByPhysicalIndex(j)
+            weights[mPlug_element.logicalIndex(), mPlug_weight.logicalIndex()] = mPlug_weight.asDouble()
+    return weights
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_skin_weights_match_plugs(monkeypatch, use_numpy):
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 12, 6, max_influences=3)
+    expected = _plug_weights(mObject)
+    if not use_numpy:
+        monkeypatch.setattr(_utils, "np", None)
+    
+    value = _utils.get_skin_weights(mObject)
+    assert value["shape"] == (12, 6)
+    assert len(value["influences"]) == 6
+    dense = [float(w) for w in (value["weights"].ravel() if use_numpy else value["weights"])]
+    assert dense == [expected.get((v, j), 0.0) for v in range(12) for j in range(6)]
+    
+    # CSR は 0 以外のウェイトだけを頂点順に持つ
+    value = _utils.get_skin_weights(mObject, sparse=True)
+    assert "weights" not in value
+    assert list(value["indptr"])[-1] == len(value["data"]) == len([w for w in expected.values() if w != 0.0])
+    for v in range(12):
+        start, end = value["indptr"][v], value["indptr"][v + 1]
+        row = dict(zip([int(j) for j in value["indices"][start:end]], [float(w) for w in value["data"][start:end]]))
+        assert row == dict((j, w) for (u, j), w in expected.items() if u == v and w != 0.0)
+
+
+def test_world_space_needs_dag_path():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    mDagPath = oma2.MFnSkinCluster(mObject).getPathAtIndex(0)
+    with pytest.raises(RuntimeError):
+        _utils.MeshHandle(mDagPath.node(), om2.MSpace.kWorld).getPoints()
+    
+    mesh = _utils.MeshHandle(mDagPath, om2.MSpace.kWorld)
+    assert mesh.object is mDagPath.node()
+    assert mesh.getPoints().tolist() == _utils.MeshHandle(mDagPath.node()).getPoints().tolist()
+
+
+def test_copy_skin_weights_in_world_space():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 10, 3)
+    before = _utils.get_skin_weights(mObject)["weights"].tolist()
+    restore = _utils.copy_skin_weights(mObject, mObject, space=om2.MSpace.kWorld, execute=False)
+    restore.doIt()
+    assert _utils.get_skin_weights(mObject)["weights"].tolist() == before
+
+
+def _random_weights(vertex_count=50, influence_count=8, seed=0):
+    # 頂点毎に 1-5 個のインフルエンスを持ち、一部の頂点は合計が 1.0 からずれる
+    rand = numpy.random.RandomState(seed)
+    weights = numpy.zeros((vertex_count, influence_count))
+    for v in range(vertex_count):
+        columns = rand.choice(influence_count - 1, rand.randint(1, 6), replace=False)
+        weights[v, columns] = rand.rand(len(columns))
+        weights[v] /= weights[v].sum()
+    weights[::7] *= 1.1
+    return weights
+
+
+def test_analysis_kernels_match_loops():
+    weights = _random_weights()
+    rows = weights.tolist()
+    assert numpy.allclose(_skinweights.sum_deviation(weights), [sum(row) - 1.0 for row in rows])
+    assert _skinweights.influence_counts(weights, 0.1).tolist() == [sum(1 for w in row if w > 0.1) for row in rows]
+    assert _skinweights.unused_influences(weights).tolist() == [all(row[j] == 0.0 for row in rows) for j in range(8)]
+    assert _skinweights.unused_influences(weights)[-1]
+    
+    histogram = _skinweights.weight_histogram(weights, bins=4)
+    expected = numpy.zeros((8, 4), dtype=numpy.int64)
+    for row in rows:
+        for j, w in enumerate(row):
+            if w != 0.0:
+                expected[j, min(int(w * 4), 3)] += 1
+    assert histogram.tolist() == expected.tolist()
+    zeros = _skinweights.weight_histogram(weights, bins=4, ignore_zero=False)[:, 0] - histogram[:, 0]
+    assert zeros.tolist() == [sum(1 for row in rows if row[j] == 0.0) for j in range(8)]
+
+
+def test_normalize_and_prune_top_k():
+    weights = _random_weights()
+    weights[3] = 0.0
+    normalized = _skinweights.normalize(weights)
+    assert numpy.allclose(normalized.sum(axis=1)[numpy.arange(50) != 3], 1.0)
+    assert not normalized[3].any()
+    _skinweights.normalize(weights, out=weights)
+    assert numpy.array_equal(weights, normalized)
+    
+    pruned = _skinweights.prune_top_k(weights, 2, renormalize=False)
+    for row, pruned_row in zip(weights.tolist(), pruned.tolist()):
+        kept = sorted(row, reverse=True)[:2]
+        assert sorted((w for w in pruned_row if w != 0.0), reverse=True) == [w for w in kept if w != 0.0]
+    assert (_skinweights.influence_counts(_skinweights.prune_top_k(weights, 2)) <= 2).all()
+    assert numpy.allclose(_skinweights.prune_top_k(weights, 2).sum(axis=1)[numpy.arange(50) != 3], 1.0)
+
+
+def test_as_dense_reads_skin_weights():
+    mObject = _fake_om2.create_skin_cluster("skinCluster1", 12, 6, max_influences=3)
+    dense = _utils.get_skin_weights(mObject)
+    sparse = _utils.get_skin_weights(mObject, sparse=True)
+    assert numpy.array_equal(_skinweights.as_dense(sparse), _skinweights.as_dense(dense))
+    assert numpy.array_equal(_skinweights.as_dense(dense["weights"].ravel(), (12, 6)), dense["weights"])
+    with pytest.raises(ValueError):
+        _skinweights.as_dense(dense["weights"].ravel())
+
+
+def test_validation_report():
+    weights = numpy.array([[0.5, 0.5, 0.0, 0.0],
+                           [0.2, 0.2, 0.2, 0.2],
+                           [1.0, 0.0, 0.0, 0.0],
+                           [0.4, 0.3, 0.3, 0.0]])
+    report = _skinweights.validate({"shape": (4, 4), "weights": weights, "influences": ["a", "b", "c", "d"]},
+                                   max_influences=3, limit=1)
+    assert report["vertex_count"] == 4 and report["influence_count"] == 4
+    assert report["sum_deviation"]["count"] == 1
+    assert report["sum_deviation"]["vertices"] == [1]
+    assert report["sum_deviation"]["max"] == pytest.approx(0.2)
+    assert report["influences_per_vertex"]["max"] == 4
+    assert report["influences_per_vertex"]["vertices"] == [1]
+    assert report["influences_per_vertex"]["distribution"] == [0, 1, 1, 1, 1]
+    assert report["unused_influences"] == []
+    assert report["histogram"]["counts"]["a"] == [0, 0, 1, 0, 1, 1, 0, 0, 0, 1]
+    assert not report["ok"]
+    # JSON にそのまま書き出せる
+    assert json.loads(json.dumps(report)) == report
+    
+    report = _skinweights.validate(_skinweights.normalize(weights[[0, 2]]), max_influences=2)
+    assert report["unused_influences"] == ["2", "3"]
+    assert report["sum_deviation"]["count"] == report["influences_per_vertex"]["count"] == 0
+    assert not report["ok"]
+    assert _skinweights.validate(weights[[0, 2]][:, :2])["ok"]
+
+
+def _brute_force(points, queries, k):
+    d2 = ((queries[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+    indices = numpy.argsort(d2, axis=1, kind="stable")[:, :k]
+    return numpy.sqrt(numpy.take_along_axis(d2, indices, axis=1)), indices
+
+
+@pytest.mark.parametrize("k", [1, 5])
+def test_kdtree_numpy_fallback_matches_brute_force(monkeypatch, k):
+    rand = numpy.random.RandomState(1)
+    points = rand.rand(2000, 3) * [10.0, 2.0, 5.0]
+    # 点群の中、点群の上、点群から大きく離れた点
+    queries = numpy.concatenate([rand.rand(300, 3) * [10.0, 2.0, 5.0], points[:50], rand.rand(50, 3) * 200.0 - 100.0])
+    expected = _brute_force(points, queries, k)
+    tree = _skinweights.KDTree(points, leaf_size=16, use_scipy=False)
+    for max_pairs in (_skinweights.KDTree.kMaxPairs, 256):
+        # 候補が多い場合に問い合わせ点を分ける処理も通す
+        monkeypatch.setattr(_skinweights.KDTree, "kMaxPairs", max_pairs)
+        distances, indices = tree.query(queries, k)
+        assert numpy.allclose(distances, expected[0])
+        assert numpy.array_equal(indices, expected[1])
+    if _skinweights.cKDTree is not None:
+        distances, indices = _skinweights.KDTree(points).query(queries, k)
+        assert numpy.allclose(distances, expected[0])
+        assert numpy.array_equal(indices, expected[1])
+    # 点の数より多い k は点の数にする
+    distances, indices = _skinweights.KDTree(points[:3], use_scipy=False).query(queries[:2], 10)
+    assert indices.shape == (2, 3)
+    assert numpy.array_equal(indices, _brute_force(points[:3], queries[:2], 3)[1])
+
+
+def test_mirror_name_and_permutation():
+    assert _skinweights.mirror_name("arm_L") == "arm_R"
+    assert _skinweights.mirror_name("rig|Lf_arm_01") == "rig|Rt_arm_01"
+    assert _skinweights.mirror_name("LeftArm") == "RightArm"
+    assert _skinweights.mirror_name("spine") == "spine"
+    influences = ["spine", "arm_L", "arm_R", "LeftLeg", "RightLeg", "hand_L"]
+    assert _skinweights.mirror_permutation(influences).tolist() == [0, 2, 1, 4, 3, 5]
+
+
+@pytest.mark.parametrize("method", ["inverse_distance", "barycentric"])
+def test_mirror_weights(method):
+    rand = numpy.random.RandomState(2)
+    positive = rand.rand(40, 3) + [0.5, 0.0, 0.0]
+    on_plane = numpy.column_stack([numpy.zeros(5), rand.rand(5, 2)])
+    negative = positive * [-1.0, 1.0, 1.0]
+    points = numpy.concatenate([positive, on_plane, negative])
+    influences = ["spine", "arm_L", "arm_R"]
+    weights = _skinweights.normalize(rand.rand(len(points), 3))
+    
+    mirrored = _skinweights.mirror_weights(points, weights, influences, method=method)
+    # + 側と面上はそのまま、- 側は対になる頂点のウェイトの左右を入れ替えたもの
+    assert numpy.array_equal(mirrored[:45], weights[:45])
+    assert numpy.allclose(mirrored[45:], weights[:40][:, [0, 2, 1]])
+    
+    # 逆向きは - 側から + 側へ
+    mirrored = _skinweights.mirror_weights(points, weights, influences, direction=-1, method=method)
+    assert numpy.allclose(mirrored[:40], weights[45:][:, [0, 2, 1]])
+    assert numpy.array_equal(mirrored[40:], weights[40:])
+
+
+def test_copy_weights_maps_influences_by_name():
+    rand = numpy.random.RandomState(3)
+    points = rand.rand(30, 3)
+    weights = _skinweights.normalize(rand.rand(30, 3))
+    copied = _skinweights.copy_weights(points, weights, points[::-1], ["a", "b", "c"], ["c", "a"])
+    # 転写先に無い "b" は除いて合計を 1 にする
+    expected = weights[::-1][:, [2, 0]]
+    assert numpy.allclose(copied, expected / expected.sum(axis=1, keepdims=True))
+    assert numpy.allclose(_skinweights.copy_weights(points, {"shape": (30, 3), "weights": weights}, points), weights)
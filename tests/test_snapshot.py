@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import array
+import os
+import struct
+
+import pytest
+
+import _fake_om2
+import _snapshot
+import _utils
+
+
+@pytest.fixture
+def skin_cluster():
+    return _fake_om2.create_skin_cluster("skinCluster1", 20, 4)
+
+
+def _records(mObject):
+    # MeshHandle は書き込み時と同じ dict にして比べる
+    return [(plug_path, type_tag, value.toDict() if isinstance(value, _utils.MeshHandle) else value)
+            for plug_path, type_tag, value in _utils.iter_plug_records(mObject)]
+
+
+def _assert_same_records(expected, actual):
+    expected = sorted(expected, key=lambda record: record[0])
+    actual = sorted(actual, key=lambda record: record[0])
+    assert [record[:2] for record in actual] == [record[:2] for record in expected]
+    for (plug_path, type_tag, a), (_, _, b) in zip(expected, actual):
+        assert _snapshot.values_close(a, b), plug_path
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compress": "zlib", "hash_name": "sha1"}, {"merkle": True}])
+def test_binary_round_trip(tmpdir, skin_cluster, kwargs):
+    path = os.path.join(str(tmpdir), "dump" + _snapshot.BINARY_EXTENSION)
+    count = _utils.write_node_records([skin_cluster], path, **kwargs)
+    with _snapshot.BinaryReader(path) as reader:
+        assert len(reader) == count
+        assert list(reader.nodes()) == ["skinCluster1"]
+        assert reader.verify() == []
+        _assert_same_records(_records(skin_cluster), list(reader))
+
+
+def test_binary_get_and_query(tmpdir, skin_cluster):
+    path = os.path.join(str(tmpdir), "dump" + _snapshot.BINARY_EXTENSION)
+    _utils.write_node_records([skin_cluster], path)
+    with _snapshot.BinaryReader(path) as reader:
+        # まとめて書かれた行列の配列から要素だけを取り出す
+        tag, value = reader.get("skinCluster1.bindPreMatrix[2]")
+        assert tag == "matrix"
+        assert list(value)[12] == -2.0
+        assert "skinCluster1.envelope" in reader
+        with pytest.raises(KeyError):
+            reader.get("skinCluster1.bindPreMatrix[99]")
+        plug_paths = [record[0] for record in reader.query("*.bindPreMatrix")]
+        assert plug_paths == ["skinCluster1.bindPreMatrix"]
+
+
+def test_binary_get_reads_every_node(tmpdir):
+    # 同じ型のノードはアトリビュートを共有するため、2つ目以降も読み取り計画で自身の値を読む
+    mObjects = [_fake_om2.create_skin_cluster("skinCluster%d" % i, 10, 3 + i, seed=i) for i in (1, 2)]
+    path = os.path.join(str(tmpdir), "dump" + _snapshot.BINARY_EXTENSION)
+    _utils.write_node_records(mObjects, path)
+    with _snapshot.BinaryReader(path) as reader:
+        for i, mObject in zip((1, 2), mObjects):
+            tag, value = reader.get("skinCluster%d.bindPreMatrix" % i)
+            assert list(value["indices"]) == list(range(3 + i))
+            assert reader.get("skinCluster%d.weightList" % i)[1]["influences"] == \
+                _utils.get_skin_weights(mObject)["influences"]
+
+
+def test_convert_ndjson_to_binary(tmpdir, skin_cluster):
+    ndjson_path = os.path.join(str(tmpdir), "dump.ndjson")
+    binary_path = os.path.join(str(tmpdir), "dump" + _snapshot.BINARY_EXTENSION)
+    count = _utils.write_node_records([skin_cluster], ndjson_path)
+    assert _snapshot.convert_snapshot(ndjson_path, binary_path) == count
+    with _snapshot.BinaryReader(binary_path) as reader:
+        # NDJSON のリストはバッファに戻して書き込まれる
+        tag, value = reader.get("skinCluster1.bindPreMatrix")
+        assert tag == "matrix[]"
+        assert not isinstance(value["values"], list)
+        _assert_same_records(list(_snapshot.iter_ndjson(ndjson_path)), list(reader))
+
+
+def test_json_to_buffers():
+    value = _snapshot.json_to_buffers("double[]", {"indices": [0, 3], "values": [0.5, 1.0]})
+    assert value["indices"] == array.array("i", [0, 3])
+    assert value["values"] == array.array("d", [0.5, 1.0])
+    assert _snapshot.json_to_buffers("matrix", [1.0] * 16) == array.array("d", [1.0] * 16)
+    assert _snapshot.json_to_buffers("message", [1, "a"]) == [1, "a"]
+
+
+def _dump_value(values, plug_path):
+    # "input[0].inputGeometry" を dump_node の入れ子の dict から引く
+    value = values
+    for name in plug_path.split(".")[1:]:
+        name, _, index = name.partition("[")
+        value = value[name]
+        if index:
+            value = value[int(index[:-1])]
+    return value
+
+
+@pytest.mark.parametrize("name", ["dump.ndjson", "dump.ndjson.gz"])
+def test_ndjson_matches_dump_node(tmpdir, skin_cluster, name):
+    path = os.path.join(str(tmpdir), name)
+    count = _utils.write_node_records([skin_cluster], path)
+    records = list(_snapshot.iter_ndjson(path))
+    assert len(records) == count
+    
+    values = _utils.dump_node(skin_cluster)
+    for plug_path, type_tag, value in records:
+        expected = _dump_value(values, plug_path)
+        if isinstance(expected, _utils.MeshHandle):
+            expected = expected.toDict()
+        assert _snapshot.values_close(value, expected), plug_path
+    # 要素の無い配列以外の最上位アトリビュートはすべてレコードになる
+    top_level = set(plug_path.split(".")[1].split("[")[0] for plug_path, _, _ in records)
+    assert top_level == set(name for name, value in values.items() if value != {})
+
+
+def test_writer_rejects_unknown_options(tmpdir):
+    path = os.path.join(str(tmpdir), "dump" + _snapshot.BINARY_EXTENSION)
+    with pytest.raises(TypeError):
+        _snapshot.BinaryWriter(path, compres="zlib")
+    with pytest.raises(TypeError):
+        _snapshot.open_writer(path, hashname="sha1")
+    # NDJSON に .snap の引数を渡した場合も無視しない
+    with pytest.raises(TypeError):
+        _snapshot.open_writer(os.path.join(str(tmpdir), "dump.ndjson"), hash_name="sha1")
+
+
+@pytest.mark.parametrize("version", [1, 2, 4])
+def test_binary_rejects_other_versions(tmpdir, skin_cluster, version):
+    path = os.path.join(str(tmpdir), "dump" + _snapshot.BINARY_EXTENSION)
+    _utils.write_node_records([skin_cluster], path)
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write(struct.pack("<H", version))
+    with pytest.raises(ValueError):
+        _snapshot.BinaryReader(path)
+    # 開けなかったファイルは閉じられている (上書きできる)
+    os.remove(path)